@@ -0,0 +1,167 @@
+import html
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from config import (
+    ARTICLE_CATALOG_FILE, ARTICLE_CATALOG_POST_TYPES, ARTICLE_CATALOG_FULL_SYNC_DAYS
+)
+from wordpress_client import get_wordpress_client
+
+CATALOG_FIELDS = 'id,link,title,modified,excerpt'
+CATALOG_PAGE_SIZE = 100
+
+
+class ArticleCatalog:
+    """On-disk catalog of published WordPress articles, shared by every processor
+
+    The first sync pages through every post once; later syncs only ask for posts
+    modified since the newest one we have. A periodic full sync drops deleted posts.
+    """
+
+    def __init__(self, catalog_file=ARTICLE_CATALOG_FILE, post_types=None):
+        self.client = get_wordpress_client()
+        self.catalog_file = catalog_file
+        self.post_types = post_types or ARTICLE_CATALOG_POST_TYPES
+        self.lock = threading.RLock()
+        self.synced = False
+        self.catalog = self.load_catalog()
+
+    def load_catalog(self):
+        """Load the catalog from file"""
+        if os.path.exists(self.catalog_file):
+            try:
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading article catalog: {e}")
+        return {'post_types': {}}
+
+    def save_catalog(self):
+        """Save the catalog atomically so a crashed run never leaves a half-written file"""
+        temp_file = f"{self.catalog_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.catalog, f)
+            os.replace(temp_file, self.catalog_file)
+        except Exception as e:
+            print(f"Error saving article catalog: {e}")
+
+    def get_type_state(self, post_type):
+        return self.catalog['post_types'].setdefault(post_type, {
+            'last_full_sync': None,
+            'last_modified': None,
+            'articles': {}
+        })
+
+    def fetch_pages(self, post_type, params):
+        """Fetch every page of a post listing, returns the list of posts"""
+        posts = []
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            response = self.client.get(
+                post_type,
+                fields=CATALOG_FIELDS,
+                params=dict(params, per_page=CATALOG_PAGE_SIZE, page=page)
+            )
+            if response.status_code != 200:
+                raise Exception(f"{post_type} page {page} returned {response.status_code}")
+
+            posts.extend(response.json())
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            page += 1
+        return posts
+
+    def needs_full_sync(self, state):
+        if not state['last_full_sync'] or state.get('fields') != CATALOG_FIELDS:
+            return True
+        last_full_sync = datetime.fromisoformat(state['last_full_sync'])
+        return datetime.now() - last_full_sync > timedelta(days=ARTICLE_CATALOG_FULL_SYNC_DAYS)
+
+    def excerpt_text(self, post):
+        """Plain text of the rendered excerpt, trimmed for the relevance index"""
+        rendered = (post.get('excerpt') or {}).get('rendered') or ''
+        return html.unescape(re.sub(r'<[^>]+>', ' ', rendered)).strip()[:300]
+
+    def store_post(self, state, post, advance_sync_point=True):
+        state['articles'][str(post['id'])] = {
+            'id': post['id'],
+            'title': post['title']['rendered'],
+            'url': post['link'],
+            'excerpt': self.excerpt_text(post),
+            'modified': post['modified']
+        }
+        if advance_sync_point and (not state['last_modified'] or post['modified'] > state['last_modified']):
+            state['last_modified'] = post['modified']
+
+    def sync_post_type(self, post_type):
+        """Backfill or delta-sync one post type, returns the number of posts fetched"""
+        state = self.get_type_state(post_type)
+
+        if self.needs_full_sync(state):
+            print(f"Backfilling article catalog for {post_type}...")
+            posts = self.fetch_pages(post_type, {'orderby': 'id', 'order': 'asc'})
+            state['articles'] = {}
+            state['last_modified'] = None
+            state['last_full_sync'] = datetime.now().isoformat()
+            state['fields'] = CATALOG_FIELDS
+        else:
+            posts = self.fetch_pages(post_type, {
+                'modified_after': state['last_modified'],
+                'orderby': 'modified',
+                'order': 'asc'
+            })
+
+        for post in posts:
+            self.store_post(state, post)
+        return len(posts)
+
+    def sync(self, force=False):
+        """Bring the catalog up to date (once per process unless forced)"""
+        with self.lock:
+            if self.synced and not force:
+                return
+
+            for post_type in self.post_types:
+                try:
+                    fetched = self.sync_post_type(post_type)
+                    print(f"✓ Article catalog {post_type}: {fetched} fetched, "
+                          f"{len(self.get_type_state(post_type)['articles'])} total")
+                except Exception as e:
+                    print(f"⚠️ Article catalog sync failed for {post_type}, using cached copy: {e}")
+
+            self.save_catalog()
+            self.synced = True
+
+    def add_post(self, post_type, post):
+        """Record a post we just published so it is linkable without waiting for the next sync"""
+        with self.lock:
+            modified = post.get('modified') or datetime.now().replace(microsecond=0).isoformat()
+            # Leave the sync point alone so posts edited elsewhere since the last sync are still fetched
+            self.store_post(self.get_type_state(post_type), dict(post, modified=modified), advance_sync_point=False)
+            self.save_catalog()
+
+    def get_articles(self):
+        """Return [{'title', 'url', ...}] newest first, post types in configured order"""
+        with self.lock:
+            self.sync()
+            articles = []
+            for post_type in self.post_types:
+                stored = self.get_type_state(post_type)['articles'].values()
+                articles.extend(sorted(stored, key=lambda a: a['id'], reverse=True))
+            return articles
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_article_catalog():
+    """Get the process-wide catalog, creating it on first use"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ArticleCatalog()
+        return _catalog
@@ -0,0 +1,214 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from config import OUTBOX_DB_FILE, CHECKPOINT_MAX_ATTEMPTS, CHECKPOINT_STALE_MINUTES
+
+# Pipeline stages whose results are saved; warm_cache is the WordPress article list, cheap to load again
+SAVED_STAGES = ('harvest_links', 'featured_image', 'rewrite', 'internal_links', 'sources', 'external_links')
+
+# Listing milestones, furthest first, with the stages each one needs
+MILESTONES = (
+    ('image', ('rewrite', 'external_links', 'featured_image')),
+    ('linked', ('rewrite', 'external_links')),
+    ('rewritten', ('rewrite',)),
+)
+
+
+def create_table(conn):
+    """Create the checkpoint table (it lives in the outbox database so queuing can close a checkpoint)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS article_checkpoints (
+            id TEXT PRIMARY KEY,
+            source TEXT,
+            url TEXT NOT NULL,
+            title TEXT,
+            article TEXT NOT NULL,
+            options TEXT NOT NULL,
+            results TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'running',
+            attempts INTEGER NOT NULL DEFAULT 1,
+            last_error TEXT,
+            outbox_id TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS article_checkpoints_status ON article_checkpoints (status, updated_at)")
+
+
+def mark_queued(conn, checkpoint_id, outbox_id):
+    """Close a checkpoint once its article is in the outbox (called inside the enqueue transaction)"""
+    conn.execute(
+        "UPDATE article_checkpoints SET status = 'queued', outbox_id = ?, updated_at = ? WHERE id = ?",
+        (outbox_id, datetime.now().isoformat(), checkpoint_id)
+    )
+
+
+def get_milestone(checkpoint):
+    """candidate -> extracted -> rewritten -> linked -> image -> posted"""
+    if checkpoint['status'] == 'queued':
+        return 'posted'
+    for milestone, stages in MILESTONES:
+        if all(stage in checkpoint['results'] for stage in stages):
+            return milestone
+    return 'extracted' if checkpoint['article'].get('content') else 'candidate'
+
+
+class ArticleCheckpoints:
+    """Per-article pipeline state, saved after every stage
+
+    A checkpoint is 'running' while a process works on it, 'stalled' when the
+    pipeline ended without a finished article, 'queued' once the article is
+    in the outbox and 'abandoned' after CHECKPOINT_MAX_ATTEMPTS tries. Stalled
+    checkpoints, and running ones not touched for CHECKPOINT_STALE_MINUTES
+    (the process died), are resumed from their last completed stage.
+    """
+
+    def __init__(self, db_file=OUTBOX_DB_FILE):
+        self.db_file = db_file
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            create_table(conn)
+        conn.close()
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def row_to_checkpoint(self, row):
+        checkpoint = dict(row)
+        for field in ('article', 'options', 'results'):
+            checkpoint[field] = json.loads(checkpoint[field])
+        checkpoint['stage'] = get_milestone(checkpoint)
+        return checkpoint
+
+    def start(self, source, article, options):
+        """Record a chosen (already marked used) article, returns its checkpoint"""
+        now = datetime.now().isoformat()
+        checkpoint = {
+            'id': uuid.uuid4().hex,
+            'source': source,
+            'url': article['url'],
+            'title': article.get('title'),
+            'article': article,
+            'options': options,
+            'results': {},
+            'status': 'running',
+            'attempts': 1
+        }
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO article_checkpoints (id, source, url, title, article, options, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                checkpoint['id'], source, checkpoint['url'], checkpoint['title'],
+                json.dumps(article), json.dumps(options), now, now
+            ))
+        conn.close()
+        return checkpoint
+
+    def save_stage(self, checkpoint_id, name, result):
+        """Store a finished stage's result"""
+        if name not in SAVED_STAGES:
+            return
+        conn = self.get_connection()
+        with conn:
+            row = conn.execute("SELECT results FROM article_checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+            if row:
+                results = json.loads(row['results'])
+                results[name] = result
+                conn.execute(
+                    "UPDATE article_checkpoints SET results = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(results, default=str), datetime.now().isoformat(), checkpoint_id)
+                )
+        conn.close()
+
+    def mark_stalled(self, checkpoint_id, error):
+        """The pipeline ended without a finished article; it's resumed later, or abandoned after too many tries"""
+        conn = self.get_connection()
+        with conn:
+            row = conn.execute("SELECT attempts FROM article_checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+            status = 'abandoned' if row and row['attempts'] >= CHECKPOINT_MAX_ATTEMPTS else 'stalled'
+            conn.execute(
+                "UPDATE article_checkpoints SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, error, datetime.now().isoformat(), checkpoint_id)
+            )
+        conn.close()
+        if status == 'abandoned':
+            print(f"✗ Giving up on checkpointed article after {row['attempts']} attempts")
+
+    def abandon(self, checkpoint_id):
+        with self.get_connection() as conn:
+            changed = conn.execute(
+                "UPDATE article_checkpoints SET status = 'abandoned', updated_at = ? WHERE id = ? AND status != 'queued'",
+                (datetime.now().isoformat(), checkpoint_id)
+            ).rowcount
+        conn.close()
+        return bool(changed)
+
+    def get(self, checkpoint_id):
+        conn = self.get_connection()
+        row = conn.execute("SELECT * FROM article_checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+        conn.close()
+        return self.row_to_checkpoint(row) if row else None
+
+    def list_checkpoints(self, include_finished=False):
+        """Checkpoints, newest first; only the unfinished ones (running, stalled) by default"""
+        query = "SELECT * FROM article_checkpoints"
+        if not include_finished:
+            query += " WHERE status IN ('running', 'stalled')"
+        conn = self.get_connection()
+        rows = conn.execute(query + " ORDER BY created_at DESC").fetchall()
+        conn.close()
+        return [self.row_to_checkpoint(row) for row in rows]
+
+    def get_resumable(self, source=None, now=None):
+        """Stalled checkpoints and ones whose process died, oldest first"""
+        stale = ((now or datetime.now()) - timedelta(minutes=CHECKPOINT_STALE_MINUTES)).isoformat()
+        query = """
+            SELECT * FROM article_checkpoints
+            WHERE (status = 'stalled' OR (status = 'running' AND updated_at < ?)) AND attempts < ?
+        """
+        params = [stale, CHECKPOINT_MAX_ATTEMPTS]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        conn = self.get_connection()
+        rows = conn.execute(query + " ORDER BY created_at", params).fetchall()
+        conn.close()
+        return [self.row_to_checkpoint(row) for row in rows]
+
+    def claim(self, checkpoint_id, now=None, force=False):
+        """Take a resumable checkpoint, returns it or None if another process is working on it
+
+        force also takes a running checkpoint that isn't stale yet (resume ID from the CLI).
+        """
+        now = now or datetime.now()
+        stale = (now - timedelta(minutes=CHECKPOINT_STALE_MINUTES)).isoformat()
+        conn = self.get_connection()
+        with conn:
+            cursor = conn.execute("""
+                UPDATE article_checkpoints SET status = 'running', attempts = attempts + 1, updated_at = ?
+                WHERE id = ? AND (status = 'stalled' OR (status = 'running' AND (updated_at < ? OR ?)))
+            """, (now.isoformat(), checkpoint_id, stale, force))
+            row = conn.execute(
+                "SELECT * FROM article_checkpoints WHERE id = ?", (checkpoint_id,)
+            ).fetchone() if cursor.rowcount else None
+        conn.close()
+        return self.row_to_checkpoint(row) if row else None
+
+
+_checkpoints = None
+_checkpoints_lock = threading.Lock()
+
+
+def get_article_checkpoints():
+    """Get the process-wide checkpoint store, creating it on first use"""
+    global _checkpoints
+    with _checkpoints_lock:
+        if _checkpoints is None:
+            _checkpoints = ArticleCheckpoints()
+        return _checkpoints
@@ -0,0 +1,205 @@
+from config import LLM_HEDGE_ENABLED, LLM_HEDGE_MAX_TOKENS, LLM_HEDGE_TARGET, CHECKPOINTS_ENABLED
+from article_checkpoints import get_article_checkpoints
+from llm_gateway import get_llm_gateway
+from pipeline_executor import PipelineExecutor, StageSkipped
+
+
+class ArticlePipeline:
+    """Per-article stage graph shared by the news processors
+
+    Link harvesting, the WordPress article cache and the featured image upload
+    don't depend on the rewrite, so they run while Claude generates. With a
+    source and checkpointed=True, every finished stage is checkpointed so an
+    interrupted article resumes where it stopped; only callers that queue the
+    article in the outbox (which closes the checkpoint) ask for it, otherwise
+    an article posted some other way would later be resumed and posted again.
+    """
+
+    def __init__(self, internal_linking, external_linking, article_tracker, source=None):
+        self.internal_linking = internal_linking
+        self.external_linking = external_linking
+        self.article_tracker = article_tracker
+        self.source = source
+        self.checkpoints = get_article_checkpoints() if CHECKPOINTS_ENABLED and source else None
+        self.llm = get_llm_gateway()
+        self.last_run = None
+
+    def is_usable_rewrite(self, rewritten):
+        # A rewrite cut off at max_tokens (the hedge has a lower cap) would be published mid-sentence
+        return bool(
+            rewritten and rewritten.get('title') and rewritten.get('content')
+            and rewritten.get('stop_reason') != 'max_tokens'
+        )
+
+    def hedged_rewrite(self, chosen_article, rewrite, alternates=None):
+        """Rewrite with a hedge request, returns (rewritten, article that was rewritten)"""
+        hedge_article = chosen_article
+        if LLM_HEDGE_TARGET == 'alternate':
+            others = [
+                a for a in (alternates or [])
+                if a['url'] != chosen_article['url'] and a.get('word_count', 0) >= 200
+            ]
+            if others:
+                # Second-best candidate: the longest of the remaining articles
+                hedge_article = max(others, key=lambda a: a['word_count'])
+
+        rewritten, winner = self.llm.run_hedged(
+            lambda cancel_event: rewrite(chosen_article, cancel_event=cancel_event),
+            lambda cancel_event: rewrite(hedge_article, cancel_event=cancel_event, max_tokens=LLM_HEDGE_MAX_TOKENS),
+            self.is_usable_rewrite,
+            purpose='rewrite'
+        )
+        return rewritten, (hedge_article if winner == 'hedge' else chosen_article)
+
+    def build(self, chosen_article, rewrite, primary_tag, tag_field, image_manager=None, image_category=None,
+              alternates=None):
+        """Build the executor for one article"""
+        executor = PipelineExecutor()
+
+        executor.add_stage(
+            'harvest_links',
+            lambda results: self.external_linking.extract_links_from_original(chosen_article['url'])
+        )
+        executor.add_stage(
+            'warm_cache',
+            lambda results: self.internal_linking.get_existing_articles()
+        )
+        if image_manager:
+            executor.add_stage(
+                'featured_image',
+                lambda results: image_manager.get_featured_image_for_article(image_category, chosen_article['title'])
+            )
+
+        def rewrite_stage(results):
+            if LLM_HEDGE_ENABLED:
+                rewritten, source_article = self.hedged_rewrite(chosen_article, rewrite, alternates)
+            else:
+                rewritten, source_article = rewrite(chosen_article), chosen_article
+
+            if not self.is_usable_rewrite(rewritten):
+                raise StageSkipped("Claude returned no usable rewrite (empty or cut off at max_tokens)")
+            # Only needed for the check above, not in the queued or checkpointed article
+            rewritten.pop('stop_reason', None)
+
+            if source_article is not chosen_article:
+                print(f"Hedge rewrote the alternate article: {source_article['title'][:50]}...")
+                self.article_tracker.mark_article_used(
+                    source_article['url'],
+                    source_article['title'],
+                    source_article['category']
+                )
+                # Its links replace the original harvest (kept on the rewrite so a checkpoint has them)
+                rewritten['harvest_links'] = self.external_linking.extract_links_from_original(source_article['url'])
+
+            # Add original URL to rewritten article for tracking
+            rewritten['original_url'] = source_article['url']
+            rewritten['input_tokens_saved'] = source_article.get('input_tokens_saved', 0)
+
+            print("✓ Article generation completed successfully")
+            secondary_tag = rewritten.get(tag_field, 'business')
+            rewritten['tags'] = [primary_tag, secondary_tag]
+
+            # Remove the old single tag field since we now have tags array
+            if tag_field in rewritten:
+                del rewritten[tag_field]
+            return rewritten
+
+        def internal_links_stage(results):
+            rewritten = results['rewrite']
+            print("Adding internal links...")
+            return self.internal_linking.add_internal_links(rewritten['content'], rewritten['title'])
+
+        def sources_stage(results):
+            rewritten = results['rewrite']
+            return self.external_linking.find_additional_sources(
+                rewritten['content'],
+                rewritten['title'],
+                len(rewritten.get('harvest_links', results['harvest_links']))
+            )
+
+        def external_links_stage(results):
+            harvest_links = results['rewrite'].get('harvest_links', results['harvest_links'])
+            all_external_links = harvest_links + results['sources']
+            if not all_external_links:
+                return results['internal_links']
+            return self.external_linking.add_external_links_to_content(results['internal_links'], all_external_links)
+
+        executor.add_stage('rewrite', rewrite_stage)
+        executor.add_stage('internal_links', internal_links_stage, depends_on=('rewrite', 'warm_cache'))
+        executor.add_stage('sources', sources_stage, depends_on=('rewrite', 'harvest_links'))
+        executor.add_stage('external_links', external_links_stage,
+                           depends_on=('internal_links', 'sources', 'harvest_links'))
+        return executor
+
+    def run(self, chosen_article, rewrite, primary_tag, tag_field, image_manager=None, image_category=None,
+            alternates=None, checkpoint=None, checkpointed=False):
+        """Run the pipeline, returns the finished article dict or None
+
+        checkpoint is a resumed article's saved state; otherwise a new checkpoint
+        is started when checkpointed is set.
+        """
+        if checkpoint is None and self.checkpoints and checkpointed:
+            checkpoint = self.checkpoints.start(self.source, chosen_article, {
+                'primary_tag': primary_tag,
+                'tag_field': tag_field,
+                'image_category': image_category
+            })
+
+        executor = self.build(chosen_article, rewrite, primary_tag, tag_field, image_manager, image_category,
+                              alternates)
+        if checkpoint:
+            executor.restore(checkpoint['results'])
+            executor.on_stage_done = lambda name, result: self.checkpoints.save_stage(checkpoint['id'], name, result)
+        run = executor.run()
+        self.last_run = run
+
+        print("Pipeline timings:")
+        run.print_report()
+
+        if not run.succeeded('rewrite'):
+            if checkpoint:
+                error = run.errors.get('rewrite') or 'rewrite skipped'
+                self.checkpoints.mark_stalled(checkpoint['id'], str(error))
+            return None
+
+        rewritten = run.results['rewrite']
+        rewritten.pop('harvest_links', None)
+        if run.succeeded('external_links'):
+            rewritten['content'] = run.results['external_links']
+        elif run.succeeded('internal_links'):
+            rewritten['content'] = run.results['internal_links']
+
+        if image_manager:
+            rewritten['featured_image_id'] = run.results.get('featured_image')
+
+        rewritten['pipeline_seconds'] = round(run.total_seconds, 2)
+        rewritten['critical_path_seconds'] = round(run.critical_path_seconds, 2)
+        if checkpoint:
+            # Outbox.enqueue closes the checkpoint when the article is queued
+            rewritten['checkpoint_id'] = checkpoint['id']
+        return rewritten
+
+    def resume(self, checkpoint, rewrite, image_manager=None):
+        """Finish a claimed checkpoint from its last completed stage, returns the finished article or None"""
+        options = checkpoint['options']
+        done = ', '.join(checkpoint['results']) or 'no stages'
+        print(f"Resuming '{checkpoint['title'][:50]}...' at {checkpoint['stage']} ({done} already done)")
+        return self.run(
+            checkpoint['article'],
+            rewrite,
+            options['primary_tag'],
+            options['tag_field'],
+            image_manager=image_manager,
+            image_category=options['image_category'],
+            checkpoint=checkpoint
+        )
+
+    def resume_next(self, rewrite, image_manager=None):
+        """Resume this source's oldest interrupted article, if there is one; returns the finished article or None"""
+        if not self.checkpoints:
+            return None
+        for candidate in self.checkpoints.get_resumable(self.source):
+            checkpoint = self.checkpoints.claim(candidate['id'])
+            if checkpoint:
+                return self.resume(checkpoint, rewrite, image_manager)
+        return None
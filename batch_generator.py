@@ -0,0 +1,420 @@
+import contextvars
+import importlib
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from config import NEWS_POSTS_PER_DAY, POST_BATCH_CONCURRENCY, POST_BATCH_SPACING_MINUTES
+from llm_gateway import get_llm_gateway
+from outbox import Outbox, OutboxPublisher
+import telemetry
+
+# How the articles of each source are scraped, rewritten and published
+BATCH_SOURCES = {
+    'us': {
+        'module': 'news_processor',
+        'class': 'CannabisNewsProcessor',
+        'scrape': 'scrape_cannabis_articles',
+        'parse': 'parse_cannabis_response',
+        'rewrite': 'rewrite_cannabis_article',
+        'tag_field': 'tag',
+        'primary_tag': 'US Cannabis News',
+        'author_name': 'rohan',
+        'image_category': None  # Use the rewritten article's category
+    },
+    'us_2': {
+        'module': 'news_processor_2',
+        'class': 'CannabisNewsProcessor2',
+        'scrape': 'scrape_cannabis_articles',
+        'parse': 'parse_cannabis_response',
+        'rewrite': 'rewrite_cannabis_article',
+        'tag_field': 'tag',
+        'primary_tag': 'US Cannabis News',
+        'author_name': 'kaleb',
+        'image_category': None
+    },
+    'canadian': {
+        'module': 'canadian_news_processor',
+        'class': 'CanadianNewsProcessor',
+        'scrape': 'scrape_canadian_articles',
+        'parse': 'parse_canadian_response',
+        'rewrite': 'rewrite_canadian_article',
+        'tag_field': 'secondary_tag',
+        'primary_tag': 'Canadian Cannabis News',
+        'author_name': 'kaleb',
+        'image_category': 'canadian'
+    }
+}
+
+REWRITE_MAX_TOKENS = 3000
+SOURCES_MAX_TOKENS = 1000
+PLACEMENT_MAX_TOKENS = 4000
+
+
+class BatchGenerator:
+    """Generate a day's articles with Message Batches jobs and queue them for the posting hours"""
+
+    def __init__(self, sources=None, state_file="batch_state.json"):
+        self.llm = get_llm_gateway()
+        self.queue = Outbox()
+        self.sources = sources or list(BATCH_SOURCES)
+        self.state_file = state_file
+        self.processors = {}
+
+    def get_processor(self, source):
+        """Create the processor for a source on first use"""
+        if source not in self.processors:
+            settings = BATCH_SOURCES[source]
+            module = importlib.import_module(settings['module'])
+            self.processors[source] = getattr(module, settings['class'])()
+        return self.processors[source]
+
+    def load_state(self):
+        """Load an unfinished batch run, if any"""
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading batch state: {e}")
+        return None
+
+    def save_state(self, state):
+        """Persist the batch run so a crash while polling can resume"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+
+    def clear_state(self):
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    def scrape_source(self, source):
+        """Unused articles of one source with enough words to rewrite"""
+        processor = self.get_processor(source)
+        try:
+            articles = getattr(processor, BATCH_SOURCES[source]['scrape'])()
+        except Exception as e:
+            print(f"Error scraping {source}: {e}")
+            articles = []
+        return [a for a in articles if a['word_count'] >= 200]
+
+    def collect_candidates(self, count):
+        """Scrape every source once (all at the same time) and pick up to count articles,
+        alternating between sources and spreading them over categories"""
+        # Build the processors up front so the scraping threads don't race to create them
+        for source in self.sources:
+            self.get_processor(source)
+        with ThreadPoolExecutor(max_workers=len(self.sources)) as pool:
+            futures = {
+                source: pool.submit(contextvars.copy_context().run, self.scrape_source, source)
+                for source in self.sources
+            }
+
+        pools = {}
+        for source in self.sources:
+            articles = futures[source].result()
+            random.shuffle(articles)
+            pools[source] = articles
+            print(f"{source}: {len(articles)} usable candidates")
+
+        candidates = []
+        seen_urls = set()
+        category_counts = {}
+        while len(candidates) < count and any(pools.values()):
+            for source in self.sources:
+                if len(candidates) >= count:
+                    break
+                while pools[source]:
+                    # The least used category so far, so a batch isn't five politics stories
+                    article = min(pools[source], key=lambda a: category_counts.get(a['category'], 0))
+                    pools[source].remove(article)
+                    if article['url'] not in seen_urls:
+                        seen_urls.add(article['url'])
+                        category_counts[article['category']] = category_counts.get(article['category'], 0) + 1
+                        candidates.append({'source': source, 'article': article})
+                        break
+
+        print(f"Selected {len(candidates)} candidates for batch generation")
+        return candidates
+
+    def build_generation_requests(self, candidates):
+        """Build the rewrite and source-suggestion requests for every candidate"""
+        requests = []
+        for index, candidate in enumerate(candidates):
+            processor = self.get_processor(candidate['source'])
+            article = candidate['article']
+
+            requests.append(self.llm.build_batch_request(
+                f"rewrite-{index}",
+                [{"role": "user", "content": processor.build_rewrite_prompt(article)}],
+                REWRITE_MAX_TOKENS
+            ))
+
+            needed_links = max(1, 3 - len(candidate['original_links']))
+            requests.append(self.llm.build_batch_request(
+                f"sources-{index}",
+                [{"role": "user", "content": processor.external_linking.build_sources_prompt(
+                    article['content'], article['title'], needed_links
+                )}],
+                SOURCES_MAX_TOKENS
+            ))
+
+        return requests
+
+    def start_run(self, count):
+        """Collect candidates, save them and submit the rewrite batch"""
+        candidates = self.collect_candidates(count)
+        if not candidates:
+            print("No candidates found for batch generation")
+            return None
+
+        for candidate in candidates:
+            processor = self.get_processor(candidate['source'])
+            article = candidate['article']
+            candidate['original_links'] = processor.external_linking.extract_links_from_original(article['url'])
+
+        # Saved before submitting: a failed or interrupted submission is retried with the same articles
+        state = {
+            'phase': 'submitting',
+            'batch_id': None,
+            'submitting_since': datetime.now(timezone.utc).isoformat(),
+            'candidates': candidates
+        }
+        self.save_state(state)
+        self.submit_generation(state)
+        return state
+
+    def submit_generation(self, state):
+        """Submit the rewrite batch (or adopt the one an interrupted run submitted), then mark the articles used"""
+        requests = self.build_generation_requests(state['candidates'])
+        try:
+            batch_id = self.llm.find_batch(len(requests), state['submitting_since'])
+            if not batch_id:
+                batch_id = self.llm.create_batch(requests)
+        except Exception as e:
+            print(f"❌ Could not submit the batch ({e}), the articles stay unused and are submitted on the next run")
+            return False
+
+        state['phase'] = 'generation'
+        state['batch_id'] = batch_id
+        self.save_state(state)
+
+        for candidate in state['candidates']:
+            article = candidate['article']
+            self.get_processor(candidate['source']).article_tracker.mark_article_used(
+                article['url'], article['title'], article['category']
+            )
+        return True
+
+    def finish_generation(self, state, results):
+        """Parse rewrites, add internal links and validate suggested sources"""
+        for index, candidate in enumerate(state['candidates']):
+            settings = BATCH_SOURCES[candidate['source']]
+            processor = self.get_processor(candidate['source'])
+            article = candidate['article']
+
+            rewrite_text = results.get(f"rewrite-{index}")
+            if not rewrite_text:
+                print(f"✗ No rewrite returned for: {article['title'][:50]}...")
+                candidate['rewritten'] = None
+                continue
+
+            rewritten = getattr(processor, settings['parse'])(rewrite_text)
+            if not rewritten.get('title') or not rewritten.get('content'):
+                print(f"✗ Could not parse rewrite for: {article['title'][:50]}...")
+                candidate['rewritten'] = None
+                continue
+
+            secondary_tag = rewritten.get(settings['tag_field'], 'business')
+            rewritten['tags'] = [settings['primary_tag'], secondary_tag]
+            if settings['tag_field'] in rewritten:
+                del rewritten[settings['tag_field']]
+
+            rewritten['content'] = processor.internal_linking.add_internal_links(
+                rewritten['content'],
+                rewritten['title']
+            )
+            rewritten['original_url'] = article['url']
+
+            sources_text = results.get(f"sources-{index}") or ''
+            suggested = processor.external_linking.parse_claude_sources(sources_text)
+            validated = [s for s in suggested if processor.external_linking.validate_source(s)]
+
+            candidate['rewritten'] = rewritten
+            candidate['external_links'] = candidate['original_links'] + validated
+
+    def start_placement(self, state):
+        """Submit the external link placement batch for the finished rewrites"""
+        requests = []
+        for index, candidate in enumerate(state['candidates']):
+            if candidate.get('rewritten') and candidate.get('external_links'):
+                processor = self.get_processor(candidate['source'])
+                requests.append(self.llm.build_batch_request(
+                    f"placement-{index}",
+                    [{"role": "user", "content": processor.external_linking.build_link_placement_prompt(
+                        candidate['rewritten']['content'], candidate['external_links']
+                    )}],
+                    PLACEMENT_MAX_TOKENS
+                ))
+
+        if not requests:
+            return False
+
+        state['phase'] = 'placement'
+        state['batch_id'] = self.llm.create_batch(requests)
+        self.save_state(state)
+        return True
+
+    def finish_placement(self, state, results):
+        """Swap in the linked content where the placement succeeded"""
+        for index, candidate in enumerate(state['candidates']):
+            linked_content = results.get(f"placement-{index}")
+            if candidate.get('rewritten') and linked_content:
+                candidate['rewritten']['content'] = linked_content
+
+    def queue_articles(self, state):
+        """Queue the finished articles into the next posting slots"""
+        finished = [c for c in state['candidates'] if c.get('rewritten')]
+        slots = self.queue.next_posting_slots(len(finished))
+
+        for candidate, slot in zip(finished, slots):
+            settings = BATCH_SOURCES[candidate['source']]
+            self.queue.enqueue(
+                candidate['rewritten'],
+                candidate['source'],
+                settings['author_name'],
+                settings['image_category'],
+                slot
+            )
+
+        return len(finished)
+
+    def run(self, count=NEWS_POSTS_PER_DAY):
+        """Generate up to count articles through Message Batches, resuming an unfinished run"""
+        print(f"=== BATCH GENERATION OF {count} ARTICLES ===")
+
+        state = self.load_state()
+        if state and state['phase'] == 'submitting':
+            print(f"Submitting the saved batch of {len(state['candidates'])} articles again")
+            if not self.submit_generation(state):
+                return 0
+        elif state:
+            print(f"Resuming {state['phase']} batch {state['batch_id']}")
+        else:
+            state = self.start_run(count)
+            if not state or state['phase'] == 'submitting':
+                return 0
+
+        if state['phase'] == 'generation':
+            if not self.llm.wait_for_batch(state['batch_id']):
+                return 0
+            self.finish_generation(state, self.llm.get_batch_results(state['batch_id']))
+            self.save_state(state)
+            if not self.start_placement(state):
+                state['phase'] = 'done'
+
+        if state['phase'] == 'placement':
+            if not self.llm.wait_for_batch(state['batch_id']):
+                return 0
+            self.finish_placement(state, self.llm.get_batch_results(state['batch_id']))
+
+        queued = self.queue_articles(state)
+        self.clear_state()
+        print(f"✓ Batch generation queued {queued} articles")
+        return queued
+
+
+class PostBatch(BatchGenerator):
+    """Generate N articles from one shared scrape through the regular article pipeline
+
+    Unlike BatchGenerator the rewrites run straight away (POST_BATCH_CONCURRENCY
+    at a time) instead of through Message Batches.
+    """
+
+    def __init__(self, sources=None, concurrency=POST_BATCH_CONCURRENCY):
+        super().__init__(sources)
+        self.concurrency = max(1, concurrency)
+        self.image_manager = None
+
+    def get_image_manager(self):
+        if self.image_manager is None:
+            from image_manager import ImageManager
+            self.image_manager = ImageManager()
+        return self.image_manager
+
+    def generate(self, candidate):
+        """Rewrite one candidate with its processor's pipeline, returns the finished article or None"""
+        settings = BATCH_SOURCES[candidate['source']]
+        processor = self.get_processor(candidate['source'])
+        pipeline = processor.article_pipeline
+        article = candidate['article']
+        print(f"Rewriting {candidate['source']} article: {article['title'][:50]}...")
+
+        def mark_used():
+            processor.article_tracker.mark_article_used(article['url'], article['title'], article['category'])
+
+        with telemetry.span('batch.article', source=candidate['source']):
+            try:
+                if pipeline.checkpoints:
+                    # Used once its checkpoint starts: if the rewrite fails, the stalled checkpoint
+                    # is resumed later, so a new scrape mustn't pick the article up as well
+                    mark_used()
+                # No alternates: the other candidates belong to the rest of the batch
+                rewritten = pipeline.run(
+                    article,
+                    getattr(processor, settings['rewrite']),
+                    primary_tag=settings['primary_tag'],
+                    tag_field=settings['tag_field'],
+                    image_manager=self.get_image_manager(),
+                    image_category=settings['image_category'] or article['category'],
+                    checkpointed=True
+                )
+            except Exception as e:
+                print(f"❌ Error generating {article['title'][:50]}...: {e}")
+                return None
+        if rewritten and not pipeline.checkpoints:
+            # Without checkpoints a failed article stays unused for the next scrape
+            mark_used()
+        return rewritten
+
+    def generate_all(self, candidates):
+        """Rewrite every candidate, a few at a time; returns (candidate, article) pairs in candidate order"""
+        for source in dict.fromkeys(c['source'] for c in candidates):
+            # Load the internal-link article list once per processor rather than once per thread
+            self.get_processor(source).internal_linking.get_existing_articles()
+        self.get_image_manager()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, self.generate, c) for c in candidates]
+        return [(candidate, future.result()) for candidate, future in zip(candidates, futures)]
+
+    def get_slots(self, count, spaced):
+        """Posting hours from the outbox, or every POST_BATCH_SPACING_MINUTES starting now"""
+        if not spaced:
+            return self.queue.next_posting_slots(count)
+        now = datetime.now()
+        return [now + timedelta(minutes=POST_BATCH_SPACING_MINUTES * i) for i in range(count)]
+
+    def run(self, count=NEWS_POSTS_PER_DAY, spaced=False):
+        """Generate up to count articles and queue them, publishing the ones due now; returns how many were queued"""
+        print(f"=== POST BATCH OF {count} ARTICLES ===")
+        candidates = self.collect_candidates(count)
+        if not candidates:
+            print("No candidates found for the post batch")
+            return 0
+
+        # generate marks each article used as its rewrite starts, not the whole batch up front
+        finished = [(c, article) for c, article in self.generate_all(candidates) if article]
+        slots = self.get_slots(len(finished), spaced)
+        for (candidate, article), slot in zip(finished, slots):
+            settings = BATCH_SOURCES[candidate['source']]
+            self.queue.enqueue(article, candidate['source'], settings['author_name'], settings['image_category'], slot)
+        print(f"✓ Post batch generated {len(finished)} of {len(candidates)} articles from one scrape")
+
+        if spaced and finished:
+            from wordpress_api import WordPressAPI
+            tracker = self.get_processor(finished[0][0]['source']).article_tracker
+            publisher = OutboxPublisher(WordPressAPI(), self.get_image_manager(), tracker, self.queue)
+            publisher.publish_due()
+        return len(finished)
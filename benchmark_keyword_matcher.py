@@ -0,0 +1,110 @@
+import contextlib
+import io
+import random
+import re
+import time
+from internal_linking import InternalLinking
+
+# Micro-benchmark: static keyword linking with a 500-keyword map,
+# per-keyword regex scans (old) vs one Aho-Corasick pass (KeywordMatcher)
+
+random.seed(42)
+
+VOCABULARY = [
+    'cannabis', 'dispensary', 'licence', 'edibles', 'vape', 'flower', 'terpene', 'extract',
+    'hemp', 'cultivation', 'retail', 'medical', 'patient', 'regulation', 'excise', 'tax',
+    'province', 'ontario', 'alberta', 'quebec', 'federal', 'senate', 'bill', 'market',
+    'grower', 'strain', 'potency', 'testing', 'recall', 'delivery', 'lounge', 'beverage'
+]
+
+
+def build_static_links(keyword_count=500, keywords_per_url=5):
+    """Build a synthetic URL -> keywords map with keyword_count keywords"""
+    static_links = {}
+    seen = set()
+    while sum(len(k) for k in static_links.values()) < keyword_count:
+        url = f"https://budscannacorner.ca/guide-{len(static_links)}/"
+        keywords = []
+        while len(keywords) < keywords_per_url:
+            keyword = ' '.join(random.sample(VOCABULARY, random.randint(1, 3)))
+            if random.random() < 0.3:
+                keyword = keyword.title()
+            if keyword.lower() not in seen:
+                seen.add(keyword.lower())
+                keywords.append(keyword)
+        static_links[url] = keywords
+    return static_links
+
+
+def build_article(word_count=1500):
+    """Build a synthetic HTML article"""
+    paragraphs = []
+    words = 0
+    while words < word_count:
+        sentence = ' '.join(random.choice(VOCABULARY) for _ in range(random.randint(8, 20)))
+        paragraphs.append(f"<p>{sentence.capitalize()}.</p>")
+        words += len(sentence.split())
+    return '\n'.join(paragraphs)
+
+
+def legacy_find_keywords_in_content(static_links, content):
+    """The previous implementation, kept here as the baseline"""
+    links_to_add = {}
+    used_phrases = set()
+
+    for url, keywords in static_links.items():
+        for keyword in keywords:
+            keyword_lower = keyword.lower()
+            if any(keyword_lower in existing.lower() or existing.lower() in keyword_lower
+                   for existing in used_phrases):
+                continue
+
+            pattern = r'\b' + re.escape(keyword) + r'\b'
+            matches = re.finditer(pattern, content, re.IGNORECASE)
+
+            for match in matches:
+                if keyword.lower() not in [k.lower() for k in links_to_add.keys()]:
+                    links_to_add[match.group()] = url
+                    used_phrases.add(keyword)
+                    print(f"Found keyword for linking: '{keyword}' -> {url}")
+                    break
+
+            if keyword in [k.lower() for k in links_to_add.keys()]:
+                break
+
+    return links_to_add
+
+
+def time_calls(func, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+    return (time.perf_counter() - started) / runs, result
+
+
+if __name__ == "__main__":
+    static_links = build_static_links()
+    articles = [build_article() for _ in range(5)]
+
+    linking = InternalLinking()
+    linking.static_links = static_links
+
+    build_started = time.perf_counter()
+    linking.build_keyword_matcher()
+    build_seconds = time.perf_counter() - build_started
+
+    keyword_count = sum(len(k) for k in static_links.values())
+    print(f"Keyword map: {len(static_links)} URLs, {keyword_count} keywords "
+          f"(matcher built in {build_seconds * 1000:.1f} ms)")
+
+    runs = 20
+    for i, article in enumerate(articles):
+        legacy_seconds, legacy_links = time_calls(lambda: legacy_find_keywords_in_content(static_links, article), runs)
+        matcher_seconds, matcher_links = time_calls(lambda: linking.find_keywords_in_content(article), runs)
+
+        same = legacy_links == matcher_links and list(legacy_links) == list(matcher_links)
+        print(f"Article {i + 1} ({len(article.split())} words): "
+              f"regex {legacy_seconds * 1000:.2f} ms, matcher {matcher_seconds * 1000:.2f} ms, "
+              f"{legacy_seconds / matcher_seconds:.1f}x faster, {len(matcher_links)} links, "
+              f"{'same result' if same else 'RESULT MISMATCH'}")
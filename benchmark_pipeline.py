@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# End-to-end benchmark: a whole get_cannabis_article / get_canadian_article run
+# (scrape, choose, rewrite, links, featured image) against recorded HTTP traffic.
+#
+#   python benchmark_pipeline.py record us              # one live run, saved to cassettes/pipeline_us.json
+#   python benchmark_pipeline.py replay us --runs 5     # offline, same responses every run
+#   python benchmark_pipeline.py replay us --latency-ms 50 --latency-scale 0.5
+#
+# Caches, the outbox and the telemetry file go to a temporary folder, so the
+# first run starts cold and later runs are warm like a long-running daemon.
+# The article database is never touched (every article counts as unused).
+
+SOURCES = {
+    'us': ('news_processor', 'CannabisNewsProcessor', 'get_cannabis_article'),
+    'us_2': ('news_processor_2', 'CannabisNewsProcessor2', 'get_cannabis_article'),
+    'canadian': ('canadian_news_processor', 'CanadianNewsProcessor', 'get_canadian_article')
+}
+
+STATE_FILES = {
+    'OUTBOX_DB_FILE': 'outbox.db',
+    'ARTICLE_CATALOG_FILE': 'article_catalog.json',
+    'RELEVANCE_INDEX_FILE': 'relevance_index.json',
+    'TAXONOMY_CACHE_FILE': 'taxonomy_cache.json',
+    'IMAGE_CATALOG_FILE': 'image_catalog.json',
+    'MEDIA_REGISTRY_FILE': 'media_registry.json',
+    'LLM_LATENCY_HISTORY_FILE': 'llm_latency_history.json',
+    'TELEMETRY_FILE': 'telemetry_runs.jsonl',
+    'METRICS_STATE_FILE': 'metrics_state.json',
+    'IMAGE_CACHE_DIR': 'image_cache'
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the article pipeline on recorded HTTP traffic")
+    parser.add_argument('mode', choices=('record', 'replay'))
+    parser.add_argument('source', choices=sorted(SOURCES))
+    parser.add_argument('--runs', type=int, default=3, help="replay runs (record always runs once)")
+    parser.add_argument('--cassette', help="default: cassettes/pipeline_<source>.json")
+    parser.add_argument('--latency-ms', type=float, default=0, help="added to every replayed response")
+    parser.add_argument('--latency-scale', type=float, default=0, help="times each response's recorded time")
+    parser.add_argument('--seed', type=int, default=42, help="article and image choices are random")
+    parser.add_argument('--verbose', action='store_true', help="show the pipeline's own output")
+    return parser.parse_args()
+
+
+def configure(args, state_dir):
+    """Settings are read when config is imported, so this runs before any project import"""
+    os.environ['HTTP_REPLAY_MODE'] = args.mode
+    os.environ['HTTP_CASSETTE'] = args.cassette or os.path.join('cassettes', f"pipeline_{args.source}.json")
+    os.environ['HTTP_REPLAY_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['HTTP_REPLAY_LATENCY_SCALE'] = str(args.latency_scale)
+    os.environ['TELEMETRY_ENABLED'] = 'true'
+    # A resumed checkpoint or a hedged rewrite would make runs take different paths
+    os.environ['CHECKPOINTS_ENABLED'] = 'false'
+    os.environ['LLM_HEDGE_ENABLED'] = 'false'
+    if args.mode == 'replay':
+        os.environ.setdefault('SCRAPE_DELAY_SECONDS', '0')
+        os.environ.setdefault('ANTHROPIC_API_KEY', 'replay')
+    for name, file_name in STATE_FILES.items():
+        os.environ[name] = os.path.join(state_dir, file_name)
+
+
+def slowest_spans(record, count=4):
+    spans = sorted(record['spans'], key=lambda s: s['duration_ms'], reverse=True)[:count]
+    return ", ".join(f"{s['name']} {s['duration_ms'] / 1000:.2f}s" for s in spans)
+
+
+def main():
+    args = parse_args()
+    if args.mode == 'record':
+        args.runs = 1
+    state_dir = tempfile.mkdtemp(prefix='benchmark_pipeline_')
+    configure(args, state_dir)
+    if args.mode == 'replay' and not os.path.exists(os.environ['HTTP_CASSETTE']):
+        sys.exit(f"No cassette at {os.environ['HTTP_CASSETTE']}, run: python benchmark_pipeline.py record {args.source}")
+
+    import importlib
+    import http_replay
+    import telemetry
+    from database_article_tracker import DatabaseArticleTracker
+    from image_manager import ImageManager
+
+    class OfflineArticleTracker(DatabaseArticleTracker):
+        """Every article is unused and nothing is saved, so each run picks the same one"""
+
+        def get_connection(self):
+            return None
+
+    module_name, class_name, method_name = SOURCES[args.source]
+    output = None if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(output or sys.stdout):
+        cassette = http_replay.get_cassette()
+        processor = getattr(importlib.import_module(module_name), class_name)()
+        processor.article_tracker = processor.article_pipeline.article_tracker = OfflineArticleTracker()
+        image_manager = ImageManager()
+
+    print(f"{args.mode.title()} {args.source}: cassette {os.environ['HTTP_CASSETTE']}, state in {state_dir}")
+    if args.mode == 'replay':
+        print(f"Artificial latency: {args.latency_ms:.0f} ms + {args.latency_scale}x recorded time per response")
+
+    timings = []
+    titles = set()
+    for run in range(args.runs):
+        cassette.rewind()
+        misses = len(cassette.misses)
+        random.seed(args.seed)
+        with contextlib.redirect_stdout(output or sys.stdout):
+            telemetry.start_run(f"benchmark_{args.source}")
+            started = time.perf_counter()
+            article = getattr(processor, method_name)(image_manager=image_manager)
+            seconds = time.perf_counter() - started
+            record = telemetry.finish_run('ok' if article else 'failed')
+        timings.append(seconds)
+        titles.add(article['title'] if article else None)
+        title = f"'{article['title'][:50]}'" if article else "no article"
+        print(f"Run {run + 1}: {seconds:.2f}s, {title}")
+        if record:
+            print(f"  Slowest: {slowest_spans(record)}")
+        missed = cassette.misses[misses:]
+        if missed:
+            print(f"  ⚠️ {len(missed)} requests not in the cassette (retried or failed), first: {missed[0]}")
+
+    if args.mode == 'record':
+        cassette.save()
+        return
+
+    warm = timings[1:]
+    summary = f"Cold run {timings[0]:.2f}s"
+    if warm:
+        summary += f", warm runs median {statistics.median(warm):.2f}s (min {min(warm):.2f}s)"
+    print(summary)
+    if len(titles) > 1 or None in titles:
+        print("⚠️ Runs produced different (or no) articles, the cassette may need recording again")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,36 @@
-import requests
 from bs4 import BeautifulSoup
-from anthropic import Anthropic
-from config import ANTHROPIC_API_KEY, WP_TAG_MAPPING
+from config import WP_TAG_MAPPING, SCRAPE_DELAY_SECONDS
+from llm_gateway import get_llm_gateway
 from database_article_tracker import DatabaseArticleTracker as ArticleTracker
 from internal_linking import InternalLinking
 from external_linking import ExternalLinking
+from content_condenser import ContentCondenser
+from article_pipeline import ArticlePipeline
+from http_session import get_http_session
+import metrics
+import telemetry
 import random
 import time
 from datetime import datetime, timedelta
 
 class CanadianNewsProcessor:
     def __init__(self):
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.llm = get_llm_gateway()
         self.article_tracker = ArticleTracker()
+        self.http = get_http_session()
         self.internal_linking = InternalLinking()
         self.external_linking = ExternalLinking()
-        # Only process articles from last 2 weeks
-        self.cutoff_date = datetime.now() - timedelta(days=14)
+        self.content_condenser = ContentCondenser()
+        self.article_pipeline = ArticlePipeline(self.internal_linking, self.external_linking, self.article_tracker,
+                                                source='canadian')
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
     def is_article_too_old(self, article_data):
         """Check if article is older than 2 weeks"""
+        # Computed per call: the scheduler daemon keeps one processor for days
+        cutoff_date = datetime.now() - timedelta(days=14)
         title = article_data.get('title', '')
         content = article_data.get('content', '')
         
@@ -55,7 +63,7 @@ class CanadianNewsProcessor:
                         month = month_map[month_name]
                         article_date = datetime(year, month, day)
                         
-                        if article_date < self.cutoff_date:
+                        if article_date < cutoff_date:
                             print(f"Skipping old article from {article_date.date()}: {title[:50]}...")
                             return True
                 except (ValueError, IndexError):
@@ -64,6 +72,7 @@ class CanadianNewsProcessor:
         # If no date found, assume it's recent enough
         return False
     
+    @telemetry.traced('scrape.stratcann')
     def scrape_stratcann_articles(self):
         """Scrape articles from StratCann - FIXED to catch all article patterns"""
         articles = []
@@ -71,7 +80,7 @@ class CanadianNewsProcessor:
         
         try:
             print("Scraping from StratCann...")
-            response = requests.get('https://stratcann.com/news/', headers=self.headers, timeout=15)
+            response = self.http.get('https://stratcann.com/news/', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -123,6 +132,7 @@ class CanadianNewsProcessor:
                         print(f"  Found StratCann article: {text[:60]}...")
                 
                 # Randomize and process articles
+                metrics.scraped('stratcann', 'seen', len(article_links))
                 random.shuffle(article_links)
                 for article_link in article_links[:5]:
                     # Check if already used in JSON file
@@ -131,6 +141,7 @@ class CanadianNewsProcessor:
                         continue
                         
                     content = self.extract_generic_content(article_link['url'])
+                    metrics.scraped('stratcann', 'fetched')
                     if content and len(content.split()) >= 200:
                         article_data = {
                             'url': article_link['url'],
@@ -145,21 +156,23 @@ class CanadianNewsProcessor:
                         if self.is_article_too_old(article_data):
                             continue
                         
+                        metrics.scraped('stratcann', 'accepted')
                         articles.append(article_data)
                         print(f"  ✓ Added StratCann article: {article_link['title'][:50]}... ({len(content.split())} words)")
-                    time.sleep(2)
+                    time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping StratCann: {e}")
         
         return articles
     
+    @telemetry.traced('scrape.new_cannabis_ventures')
     def scrape_newcannabisventures_articles(self):
         """Scrape articles from New Cannabis Ventures Canada"""
         articles = []
         try:
             print("Scraping from New Cannabis Ventures Canada...")
-            response = requests.get('https://www.newcannabisventures.com/category/canada/', headers=self.headers, timeout=15)
+            response = self.http.get('https://www.newcannabisventures.com/category/canada/', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -184,6 +197,7 @@ class CanadianNewsProcessor:
                         print(f"  Found NCV article: {text[:60]}...")
                 
                 # Randomize and process articles
+                metrics.scraped('newcannabisventures', 'seen', len(article_links))
                 random.shuffle(article_links)
                 for article_link in article_links[:5]:
                     # Check if already used in JSON file
@@ -192,6 +206,7 @@ class CanadianNewsProcessor:
                         continue
                         
                     content = self.extract_generic_content(article_link['url'])
+                    metrics.scraped('newcannabisventures', 'fetched')
                     if content and len(content.split()) >= 200:
                         article_data = {
                             'url': article_link['url'],
@@ -206,21 +221,23 @@ class CanadianNewsProcessor:
                         if self.is_article_too_old(article_data):
                             continue
                         
+                        metrics.scraped('newcannabisventures', 'accepted')
                         articles.append(article_data)
                         print(f"  ✓ Added NCV article: {article_link['title'][:50]}... ({len(content.split())} words)")
-                    time.sleep(2)
+                    time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping New Cannabis Ventures: {e}")
         
         return articles
     
+    @telemetry.traced('scrape.health_canada')
     def scrape_health_canada_updates(self):
         """Scrape articles from Health Canada"""
         articles = []
         try:
             print("Scraping from Health Canada...")
-            response = requests.get('https://www.canada.ca/en/health-canada/services/drugs-medication/cannabis/industry-licensees-applicants/updates-cannabis-industrial-hemp.html', headers=self.headers, timeout=15)
+            response = self.http.get('https://www.canada.ca/en/health-canada/services/drugs-medication/cannabis/industry-licensees-applicants/updates-cannabis-industrial-hemp.html', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -243,11 +260,13 @@ class CanadianNewsProcessor:
                             'cannabis' in href.lower() and
                             len(text) > 10):
                             
+                            metrics.scraped('health_canada', 'seen')
                             # Check if already used in JSON file
                             if self.article_tracker.is_article_used(href):
                                 continue
                                 
                             content = self.extract_generic_content(href)
+                            metrics.scraped('health_canada', 'fetched')
                             if content and len(content.split()) >= 200:
                                 article_data = {
                                     'url': href,
@@ -262,16 +281,18 @@ class CanadianNewsProcessor:
                                 if self.is_article_too_old(article_data):
                                     continue
                                 
+                                metrics.scraped('health_canada', 'accepted')
                                 articles.append(article_data)
                                 print(f"  ✓ Added Health Canada article: {text[:50]}... ({len(content.split())} words)")
                                 break
-                            time.sleep(2)
+                            time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping Health Canada: {e}")
         
         return articles
     
+    @telemetry.traced('scrape.international_cbc')
     def scrape_internationalcbc_articles(self):
         """Scrape articles from International CBC - FIXED: articles are at root level, not /blog/"""
         articles = []
@@ -280,7 +301,7 @@ class CanadianNewsProcessor:
         try:
             print("Scraping from International CBC...")
             # FIXED: Scrape from homepage - articles are linked from here at root level
-            response = requests.get('https://internationalcbc.com/', headers=self.headers, timeout=15)
+            response = self.http.get('https://internationalcbc.com/', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -336,6 +357,7 @@ class CanadianNewsProcessor:
                         print(f"  Found International CBC article: {text[:60]}...")
                 
                 # Randomize and process articles
+                metrics.scraped('internationalcbc', 'seen', len(article_links))
                 random.shuffle(article_links)
                 for article_link in article_links[:5]:
                     # Check if already used in JSON file
@@ -344,6 +366,7 @@ class CanadianNewsProcessor:
                         continue
                         
                     content = self.extract_generic_content(article_link['url'])
+                    metrics.scraped('internationalcbc', 'fetched')
                     # Require at least 300 words
                     if content and len(content.split()) >= 300:
                         article_data = {
@@ -359,20 +382,22 @@ class CanadianNewsProcessor:
                         if self.is_article_too_old(article_data):
                             continue
                         
+                        metrics.scraped('internationalcbc', 'accepted')
                         articles.append(article_data)
                         print(f"  ✓ Added International CBC article: {article_link['title'][:50]}... ({len(content.split())} words)")
-                    time.sleep(2)
+                    time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping International CBC: {e}")
         
         return articles
     
+    @telemetry.traced('extract.article')
     def extract_generic_content(self, url):
         """Extract content from any Canadian cannabis news article"""
         try:
             print(f"    Extracting content from: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = self.http.get(url, headers=self.headers, timeout=15)
             if response.status_code != 200:
                 print(f"    Failed to fetch {url} (status: {response.status_code})")
                 return None
@@ -409,7 +434,7 @@ class CanadianNewsProcessor:
                             substantial_paragraphs.append(text)
                     
                     if substantial_paragraphs:
-                        clean_text = ' '.join(substantial_paragraphs)
+                        clean_text = '\n\n'.join(substantial_paragraphs)
                         word_count = len(clean_text.split())
                         
                         if word_count >= 200:
@@ -423,6 +448,7 @@ class CanadianNewsProcessor:
             print(f"    ✗ Error extracting content from {url}: {e}")
             return None
     
+    @telemetry.traced('scrape')
     def scrape_canadian_articles(self):
         """Main scraping method for Canadian cannabis news"""
         print("Scraping Canadian cannabis news sources...")
@@ -440,6 +466,7 @@ class CanadianNewsProcessor:
         
         return unused_articles
     
+    @telemetry.traced('choose_article')
     def choose_best_article(self, articles):
         """Choose the best article from scraped Canadian content"""
         if not articles:
@@ -456,13 +483,13 @@ class CanadianNewsProcessor:
         print(f"Chose Canadian article: {chosen['title'][:50]}... ({chosen['word_count']} words from {chosen['source']})")
         return chosen
     
-    def rewrite_canadian_article(self, original_article):
-        """Rewrite Canadian cannabis article in Canadian English"""
-        
-        print(f"Rewriting Canadian article with Claude...")
-        
+    def build_rewrite_prompt(self, original_article):
+        """Build the Claude prompt used to rewrite an article"""
         original_title = original_article['title']
-        original_content = original_article['content']
+        original_content, condense_stats = self.content_condenser.condense(original_article['content'], original_title)
+        original_article['input_tokens_saved'] = condense_stats['tokens_saved']
+        print(f"Condensed source text: {condense_stats['original_tokens']} -> {condense_stats['condensed_tokens']} tokens "
+              f"(saved {condense_stats['tokens_saved']} input tokens)")
         target_word_count = original_article['word_count']
         source = original_article['source']
         
@@ -471,7 +498,7 @@ class CanadianNewsProcessor:
 
         ORIGINAL ARTICLE:
         Title: {original_title}
-        Content: {original_content[:2000]}...
+        Content: {original_content}
         Source: {source}
         Original Word Count: {target_word_count}
 
@@ -509,17 +536,32 @@ class CanadianNewsProcessor:
         Write the content with proper HTML formatting including <h2>, <h3> tags for headings and <p> tags for paragraphs. DO NOT include any <h1> tags as WordPress will use the title as H1.
         """
         
+        return prompt
+    
+    @telemetry.traced('claude.rewrite')
+    def rewrite_canadian_article(self, original_article, cancel_event=None, max_tokens=3000):
+        """Rewrite Canadian cannabis article in Canadian English"""
+        
+        print(f"Rewriting Canadian article with Claude...")
+        
+        prompt = self.build_rewrite_prompt(original_article)
+        
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5",
-                max_tokens=3000,
-                messages=[{"role": "user", "content": prompt}]
+            response = self.llm.create_message(
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                purpose='rewrite',
+                cancel_event=cancel_event
             )
             
             print("✓ Received response from Claude")
             claude_response = response.content[0].text
             
             parsed = self.parse_canadian_response(claude_response)
+            # 'max_tokens' means the article was cut off mid-sentence
+            parsed['stop_reason'] = getattr(response, 'stop_reason', None)
+            if parsed['stop_reason'] == 'max_tokens':
+                print(f"⚠️ Rewrite hit the {max_tokens} token limit and is truncated")
             print(f"Parsed Canadian response - Title: {parsed.get('title', 'NO TITLE')}")
             print(f"Parsed Canadian response - Content length: {len(parsed.get('content', ''))}")
             
@@ -567,10 +609,19 @@ class CanadianNewsProcessor:
         
         return result
     
-    def get_canadian_article(self):
-        """Main method to get and rewrite a Canadian cannabis article"""
+    @telemetry.traced('news.get_article')
+    def get_canadian_article(self, image_manager=None, checkpointed=False):
+        """Main method to get and rewrite a Canadian cannabis article
+
+        checkpointed is for callers that queue the article in the outbox, which closes its checkpoint.
+        """
         print("=== STARTING CANADIAN CANNABIS ARTICLE GENERATION ===")
         
+        # An article an earlier run marked used but didn't finish comes before a new scrape
+        resumed = checkpointed and self.article_pipeline.resume_next(self.rewrite_canadian_article, image_manager)
+        if resumed:
+            return resumed
+        
         articles = self.scrape_canadian_articles()
         
         if not articles:
@@ -592,43 +643,21 @@ class CanadianNewsProcessor:
             chosen_article['category']
         )
         
-        print("Extracting external links from original Canadian article...")
-        original_external_links = self.external_linking.extract_links_from_original(chosen_article['url'])
-        
+        # Harvest original links, rewrite, add internal/external links (and upload
+        # the featured image) with independent stages running concurrently
         print(f"Rewriting Canadian article: {chosen_article['title'][:50]}...")
-        rewritten = self.rewrite_canadian_article(chosen_article)
+        rewritten = self.article_pipeline.run(
+            chosen_article,
+            self.rewrite_canadian_article,
+            primary_tag='Canadian Cannabis News',
+            tag_field='secondary_tag',
+            image_manager=image_manager,
+            image_category='canadian',
+            alternates=articles,
+            checkpointed=checkpointed
+        )
         
         if rewritten:
-            print("✓ Canadian article generation completed successfully")
-            
-            secondary_tag = rewritten.get('secondary_tag', 'business')
-            rewritten['tags'] = ['Canadian Cannabis News', secondary_tag]
-            
-            if 'secondary_tag' in rewritten:
-                del rewritten['secondary_tag']
-            
-            print("Adding internal links to Canadian article...")
-            rewritten['content'] = self.internal_linking.add_internal_links(
-                rewritten['content'], 
-                rewritten['title']
-            )
-            
-            additional_sources = self.external_linking.find_additional_sources(
-                rewritten['content'], 
-                rewritten['title'], 
-                len(original_external_links)
-            )
-            
-            all_external_links = original_external_links + additional_sources
-            
-            if all_external_links:
-                rewritten['content'] = self.external_linking.add_external_links_to_content(
-                    rewritten['content'], 
-                    all_external_links
-                )
-            
-            rewritten['original_url'] = chosen_article['url']
-            
             print(f"Canadian article will be tagged with: {', '.join(rewritten['tags'])}")
         else:
             print("✗ Canadian article generation failed")
@@ -26,12 +26,107 @@ CANNABIS_NEWS_SOURCES = {
 
 # Content settings
 NEWS_POSTS_PER_DAY = 5
+REWRITE_INPUT_TOKEN_BUDGET = int(os.getenv('REWRITE_INPUT_TOKEN_BUDGET', '700'))  # Source text sent to the rewrite prompt
 POSTING_HOURS = [9, 12, 15, 18, 21]  # Times to post (24hr format)
 
+# WordPress client (shared session, timeouts, retries)
+WP_CONNECT_TIMEOUT = float(os.getenv('WP_CONNECT_TIMEOUT', '5'))  # Seconds
+WP_READ_TIMEOUT = float(os.getenv('WP_READ_TIMEOUT', '30'))  # Seconds
+WP_UPLOAD_TIMEOUT = float(os.getenv('WP_UPLOAD_TIMEOUT', '120'))  # Seconds, media uploads
+WP_MAX_RETRIES = int(os.getenv('WP_MAX_RETRIES', '3'))
+WP_RETRY_BASE_DELAY = float(os.getenv('WP_RETRY_BASE_DELAY', '1'))  # Seconds
+WP_RETRY_MAX_DELAY = float(os.getenv('WP_RETRY_MAX_DELAY', '30'))  # Seconds, a longer Retry-After isn't retried
+WP_BATCH_ENABLED = os.getenv('WP_BATCH_ENABLED', 'true').lower() == 'true'  # Group writes through /batch/v1
+
+# Internal linking and taxonomy caches
+ARTICLE_CATALOG_FILE = os.getenv('ARTICLE_CATALOG_FILE', 'article_catalog.json')  # Existing posts used for internal links
+ARTICLE_CATALOG_POST_TYPES = ['news', 'cannabis-lifestyle']
+ARTICLE_CATALOG_FULL_SYNC_DAYS = int(os.getenv('ARTICLE_CATALOG_FULL_SYNC_DAYS', '7'))  # Full resync drops deleted posts
+RELEVANCE_INDEX_FILE = os.getenv('RELEVANCE_INDEX_FILE', 'relevance_index.json')  # BM25 index over the catalog
+RELATED_LINKS_TOP_K = int(os.getenv('RELATED_LINKS_TOP_K', '3'))  # Extra links to the most relevant existing posts
+RELATED_LINKS_MIN_SCORE = float(os.getenv('RELATED_LINKS_MIN_SCORE', '5'))  # BM25 score below which a post isn't suggested
+RELATED_LINKS_MIN_ANCHOR_IDF = float(os.getenv('RELATED_LINKS_MIN_ANCHOR_IDF', '2'))  # Single-word anchors must be this rare
+TAXONOMY_CACHE_FILE = os.getenv('TAXONOMY_CACHE_FILE', 'taxonomy_cache.json')  # Category/tag slug -> ID
+
+# Featured images
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'image_cache')  # Optimized copies of images/, named by content hash
+IMAGE_MAX_WIDTH = int(os.getenv('IMAGE_MAX_WIDTH', '1200'))  # Theme featured image size
+IMAGE_MAX_HEIGHT = int(os.getenv('IMAGE_MAX_HEIGHT', '675'))
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'webp')
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+IMAGE_CATALOG_FILE = os.getenv('IMAGE_CATALOG_FILE', 'image_catalog.json')  # Index of images/ with last-used times
+MEDIA_REGISTRY_FILE = os.getenv('MEDIA_REGISTRY_FILE', 'media_registry.json')  # Image hash -> uploaded media ID
+MEDIA_VERIFY_HOURS = float(os.getenv('MEDIA_VERIFY_HOURS', '24'))  # Recheck a reused media ID after this long
+
+# Publish outbox (generated posts waiting for their slot)
+OUTBOX_DB_FILE = os.getenv('OUTBOX_DB_FILE', 'outbox.db')
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))  # Then the post is marked failed
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv('OUTBOX_RETRY_BASE_DELAY', '300'))  # Seconds, doubles per attempt
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv('OUTBOX_RETRY_MAX_DELAY', '21600'))  # Seconds
+OUTBOX_PUBLISH_INTERVAL = float(os.getenv('OUTBOX_PUBLISH_INTERVAL', '10'))  # Minimum seconds between posts
+OUTBOX_MAX_PER_RUN = int(os.getenv('OUTBOX_MAX_PER_RUN', '10'))
+OUTBOX_CLAIM_TIMEOUT = float(os.getenv('OUTBOX_CLAIM_TIMEOUT', '900'))  # Seconds before a stuck claim is released
+
+# Article checkpoints (pipeline state saved after every stage, in the outbox database)
+CHECKPOINTS_ENABLED = os.getenv('CHECKPOINTS_ENABLED', 'true').lower() == 'true'
+CHECKPOINT_MAX_ATTEMPTS = int(os.getenv('CHECKPOINT_MAX_ATTEMPTS', '3'))  # Then the article is abandoned
+CHECKPOINT_STALE_MINUTES = float(os.getenv('CHECKPOINT_STALE_MINUTES', '30'))  # A running article untouched this long is resumed
+
+# Post batch (python main.py post_batch N: one scrape, N articles)
+POST_BATCH_CONCURRENCY = int(os.getenv('POST_BATCH_CONCURRENCY', '3'))  # Articles rewritten at the same time
+POST_BATCH_SPACING_MINUTES = float(os.getenv('POST_BATCH_SPACING_MINUTES', '60'))  # Gap between posts with --spaced
+
+# Scheduler daemon (python main.py daemon)
+DAEMON_SOURCES = os.getenv('DAEMON_SOURCES', 'us,canadian,us_2').split(',')  # Rotated across POSTING_HOURS
+DAEMON_GENERATE_LEAD_MINUTES = int(os.getenv('DAEMON_GENERATE_LEAD_MINUTES', '45'))  # Generate this long before a slot
+DAEMON_JITTER_MINUTES = float(os.getenv('DAEMON_JITTER_MINUTES', '10'))  # Publish up to this long after a slot
+DAEMON_RETRY_INTERVAL_MINUTES = int(os.getenv('DAEMON_RETRY_INTERVAL_MINUTES', '15'))  # Retry failed posts, 0 disables
+DAEMON_HEALTH_PORT = int(os.getenv('DAEMON_HEALTH_PORT', os.getenv('PORT', '8080')))  # 0 disables /health
+DAEMON_HEALTH_HOST = os.getenv('DAEMON_HEALTH_HOST', '127.0.0.1')  # 0.0.0.0 when a platform health check needs it
+
+# Run telemetry (spans per stage, one JSON record per run)
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+TELEMETRY_FILE = os.getenv('TELEMETRY_FILE', 'telemetry_runs.jsonl')
+OTLP_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')  # e.g. http://localhost:4318, unset disables export
+OTLP_SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', 'auto-posting')
+
+# Prometheus metrics (served on the daemon's /metrics, or written as a textfile after each cron run)
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')  # e.g. /var/lib/node_exporter/textfile/autoposting.prom, empty disables
+METRICS_STATE_FILE = os.getenv('METRICS_STATE_FILE', 'metrics_state.json')  # Counter totals carried between cron runs
+METRICS_MAX_DOMAINS = int(os.getenv('METRICS_MAX_DOMAINS', '100'))  # Later domains are counted as 'other'
+
+# Recorded HTTP traffic (news sites, WordPress, Claude) for offline benchmark runs
+HTTP_REPLAY_MODE = os.getenv('HTTP_REPLAY_MODE', 'off')  # 'record' saves every response, 'replay' never touches the network
+HTTP_CASSETTE = os.getenv('HTTP_CASSETTE', 'cassettes/pipeline.json')
+HTTP_REPLAY_LATENCY_MS = float(os.getenv('HTTP_REPLAY_LATENCY_MS', '0'))  # Added to every replayed response
+HTTP_REPLAY_LATENCY_SCALE = float(os.getenv('HTTP_REPLAY_LATENCY_SCALE', '0'))  # x recorded response time, 1 = as recorded
+SCRAPE_DELAY_SECONDS = float(os.getenv('SCRAPE_DELAY_SECONDS', '2'))  # Politeness pause between article fetches
+
 # WordPress categories and tags
 WP_CANNABIS_NEWS_CATEGORY = 'Cannabis News'
 WP_TAG_MAPPING = {
     'business': 'Cannabis-business',
     'culture': 'culture', 
     'politics': 'politics'
-}
\ No newline at end of file
+}
+
+# Claude settings (shared by every processor through llm_gateway)
+ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL')  # Point at a local stub server for tests
+CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-sonnet-4-5')
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '2'))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '30000'))  # 0 disables the limiter
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '2'))  # Seconds
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '60'))  # Seconds
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '120'))  # Seconds
+LLM_BATCH_POLL_INTERVAL = float(os.getenv('LLM_BATCH_POLL_INTERVAL', '60'))  # Seconds between batch status checks
+LLM_BATCH_TIMEOUT = float(os.getenv('LLM_BATCH_TIMEOUT', '86400'))  # Batches expire after 24 hours
+LLM_LATENCY_HISTORY_FILE = os.getenv('LLM_LATENCY_HISTORY_FILE', 'llm_latency_history.json')
+
+# Hedged rewrites: fire a second request when the first is slower than usual
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '90'))  # Deadline = this latency percentile
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '10'))  # Below this, use the default deadline
+LLM_HEDGE_DEFAULT_DEADLINE = float(os.getenv('LLM_HEDGE_DEFAULT_DEADLINE', '90'))  # Seconds
+LLM_HEDGE_MAX_TOKENS = int(os.getenv('LLM_HEDGE_MAX_TOKENS', '2500'))  # Output token cap for the hedge request
+LLM_HEDGE_TARGET = os.getenv('LLM_HEDGE_TARGET', 'same')  # 'same' article or 'alternate' candidate
@@ -0,0 +1,171 @@
+import math
+import re
+from collections import Counter
+from config import REWRITE_INPUT_TOKEN_BUDGET
+from llm_gateway import estimate_tokens
+
+MONTH = r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+
+# Paragraphs that carry no news value (newsletter blurbs, bylines, "published" stamps, ads).
+# Each pattern has to match the whole paragraph, so a news sentence that merely
+# mentions a sponsor, cookies or a subscription is kept.
+BOILERPLATE_PATTERNS = [
+    r'(published|updated|posted)(\s+on)?:?\s+(' + MONTH + r'\s+\d{1,2}(,?\s+\d{4})?|\d{1,2}/\d{1,2}/\d{2,4})[^.]{0,40}',
+    r'(published|updated|posted\s+)?\d+\s+(minutes?|hours?|days?)\s+ago',
+    r'(sign up|subscribe)( now| today)?( to| for) (our|the|a) [^.]{0,60}newsletter\b.{0,150}',
+    r'(get|receive) [^.]{0,60}newsletter in your inbox\b.{0,100}',
+    r'(subscribe|sign up)( now| today| here)?[.!]?',
+    r'follow us on [^.]{0,60}',
+    r'share (this|on) [^.]{0,40}',
+    r'remove ads',
+    r'advertisement',
+    r'sponsored( content| post)?',
+    r'.{0,300}\b(on|via) patreon\b.{0,300}',
+    r'read more( here)?[:.]?',
+    r'(click|tap) here\b.{0,150}',
+    r'.{0,80}\ball rights reserved\.?',
+    r'(this (site|website) uses|we use) cookies\b.{0,200}',
+    r'by [a-z]+ [a-z]+',
+    r'(photo|image) (courtesy|by|credit)\b.{0,150}'
+]
+
+STOPWORDS = set("""
+a an and are as at be been but by for from has have he her his i in is it its of on or our she
+that the their them they this to was we were which who will with would said says also more than
+""".split())
+
+DUPLICATE_THRESHOLD = 0.8
+# Split single-block articles into chunks of this many sentences
+SENTENCES_PER_CHUNK = 3
+
+
+class ContentCondenser:
+    """Trim scraped article text to a token budget, keeping the most informative paragraphs
+
+    The budget is measured with estimate_tokens (about 4 characters per token,
+    the heuristic the gateway's rate limiter uses), not a real tokenizer; pass
+    token_counter to count exactly.
+    """
+
+    def __init__(self, token_budget=REWRITE_INPUT_TOKEN_BUDGET, token_counter=estimate_tokens):
+        self.token_budget = token_budget
+        self.count_tokens = token_counter
+        self.boilerplate_regex = re.compile('|'.join(f'(?:{p})' for p in BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+    def split_units(self, content):
+        """Split content into paragraphs, falling back to sentence chunks for single-block text"""
+        paragraphs = [p.strip() for p in re.split(r'\n\s*\n', content) if p.strip()]
+
+        if len(paragraphs) > 1:
+            return paragraphs
+
+        sentences = re.split(r'(?:(?<=[.!?])|(?<=[.!?]["”]))\s+(?=[A-Z"“])', content.strip())
+        return [
+            ' '.join(sentences[i:i + SENTENCES_PER_CHUNK])
+            for i in range(0, len(sentences), SENTENCES_PER_CHUNK)
+            if ' '.join(sentences[i:i + SENTENCES_PER_CHUNK]).strip()
+        ]
+
+    def tokenize(self, text):
+        return re.findall(r"[a-z0-9$%']+", text.lower())
+
+    def shingles(self, words):
+        if len(words) < 3:
+            return set(words)
+        return set(tuple(words[i:i + 3]) for i in range(len(words) - 2))
+
+    def is_boilerplate(self, paragraph):
+        return bool(self.boilerplate_regex.fullmatch(paragraph.strip()))
+
+    def score_units(self, units, title):
+        """Score each paragraph by how much distinct, concrete information it carries"""
+        unit_terms = [[w for w in self.tokenize(u) if w not in STOPWORDS] for u in units]
+        document_frequency = Counter()
+        for terms in unit_terms:
+            document_frequency.update(set(terms))
+
+        title_terms = set(w for w in self.tokenize(title) if w not in STOPWORDS)
+        total_units = len(units)
+        scores = []
+
+        for position, (unit, terms) in enumerate(zip(units, unit_terms)):
+            if not terms:
+                scores.append(0.0)
+                continue
+
+            unique_terms = set(terms)
+            # Terms that appear in few paragraphs are what make this paragraph distinct
+            rarity = sum(math.log(1 + total_units / document_frequency[t]) for t in unique_terms)
+            score = rarity / math.sqrt(len(terms))
+
+            score += 0.5 * len(re.findall(r'\$?\d[\d,.]*%?', unit))  # Figures, dates, amounts
+            score += 0.3 * len(re.findall(r'(?<=[a-z,;]\s)[A-Z][a-z]+', unit))  # Named entities
+            score += 1.0 if re.search(r'["“].{15,}?["”]', unit) else 0.0  # Quotes
+            score += 1.5 * len(unique_terms & title_terms)
+            score += 2.0 if position == 0 else 1.0 / (1 + position)  # The lead carries the story
+
+            scores.append(score)
+
+        return scores
+
+    def condense(self, content, title=''):
+        """Return condensed text plus token statistics"""
+        original_tokens = self.count_tokens(content)
+        stats = {
+            'original_tokens': original_tokens,
+            'condensed_tokens': original_tokens,
+            'tokens_saved': 0,
+            'dropped_boilerplate': 0,
+            'dropped_duplicates': 0,
+            'dropped_low_rank': 0
+        }
+
+        if not content:
+            return content, stats
+
+        units = []
+        seen_shingles = []
+        for unit in self.split_units(content):
+            if self.is_boilerplate(unit):
+                stats['dropped_boilerplate'] += 1
+                continue
+
+            unit_shingles = self.shingles(self.tokenize(unit))
+            if any(
+                unit_shingles and len(unit_shingles & other) / len(unit_shingles | other) >= DUPLICATE_THRESHOLD
+                for other in seen_shingles
+            ):
+                stats['dropped_duplicates'] += 1
+                continue
+
+            seen_shingles.append(unit_shingles)
+            units.append(unit)
+
+        scores = self.score_units(units, title)
+        ranked = sorted(range(len(units)), key=lambda i: scores[i], reverse=True)
+
+        selected = set()
+        used_tokens = 0
+        for index in ranked:
+            unit_tokens = self.count_tokens(units[index]) + 1
+            if used_tokens + unit_tokens <= self.token_budget:
+                selected.add(index)
+                used_tokens += unit_tokens
+
+        # Nothing fit whole: keep the best paragraph cut at a sentence boundary
+        if not selected and units:
+            best = ranked[0]
+            kept = []
+            for sentence in re.split(r'(?<=[.!?])\s+', units[best]):
+                if self.count_tokens(' '.join(kept + [sentence])) > self.token_budget:
+                    break
+                kept.append(sentence)
+            units[best] = ' '.join(kept) or units[best][:self.token_budget * 4]
+            selected.add(best)
+
+        stats['dropped_low_rank'] = len(units) - len(selected)
+        condensed = '\n\n'.join(units[i] for i in sorted(selected))
+
+        stats['condensed_tokens'] = self.count_tokens(condensed)
+        stats['tokens_saved'] = max(0, original_tokens - stats['condensed_tokens'])
+        return condensed, stats
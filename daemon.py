@@ -0,0 +1,192 @@
+import json
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import schedule
+from config import (
+    POSTING_HOURS, DAEMON_SOURCES, DAEMON_JITTER_MINUTES, DAEMON_GENERATE_LEAD_MINUTES,
+    DAEMON_RETRY_INTERVAL_MINUTES, DAEMON_HEALTH_PORT, DAEMON_HEALTH_HOST
+)
+from llm_gateway import get_llm_gateway
+from wordpress_client import get_wordpress_client
+import metrics
+import telemetry
+
+
+class SchedulerDaemon:
+    """Long-running replacement for the per-post cron processes
+
+    One ContentAutomation (processors, WordPress client, caches) stays warm for
+    every job. Ahead of each POSTING_HOURS slot an article is generated into the
+    outbox; at the slot, plus a random jitter, the due posts are published.
+    """
+
+    def __init__(self, automation, sources=DAEMON_SOURCES, health_port=DAEMON_HEALTH_PORT,
+                 health_host=DAEMON_HEALTH_HOST):
+        self.automation = automation
+        self.sources = sources
+        self.health_port = health_port
+        self.health_host = health_host
+        self.scheduler = schedule.Scheduler()
+        self.stop_event = threading.Event()
+        self.health_server = None
+
+        self.status_lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.current_job = None
+        self.jobs = {}
+
+    def generators(self):
+        return {
+            'us': self.automation.post_us_news_content,
+            'us_2': self.automation.post_us_news_content_2,
+            'canadian': self.automation.post_canadian_news_content
+        }
+
+    def run_job(self, name, func, *args):
+        """Run a scheduled job, recording the outcome for /health; errors never stop the daemon"""
+        if self.stop_event.is_set():
+            return
+        with self.status_lock:
+            self.current_job = name
+            job = self.jobs.setdefault(name, {'runs': 0, 'failures': 0})
+            job['last_started'] = datetime.now().isoformat()
+
+        started = time.monotonic()
+        telemetry.start_run(name)
+        try:
+            result = func(*args)
+            error = None
+        except Exception as e:
+            print(f"❌ Job {name} failed: {e}")
+            result, error = None, str(e)
+        telemetry.finish_run('error' if error else ('failed' if result is False else 'ok'), error)
+
+        with self.status_lock:
+            self.current_job = None
+            job['runs'] += 1
+            job['last_finished'] = datetime.now().isoformat()
+            job['last_seconds'] = round(time.monotonic() - started, 1)
+            job['last_result'] = result
+            job['last_error'] = error
+            if error or result is False:
+                job['failures'] += 1
+
+    def generate_for_slot(self, source, hour):
+        """Generate one article into the outbox for the coming slot, unless the slot is already filled"""
+        slot = self.automation.outbox.next_posting_slots(1)[0]
+        if slot.hour != hour:
+            print(f"{hour:02d}:00 slot already has a queued post, not generating")
+            return True
+
+        print(f"=== GENERATING {source.upper()} ARTICLE FOR {hour:02d}:00 - {datetime.now()} ===")
+        self.automation.refresh_caches()
+        success = self.generators()[source](publish_now=False)
+        get_llm_gateway().print_usage_summary()
+        return success
+
+    def publish_slot(self, hour):
+        """Publish due posts a random few minutes after the slot"""
+        delay = random.uniform(0, DAEMON_JITTER_MINUTES * 60)
+        print(f"Publishing {hour:02d}:00 slot in {delay / 60:.1f} minutes")
+        if self.stop_event.wait(delay):
+            return None
+
+        print(f"=== QUEUED POST PUBLISHING - {datetime.now()} ===")
+        published = self.automation.publish_queued_content()
+        get_wordpress_client().print_usage_summary()
+        return published
+
+    def retry_failed(self):
+        """Publish posts whose earlier attempt failed and whose retry time has come"""
+        return self.automation.publish_queued_content(retries_only=True)
+
+    def schedule_jobs(self):
+        for index, hour in enumerate(sorted(POSTING_HOURS)):
+            source = self.sources[index % len(self.sources)]
+            generate_at = datetime(2000, 1, 1, hour) - timedelta(minutes=DAEMON_GENERATE_LEAD_MINUTES)
+            self.scheduler.every().day.at(generate_at.strftime('%H:%M')).do(
+                self.run_job, f"generate_{hour:02d}", self.generate_for_slot, source, hour
+            )
+            self.scheduler.every().day.at(f"{hour:02d}:00").do(
+                self.run_job, f"publish_{hour:02d}", self.publish_slot, hour
+            )
+        if DAEMON_RETRY_INTERVAL_MINUTES:
+            self.scheduler.every(DAEMON_RETRY_INTERVAL_MINUTES).minutes.do(
+                self.run_job, 'retry_failed', self.retry_failed
+            )
+
+    def get_health(self):
+        """Status served on /health"""
+        with self.status_lock:
+            jobs = json.loads(json.dumps(self.jobs))
+            current_job = self.current_job
+        next_run = self.scheduler.next_run
+        return {
+            'status': 'stopping' if self.stop_event.is_set() else 'ok',
+            'started_at': self.started_at.isoformat(),
+            'uptime_seconds': round((datetime.now() - self.started_at).total_seconds()),
+            'current_job': current_job,
+            'next_run': next_run.isoformat() if next_run else None,
+            'jobs': jobs,
+            'outbox': self.automation.outbox.get_stats()
+        }
+
+    def start_health_server(self):
+        if not self.health_port:
+            return
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.rstrip('/')
+                if path == '/metrics':
+                    self.send_payload(200, 'text/plain; version=0.0.4; charset=utf-8', metrics.render().encode())
+                    return
+                if path not in ('', '/health'):
+                    self.send_error(404)
+                    return
+                health = daemon.get_health()
+                payload = json.dumps(health, indent=2).encode()
+                self.send_payload(200 if health['status'] == 'ok' else 503, 'application/json', payload)
+
+            def send_payload(self, status, content_type, payload):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.health_server = ThreadingHTTPServer((self.health_host, self.health_port), HealthHandler)
+        threading.Thread(target=self.health_server.serve_forever, daemon=True).start()
+        print(f"✓ Health endpoint on http://{self.health_host}:{self.health_port}/health (Prometheus metrics on /metrics)")
+
+    def handle_signal(self, signum, frame):
+        print(f"Received {signal.Signals(signum).name}, finishing the current job and stopping...")
+        self.stop_event.set()
+
+    def run(self):
+        """Run until SIGTERM or SIGINT; a job in progress is allowed to finish"""
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        self.schedule_jobs()
+        self.start_health_server()
+
+        # Anything left due from before the daemon started (e.g. a WordPress outage)
+        self.run_job('startup_publish', self.automation.publish_queued_content)
+        print(f"✓ Scheduler running, next job at {self.scheduler.next_run}")
+
+        while not self.stop_event.is_set():
+            self.scheduler.run_pending()
+            idle = self.scheduler.idle_seconds
+            self.stop_event.wait(min(max(idle or 0, 1), 60))
+
+        if self.health_server:
+            self.health_server.shutdown()
+        print("✅ Scheduler stopped")
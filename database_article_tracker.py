@@ -1,19 +1,24 @@
 
 import os
-import psycopg2
+import threading
 from datetime import datetime, timedelta
 import re
+import metrics
+
+# Databases whose table was already created by this process
+_initialized_databases = set()
+_init_lock = threading.Lock()
 
 class DatabaseArticleTracker:
     def __init__(self):
         # Railway automatically provides DATABASE_URL
         self.database_url = os.getenv('DATABASE_URL')
-        self.cutoff_date = datetime.now() - timedelta(days=14)
         self.init_database()
     
     def get_connection(self):
         """Get database connection"""
         try:
+            import psycopg2
             conn = psycopg2.connect(self.database_url)
             return conn
         except Exception as e:
@@ -21,11 +26,19 @@ class DatabaseArticleTracker:
             return None
     
     def init_database(self):
-        """Create table if it doesn't exist"""
+        """Create table if it doesn't exist (once per process, however many trackers are built)"""
+        with _init_lock:
+            if self.database_url in _initialized_databases:
+                return
+            self.create_table()
+    
+    def create_table(self):
+        """Run the DDL"""
         try:
             conn = self.get_connection()
             if conn:
                 cursor = conn.cursor()
+                metrics.TRACKER_QUERIES.inc(operation='create_table')
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS used_articles (
                         id SERIAL PRIMARY KEY,
@@ -39,6 +52,7 @@ class DatabaseArticleTracker:
                 conn.commit()
                 cursor.close()
                 conn.close()
+                _initialized_databases.add(self.database_url)
                 print("Database table initialized")
         except Exception as e:
             print(f"Error initializing database: {e}")
@@ -49,6 +63,7 @@ class DatabaseArticleTracker:
             conn = self.get_connection()
             if conn:
                 cursor = conn.cursor()
+                metrics.TRACKER_QUERIES.inc(operation='is_article_used')
                 cursor.execute("SELECT COUNT(*) FROM used_articles WHERE url = %s", (article_url,))
                 count = cursor.fetchone()[0]
                 cursor.close()
@@ -60,6 +75,8 @@ class DatabaseArticleTracker:
     
     def is_article_too_old(self, article_data):
         """Check if article is older than 2 weeks"""
+        # Computed per call: the scheduler daemon keeps one processor for days
+        cutoff_date = datetime.now() - timedelta(days=14)
         title = article_data.get('title', '')
         content = article_data.get('content', '')
         
@@ -89,7 +106,7 @@ class DatabaseArticleTracker:
                         month = month_map[month_name]
                         article_date = datetime(year, month, day)
                         
-                        if article_date < self.cutoff_date:
+                        if article_date < cutoff_date:
                             print(f"Skipping old article from {article_date.date()}: {title[:50]}...")
                             return True
                 except (ValueError, IndexError):
@@ -103,6 +120,7 @@ class DatabaseArticleTracker:
             conn = self.get_connection()
             if conn:
                 cursor = conn.cursor()
+                metrics.TRACKER_QUERIES.inc(operation='mark_article_used')
                 cursor.execute("""
                     INSERT INTO used_articles (url, title, category) 
                     VALUES (%s, %s, %s)
@@ -121,6 +139,7 @@ class DatabaseArticleTracker:
             conn = self.get_connection()
             if conn:
                 cursor = conn.cursor()
+                metrics.TRACKER_QUERIES.inc(operation='update_wordpress_id')
                 cursor.execute("""
                     UPDATE used_articles 
                     SET wordpress_post_id = %s 
@@ -158,6 +177,8 @@ class DatabaseArticleTracker:
             if conn:
                 cursor = conn.cursor()
                 
+                metrics.TRACKER_QUERIES.inc(2, operation='get_stats')
+                
                 # Total count
                 cursor.execute("SELECT COUNT(*) FROM used_articles")
                 total_used = cursor.fetchone()[0]
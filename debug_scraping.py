@@ -1,4 +1,4 @@
-import requests
+from http_session import get_http_session
 from bs4 import BeautifulSoup
 from config import CANNABIS_NEWS_SOURCES
 
@@ -12,7 +12,7 @@ for category, urls in CANNABIS_NEWS_SOURCES.items():
         
         try:
             # Test basic connection
-            response = requests.get(hub_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+            response = get_http_session().get(hub_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
             print(f"Status code: {response.status_code}")
             
             if response.status_code == 200:
@@ -59,7 +59,7 @@ for test_url in test_urls:
     print(f"\nTesting content extraction from: {test_url}")
     
     try:
-        response = requests.get(test_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+        response = get_http_session().get(test_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
             
@@ -1,5 +1,5 @@
 from news_processor import CannabisNewsProcessor
-import requests
+from http_session import get_http_session
 from bs4 import BeautifulSoup
 
 processor = CannabisNewsProcessor()
@@ -21,7 +21,7 @@ for category, url in categories.items():
     
     try:
         # Get the page
-        response = requests.get(url, headers=processor.headers, timeout=15)
+        response = get_http_session().get(url, headers=processor.headers, timeout=15)
         print(f"Status code: {response.status_code}")
         
         if response.status_code == 200:
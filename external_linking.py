@@ -1,13 +1,16 @@
-import requests
 from bs4 import BeautifulSoup
-from anthropic import Anthropic
-from config import ANTHROPIC_API_KEY
+from llm_gateway import get_llm_gateway
+from link_applier import LinkApplier
+from http_session import get_http_session
+import telemetry
 import re
 import time
 
 class ExternalLinking:
    def __init__(self):
-       self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+       self.llm = get_llm_gateway()
+       self.link_applier = LinkApplier()
+       self.http = get_http_session()
        self.headers = {
            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
        }
@@ -33,12 +36,13 @@ class ExternalLinking:
            'reddit.com'
        ]
    
+   @telemetry.traced('external_links.harvest')
    def extract_links_from_original(self, original_url):
        """Extract external links from the original article"""
        print(f"Extracting external links from original article...")
        
        try:
-           response = requests.get(original_url, headers=self.headers, timeout=15)
+           response = self.http.get(original_url, headers=self.headers, timeout=15)
            if response.status_code != 200:
                print(f"Failed to fetch original article: {response.status_code}")
                return []
@@ -82,16 +86,8 @@ class ExternalLinking:
            print(f"Error extracting links from original: {e}")
            return []
    
-   def find_additional_sources(self, article_content, article_title, existing_links_count):
-       """Use Claude to find additional reliable sources"""
-       needed_links = max(1, 3 - existing_links_count)  # Ensure at least 1, max 3 total
-       
-       if needed_links <= 0:
-           print("Already have enough external links")
-           return []
-       
-       print(f"Looking for {needed_links} additional reliable sources...")
-       
+   def build_sources_prompt(self, article_content, article_title, needed_links):
+       """Build the Claude prompt that asks for additional sources"""
        prompt = f"""
        You are a fact-checker and researcher. Based on this cannabis news article, find {needed_links} reliable external sources that would add credibility and context to the article.
 
@@ -113,11 +109,26 @@ class ExternalLinking:
        Only provide as many sources as needed ({needed_links}). Focus on quality over quantity.
        """
        
+       return prompt
+   
+   @telemetry.traced('external_links.find_sources')
+   def find_additional_sources(self, article_content, article_title, existing_links_count):
+       """Use Claude to find additional reliable sources"""
+       needed_links = max(1, 3 - existing_links_count)  # Ensure at least 1, max 3 total
+       
+       if needed_links <= 0:
+           print("Already have enough external links")
+           return []
+       
+       print(f"Looking for {needed_links} additional reliable sources...")
+       
+       prompt = self.build_sources_prompt(article_content, article_title, needed_links)
+       
        try:
-           response = self.client.messages.create(
-               model="claude-sonnet-4-20250514",
+           response = self.llm.create_message(
                max_tokens=1000,
-               messages=[{"role": "user", "content": prompt}]
+               messages=[{"role": "user", "content": prompt}],
+               purpose='find_sources'
            )
            
            claude_response = response.content[0].text
@@ -160,6 +171,7 @@ class ExternalLinking:
        
        return sources
    
+   @telemetry.traced('external_links.validate')
    def validate_source(self, source):
        """Validate that a source is accessible and not excluded"""
        url = source['url']
@@ -171,7 +183,7 @@ class ExternalLinking:
        
        # Try to access the URL
        try:
-           response = requests.head(url, headers=self.headers, timeout=10)
+           response = self.http.head(url, headers=self.headers, timeout=10)
            if response.status_code in [200, 301, 302]:
                print(f"  ✓ Validated source: {url}")
                return True
@@ -182,15 +194,8 @@ class ExternalLinking:
            print(f"  ✗ Could not access source: {url} - {e}")
            return False
    
-   def add_external_links_to_content(self, content, external_links):
-       """Add external links to the article content"""
-       if not external_links:
-           print("No external links to add")
-           return content
-       
-       print(f"Adding {len(external_links)} external links to content...")
-       
-       # Use Claude to intelligently place the links
+   def build_link_placement_prompt(self, content, external_links):
+       """Build the Claude prompt that places external links into the content"""
        links_info = []
        for i, link in enumerate(external_links):
            links_info.append(f"LINK {i+1}: {link['url']} - {link.get('description', link.get('text', 'Source'))}")
@@ -215,18 +220,50 @@ class ExternalLinking:
        Return the complete article content with the external links added naturally.
        """
        
+       return prompt
+   
+   def place_links_by_anchor_text(self, content, external_links):
+       """Link the links whose anchor text appears in the content, returns (content, links still to place)"""
+       planned = [(link['text'], link['url']) for link in external_links if link.get('source') == 'original_article']
+       if not planned:
+           return content, external_links
+       
+       linked_content, applied = self.link_applier.apply(content, planned, attributes='target="_blank" rel="noopener"')
+       applied_urls = set(url for phrase, url in applied)
+       for phrase, url in applied:
+           print(f"  ✓ Added: {url} (anchor text '{phrase}')")
+       
+       return linked_content, [link for link in external_links if link['url'] not in applied_urls]
+   
+   @telemetry.traced('external_links.place')
+   def add_external_links_to_content(self, content, external_links):
+       """Add external links to the article content"""
+       if not external_links:
+           print("No external links to add")
+           return content
+       
+       print(f"Adding {len(external_links)} external links to content...")
+       
+       # Links whose original anchor text survived the rewrite are placed directly
+       content, remaining_links = self.place_links_by_anchor_text(content, external_links)
+       if not remaining_links:
+           return content
+       
+       # Use Claude to intelligently place the rest
+       prompt = self.build_link_placement_prompt(content, remaining_links)
+       
        try:
-           response = self.client.messages.create(
-               model="claude-sonnet-4-20250514",
+           response = self.llm.create_message(
                max_tokens=4000,
-               messages=[{"role": "user", "content": prompt}]
+               messages=[{"role": "user", "content": prompt}],
+               purpose='place_links'
            )
            
            linked_content = response.content[0].text
            print(f"✓ Added external links to content")
            
            # Show what links were added
-           for link in external_links:
+           for link in remaining_links:
                if link['url'] in linked_content:
                    print(f"  ✓ Added: {link['url']}")
                else:
@@ -0,0 +1,250 @@
+import atexit
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config import HTTP_REPLAY_MODE, HTTP_CASSETTE, HTTP_REPLAY_LATENCY_MS, HTTP_REPLAY_LATENCY_SCALE
+
+# Bodies are stored decoded, so these no longer describe them
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')
+
+
+def normalize_url(url):
+    """Query parameters in a fixed order, so the same request always has the same key"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def body_digest(body):
+    if body is None:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, bytes):
+        return None  # A streamed upload, matched on method and URL only
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def encode_body(content):
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(content).decode()}
+
+
+def decode_body(stored):
+    if 'base64' in stored:
+        return base64.b64decode(stored['base64'])
+    return stored['text'].encode('utf-8')
+
+
+class ReplayMissError(Exception):
+    """A request with no recorded response (replay never goes to the network)"""
+
+
+class Cassette:
+    """Recorded HTTP exchanges in one JSON file
+
+    Requests are matched on method, URL and body; when the body differs
+    (multipart boundaries, a changed prompt) the next exchange with the same
+    method and URL is used. Repeats of a request get its recordings in order,
+    then the last one again.
+    """
+
+    def __init__(self, path=HTTP_CASSETTE, latency_ms=HTTP_REPLAY_LATENCY_MS, latency_scale=HTTP_REPLAY_LATENCY_SCALE):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.by_request = {}
+        self.by_url = {}
+        self.positions = {}
+        self.misses = []
+        self.dirty = False
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.interactions = json.load(f)['interactions']
+        for index, interaction in enumerate(self.interactions):
+            request = interaction['request']
+            self.by_request.setdefault((request['method'], request['url'], request['body']), []).append(index)
+            self.by_url.setdefault((request['method'], request['url']), []).append(index)
+        print(f"✓ Replaying {len(self.interactions)} recorded HTTP responses from {self.path}")
+
+    def rewind(self):
+        """Start handing out recordings from the beginning again (one benchmark run each)"""
+        with self.lock:
+            self.positions = {}
+
+    def record(self, method, url, body, status, reason, headers, content, final_url, seconds):
+        headers = {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+        with self.lock:
+            self.interactions.append({
+                'request': {'method': method, 'url': normalize_url(url), 'body': body_digest(body)},
+                'response': dict(
+                    encode_body(content),
+                    status=status, reason=reason, headers=headers, url=final_url, seconds=round(seconds, 4)
+                )
+            })
+            self.dirty = True
+
+    def next_from(self, key, indexes):
+        position = self.positions.get(key, 0)
+        self.positions[key] = position + 1
+        return self.interactions[indexes[min(position, len(indexes) - 1)]]
+
+    def find(self, method, url, body):
+        """The recorded response for a request, after the artificial latency"""
+        url = normalize_url(url)
+        digest = body_digest(body)
+        with self.lock:
+            strict = self.by_request.get((method, url, digest))
+            if strict:
+                interaction = self.next_from(('body', method, url, digest), strict)
+            elif self.by_url.get((method, url)):
+                interaction = self.next_from(('url', method, url), self.by_url[(method, url)])
+            else:
+                self.misses.append(f"{method} {url}")
+                raise ReplayMissError(f"No recorded response for {method} {url}")
+
+        response = interaction['response']
+        delay = self.latency_ms / 1000 + self.latency_scale * response['seconds']
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_file = f"{self.path}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'interactions': self.interactions}, f, indent=1)
+            os.replace(temp_file, self.path)
+            self.dirty = False
+        print(f"✓ Recorded {len(self.interactions)} HTTP responses to {self.path}")
+
+
+class ReplayAdapter(HTTPAdapter):
+    """requests adapter that records every response to the cassette, or answers from it"""
+
+    def __init__(self, cassette, mode, **kwargs):
+        self.cassette = cassette
+        self.mode = mode
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.mode == 'record':
+            started = time.monotonic()
+            response = super().send(request, **kwargs)
+            self.cassette.record(
+                request.method, request.url, request.body, response.status_code, response.reason,
+                response.headers, response.content, response.url, time.monotonic() - started
+            )
+            return response
+
+        try:
+            stored = self.cassette.find(request.method, request.url, request.body)
+        except ReplayMissError as e:
+            raise requests.ConnectionError(str(e), request=request)
+
+        response = requests.Response()
+        response.status_code = stored['status']
+        response.reason = stored['reason']
+        response.headers = CaseInsensitiveDict(stored['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = decode_body(stored)
+        response.url = stored['url'] or request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=stored['seconds'])
+        return response
+
+
+def create_replay_transport(cassette, mode):
+    """httpx transport for the Anthropic client (httpx comes with the SDK, so it's imported here)"""
+    import httpx
+
+    class ReplayTransport(httpx.BaseTransport):
+        """Records or replays Claude calls; streamed responses are read in full while recording"""
+
+        def __init__(self):
+            self.transport = httpx.HTTPTransport() if mode == 'record' else None
+
+        def handle_request(self, request):
+            body = request.read()
+            if mode == 'record':
+                started = time.monotonic()
+                response = self.transport.handle_request(request)
+                try:
+                    content = response.read()
+                finally:
+                    response.close()
+                headers = self.clean(response.headers)
+                cassette.record(
+                    request.method, str(request.url), body, response.status_code, response.reason_phrase,
+                    headers, content, str(request.url), time.monotonic() - started
+                )
+                return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+            try:
+                stored = cassette.find(request.method, str(request.url), body)
+            except ReplayMissError as e:
+                raise httpx.ConnectError(str(e), request=request)
+            return httpx.Response(stored['status'], headers=stored['headers'], content=decode_body(stored), request=request)
+
+        def clean(self, headers):
+            return {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+
+        def close(self):
+            if self.transport:
+                self.transport.close()
+
+    return ReplayTransport()
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Get the process-wide cassette (None unless HTTP_REPLAY_MODE is record or replay)"""
+    global _cassette
+    if HTTP_REPLAY_MODE not in ('record', 'replay'):
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette()
+            if HTTP_REPLAY_MODE == 'replay':
+                _cassette.load()
+            else:
+                print(f"✓ Recording HTTP responses to {HTTP_CASSETTE}")
+                atexit.register(_cassette.save)
+        return _cassette
+
+
+def create_adapter(**kwargs):
+    """HTTPAdapter for a session, recording or replaying when HTTP_REPLAY_MODE says so"""
+    cassette = get_cassette()
+    if cassette is None:
+        return HTTPAdapter(**kwargs)
+    return ReplayAdapter(cassette, HTTP_REPLAY_MODE, **kwargs)
+
+
+def create_llm_http_client():
+    """httpx client for the Anthropic SDK, or None to let the SDK build its own"""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    from anthropic import DefaultHttpxClient
+    return DefaultHttpxClient(transport=create_replay_transport(cassette, HTTP_REPLAY_MODE))
@@ -0,0 +1,38 @@
+import threading
+import requests
+import http_replay
+import metrics
+import telemetry
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def count_response(response, *args, **kwargs):
+    """Count each scraper request and its body size on the current telemetry span and in the metrics"""
+    telemetry.add('http.requests')
+    telemetry.add('http.bytes', len(response.content))
+    metrics.observe_response(response)
+
+
+def create_http_session():
+    """Pooled session for scraping news sites and checking source links"""
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = http_replay.create_adapter(pool_connections=20, pool_maxsize=10)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(count_response)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Get the process-wide scraper session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_http_session()
+        return _session
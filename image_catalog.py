@@ -0,0 +1,152 @@
+import json
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from config import IMAGE_CATALOG_FILE
+from media_registry import file_sha256
+
+try:
+    from PIL import Image
+except ImportError:  # Dimensions are optional metadata
+    Image = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif')
+ALL_IMAGES = '*'
+
+
+def category_from_filename(file_name):
+    """'cannabis-politics-12.jpg' -> 'politics'; anything else is 'general'"""
+    match = re.match(r'cannabis-([a-z]+)', file_name.lower())
+    return match.group(1) if match else 'general'
+
+
+class ImageCatalog:
+    """Persisted index of the images folder with least-recently-used selection per category
+
+    The folder is only rescanned when its mtime changes, and unchanged files keep
+    their hash and dimensions. Files with identical content are picked as one image.
+    """
+
+    def __init__(self, images_folder, index_file=IMAGE_CATALOG_FILE):
+        self.images_folder = images_folder
+        self.index_file = index_file
+        self.lock = threading.RLock()
+        self.index = self.load_index()
+        self.buckets = {}  # category -> OrderedDict of file names, least recently used first
+
+        self.refresh()
+
+    def load_index(self):
+        """Load the image index from file"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading image catalog: {e}")
+        return {'folder_mtime': None, 'images': {}}
+
+    def save_index(self):
+        """Save the image index atomically"""
+        temp_file = f"{self.index_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"Error saving image catalog: {e}")
+
+    def read_dimensions(self, path):
+        if Image is None:
+            return None, None
+        try:
+            with Image.open(path) as image:
+                return image.width, image.height
+        except Exception:
+            return None, None
+
+    def refresh(self):
+        """Rescan the folder if it changed since the last scan, then rebuild the selection buckets"""
+        with self.lock:
+            if not os.path.exists(self.images_folder):
+                print(f"Images folder not found: {self.images_folder}")
+                self.buckets = {}
+                return
+
+            folder_mtime = os.stat(self.images_folder).st_mtime
+            if folder_mtime != self.index['folder_mtime'] or not self.buckets:
+                if folder_mtime != self.index['folder_mtime']:
+                    self.scan(folder_mtime)
+                self.build_buckets()
+
+    def scan(self, folder_mtime):
+        """Index new or changed files and drop deleted ones"""
+        known = self.index['images']
+        present = set()
+
+        for file_name in os.listdir(self.images_folder):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            present.add(file_name)
+
+            path = os.path.join(self.images_folder, file_name)
+            stat = os.stat(path)
+            entry = known.get(file_name)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+
+            width, height = self.read_dimensions(path)
+            known[file_name] = {
+                'category': category_from_filename(file_name),
+                'hash': file_sha256(path),
+                'width': width,
+                'height': height,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'last_used': entry['last_used'] if entry else None
+            }
+
+        for file_name in set(known) - present:
+            del known[file_name]
+
+        self.index['folder_mtime'] = folder_mtime
+        self.save_index()
+        print(f"✓ Indexed {len(known)} images")
+
+    def build_buckets(self):
+        """Order each category's images by last use (never-used first, in random order)"""
+        images = self.index['images']
+        unique = {}
+        for file_name in sorted(images):
+            unique.setdefault(images[file_name]['hash'], file_name)
+
+        never_used = [f for f in unique.values() if not images[f]['last_used']]
+        random.shuffle(never_used)
+        used = sorted((f for f in unique.values() if images[f]['last_used']), key=lambda f: images[f]['last_used'])
+
+        self.buckets = {ALL_IMAGES: OrderedDict()}
+        for file_name in never_used + used:
+            self.buckets[ALL_IMAGES][file_name] = None
+            self.buckets.setdefault(images[file_name]['category'], OrderedDict())[file_name] = None
+
+    def choose(self, category):
+        """Return the least recently used image path for a category (any category if none match)"""
+        with self.lock:
+            self.refresh()
+            bucket = self.buckets.get(category.lower()) or self.buckets.get(ALL_IMAGES)
+            if not bucket:
+                return None
+
+            file_name = next(iter(bucket))
+            self.buckets[ALL_IMAGES].move_to_end(file_name)
+            self.buckets[self.index['images'][file_name]['category']].move_to_end(file_name)
+
+            self.index['images'][file_name]['last_used'] = datetime.now().isoformat()
+            self.save_index()
+            return os.path.join(self.images_folder, file_name)
+
+    def count(self, category=ALL_IMAGES):
+        return len(self.buckets.get(category, ()))
@@ -1,49 +1,38 @@
 import os
-import random
-import requests
-import base64
-from config import WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD
+from wordpress_client import get_wordpress_client
+from media_registry import MediaRegistry, file_sha256
+from image_optimizer import ImageOptimizer
+from image_catalog import ImageCatalog, IMAGE_EXTENSIONS
+import telemetry
 
 class ImageManager:
     def __init__(self):
         self.images_folder = "images"
-        self.base_url = f"{WORDPRESS_URL}/wp-json/wp/v2"
-        credentials = f"{WORDPRESS_USERNAME}:{WORDPRESS_PASSWORD}"
-        token = base64.b64encode(credentials.encode()).decode()
-        self.headers = {
-            'Authorization': f'Basic {token}'
-        }
+        self.client = get_wordpress_client()
+        self.media_registry = MediaRegistry(self.client)
+        self.image_optimizer = ImageOptimizer()
+        self.last_upload_bytes = (0, 0)  # (original file, actually uploaded) for the last image
+        self.image_extensions = IMAGE_EXTENSIONS
+        self.image_catalog = None
     
     def get_random_image_for_category(self, category):
-        """Get a random image that matches the category"""
-        if not os.path.exists(self.images_folder):
-            print(f"Images folder not found: {self.images_folder}")
-            return None
-        
-        # Look for images that match the category (now includes .avif)
-        all_images = [f for f in os.listdir(self.images_folder) 
-                     if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.avif'))]
+        """Get the least recently used image that matches the category"""
+        if self.image_catalog is None:
+            self.image_catalog = ImageCatalog(self.images_folder)
         
-        if not all_images:
+        chosen_path = self.image_catalog.choose(category)
+        if not chosen_path:
             print("No images found in images folder")
             return None
         
-        print(f"Found {len(all_images)} total images")
+        category_count = self.image_catalog.count(category.lower())
+        if category_count:
+            print(f"Found {category_count} images for category '{category}'")
+        else:
+            print(f"No category-specific images, using least recently used of all {self.image_catalog.count()} images")
         
-        # Filter by category if possible
-        category_images = [img for img in all_images if category.lower() in img.lower()]
-        print(f"Found {len(category_images)} images for category '{category}'")
-        
-        # If no category-specific images, use any image
-        if not category_images:
-            print(f"No category-specific images, using random image from all {len(all_images)} images")
-            category_images = all_images
-        
-        # Return random image path
-        chosen_image = random.choice(category_images)
-        full_path = os.path.join(self.images_folder, chosen_image)
-        print(f"Chose image: {chosen_image}")
-        return full_path
+        print(f"Chose image: {os.path.basename(chosen_path)}")
+        return chosen_path
     
     def get_mime_type(self, image_path):
         """Determine MIME type based on file extension"""
@@ -57,35 +46,41 @@ class ImageManager:
         }
         return mime_types.get(ext, 'image/jpeg')
     
+    @telemetry.traced('image.upload')
     def upload_image_to_wordpress(self, image_path, title="Cannabis News Image"):
-        """Upload image to WordPress media library"""
+        """Upload image to WordPress media library, reusing an earlier upload of the same file"""
         try:
-            print(f"Uploading image: {image_path}")
+            # Resized, transcoded copy from the local cache (the original if Pillow is missing)
+            upload_path, original_bytes, upload_bytes = self.image_optimizer.optimize(image_path)
+            upload_name = os.path.splitext(os.path.basename(image_path))[0] + os.path.splitext(upload_path)[1]
+            
+            content_hash = file_sha256(upload_path)
+            media_id = self.media_registry.get_media_id(content_hash)
+            if media_id:
+                print(f"✓ Reusing uploaded image {os.path.basename(image_path)} (media ID: {media_id})")
+                self.last_upload_bytes = (original_bytes, 0)
+                return media_id
+            
+            print(f"Uploading image: {image_path} ({original_bytes // 1024} KB -> {upload_bytes // 1024} KB)")
             
             # Get the correct MIME type for this image
-            mime_type = self.get_mime_type(image_path)
+            mime_type = self.get_mime_type(upload_path)
             print(f"Detected MIME type: {mime_type}")
             
-            with open(image_path, 'rb') as img_file:
-                files = {
-                    'file': (os.path.basename(image_path), img_file, mime_type)
-                }
-                
+            with open(upload_path, 'rb') as img_file:
                 data = {
                     'title': title,
                     'alt_text': title
                 }
                 
-                response = requests.post(
-                    f"{self.base_url}/media",
-                    files=files,
-                    data=data,
-                    headers={'Authorization': self.headers['Authorization']}
-                )
+                response = self.client.upload_media(upload_name, img_file, mime_type, data)
                 
                 if response.status_code == 201:
                     media_data = response.json()
                     print(f"✓ Uploaded image with ID: {media_data['id']}")
+                    self.media_registry.record(content_hash, media_data['id'], upload_name)
+                    self.last_upload_bytes = (original_bytes, upload_bytes)
+                    telemetry.add('image.bytes_uploaded', upload_bytes)
                     return media_data['id']
                 else:
                     print(f"✗ Failed to upload image: {response.status_code}")
@@ -96,6 +91,7 @@ class ImageManager:
             print(f"Error uploading image: {e}")
             return None
     
+    @telemetry.traced('image.featured')
     def get_featured_image_for_article(self, category, article_title):
         """Get and upload a featured image for an article"""
         print(f"Getting featured image for category: {category}")
@@ -109,6 +105,38 @@ class ImageManager:
         
         # Upload to WordPress
         image_title = f"{category.title()} Cannabis News - {article_title[:50]}"
+        self.last_upload_bytes = (0, 0)
         media_id = self.upload_image_to_wordpress(image_path, image_title)
         
+        original_bytes, uploaded_bytes = self.last_upload_bytes
+        if media_id:
+            print(f"Image bytes for this post: {original_bytes // 1024} KB original, {uploaded_bytes // 1024} KB uploaded")
+        
         return media_id
+    
+    def preupload_images(self):
+        """Upload every library image that isn't in WordPress yet, returns (uploaded, reused, failed)"""
+        if not os.path.exists(self.images_folder):
+            print(f"Images folder not found: {self.images_folder}")
+            return 0, 0, 0
+        
+        uploaded = reused = failed = 0
+        for file_name in sorted(os.listdir(self.images_folder)):
+            if not file_name.lower().endswith(self.image_extensions):
+                continue
+            
+            image_path = os.path.join(self.images_folder, file_name)
+            # The registry is keyed by the optimized file's hash (the optimizer caches its output)
+            upload_path = self.image_optimizer.optimize(image_path)[0]
+            if self.media_registry.get_media_id(file_sha256(upload_path)):
+                reused += 1
+                continue
+            
+            title = os.path.splitext(file_name)[0].replace('-', ' ').title()
+            if self.upload_image_to_wordpress(image_path, title):
+                uploaded += 1
+            else:
+                failed += 1
+        
+        print(f"Pre-upload finished: {uploaded} uploaded, {reused} already in WordPress, {failed} failed")
+        return uploaded, reused, failed
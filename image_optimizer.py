@@ -0,0 +1,81 @@
+import hashlib
+import os
+from config import IMAGE_CACHE_DIR, IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT, IMAGE_FORMAT, IMAGE_QUALITY
+import metrics
+import telemetry
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are uploaded as-is
+    Image = None
+
+FORMAT_EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg', 'avif': '.avif'}
+
+
+class ImageOptimizer:
+    """Resize, transcode and strip metadata before upload, caching the result by content hash"""
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_width=IMAGE_MAX_WIDTH, max_height=IMAGE_MAX_HEIGHT,
+                 image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+        self.cache_dir = cache_dir
+        self.size = (max_width, max_height)
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.enabled = Image is not None
+        if not self.enabled:
+            print("⚠️ Pillow not installed, images will be uploaded without optimization")
+
+    def cache_path(self, image_path):
+        """Cached output path: source hash plus every setting that changes the output"""
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        width, height = self.size
+        name = f"{digest.hexdigest()[:24]}-{width}x{height}-q{self.quality}"
+        return os.path.join(self.cache_dir, name + FORMAT_EXTENSIONS.get(self.image_format, '.' + self.image_format))
+
+    def convert(self, image_path, output_path):
+        """Write the optimized copy of image_path to output_path"""
+        with Image.open(image_path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            if self.image_format == 'jpeg' and image.mode == 'RGBA':
+                image = image.convert('RGB')
+
+            width, height = self.size
+            if image.width > width and image.height > height:
+                # Fill the featured image box exactly, cropping from the centre
+                image = ImageOps.fit(image, self.size, Image.LANCZOS)
+            else:
+                image.thumbnail(self.size, Image.LANCZOS)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{output_path}.tmp"
+            # Saving a fresh image without exif/icc arguments drops the source metadata
+            image.save(temp_path, format=self.image_format.upper(), quality=self.quality, optimize=True)
+            os.replace(temp_path, output_path)
+
+    @telemetry.traced('image.optimize')
+    def optimize(self, image_path):
+        """Return (path to upload, original bytes, upload bytes); falls back to the original file"""
+        original_bytes = os.path.getsize(image_path)
+        if not self.enabled:
+            return image_path, original_bytes, original_bytes
+
+        try:
+            output_path = self.cache_path(image_path)
+            cached = os.path.exists(output_path)
+            metrics.cache_lookup('optimized_images', cached)
+            if not cached:
+                self.convert(image_path, output_path)
+
+            optimized_bytes = os.path.getsize(output_path)
+            if optimized_bytes >= original_bytes:
+                return image_path, original_bytes, original_bytes
+            return output_path, original_bytes, optimized_bytes
+
+        except Exception as e:
+            print(f"⚠️ Could not optimize {image_path}, uploading original: {e}")
+            return image_path, original_bytes, original_bytes
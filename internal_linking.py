@@ -1,18 +1,16 @@
 import re
-import requests
-import base64
-from config import WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD
+import html
+from config import RELATED_LINKS_TOP_K, RELATED_LINKS_MIN_SCORE, RELATED_LINKS_MIN_ANCHOR_IDF
+from keyword_matcher import KeywordMatcher
+from phrase_index import TitlePhraseIndex
+from article_catalog import get_article_catalog
+from link_applier import LinkApplier
+from relevance_index import get_relevance_index, tokenize, STOPWORDS
+import metrics
+import telemetry
 
 class InternalLinking:
    def __init__(self):
-       self.base_url = f"{WORDPRESS_URL}/wp-json/wp/v2"
-       credentials = f"{WORDPRESS_USERNAME}:{WORDPRESS_PASSWORD}"
-       token = base64.b64encode(credentials.encode()).decode()
-       self.headers = {
-           'Authorization': f'Basic {token}',
-           'Content-Type': 'application/json'
-       }
-       
        # Static internal links (ordered by specificity - more specific first)
        self.static_links = {
            'https://budscannacorner.ca/cannabis-blog/thc-vs-cbd-vs-cbn-vs-cbg-effects-benefits-and-key-differences/': [
@@ -62,52 +60,43 @@ class InternalLinking:
            ]
        }
        
-       # Cache for existing articles
+       self.build_keyword_matcher()
+       
+       # Cache for existing articles and the phrase index built from their titles
        self.existing_articles_cache = None
+       self.title_phrase_index = None
+       
+       self.link_applier = LinkApplier()
+   
+   def build_keyword_matcher(self):
+       """Compile static_links into one multi-keyword matcher (call again after changing static_links)"""
+       self.static_keyword_plan = [
+           (url, [(keyword, keyword.lower()) for keyword in keywords])
+           for url, keywords in self.static_links.items()
+       ]
+       self.keyword_matcher = KeywordMatcher(
+           keyword for keywords in self.static_links.values() for keyword in keywords
+       )
    
+   @telemetry.traced('internal_links.load_articles')
    def get_existing_articles(self):
        """Get existing articles from WordPress for internal linking"""
+       metrics.cache_lookup('internal_link_articles', self.existing_articles_cache is not None)
        if self.existing_articles_cache is not None:
            return self.existing_articles_cache
        
        try:
-           print("Fetching existing articles for internal linking...")
+           print("Loading existing articles for internal linking...")
            
-           # Get news articles
-           news_response = requests.get(
-               f"{self.base_url}/news?per_page=50",
-               headers=self.headers,
-               timeout=10
-           )
+           # News and cannabis lifestyle posts from the shared on-disk catalog (synced incrementally)
+           articles = get_article_catalog().get_articles()
            
-           articles = []
-           
-           if news_response.status_code == 200:
-               news_articles = news_response.json()
-               for article in news_articles:
-                   articles.append({
-                       'title': article['title']['rendered'],
-                       'url': article['link'],
-                       'excerpt': article['excerpt']['rendered'][:200] if article['excerpt']['rendered'] else ''
-                   })
-           
-           # Get cannabis lifestyle articles
-           lifestyle_response = requests.get(
-               f"{self.base_url}/cannabis-lifestyle?per_page=50",
-               headers=self.headers,
-               timeout=10
-           )
-           
-           if lifestyle_response.status_code == 200:
-               lifestyle_articles = lifestyle_response.json()
-               for article in lifestyle_articles:
-                   articles.append({
-                       'title': article['title']['rendered'],
-                       'url': article['link'],
-                       'excerpt': article['excerpt']['rendered'][:200] if article['excerpt']['rendered'] else ''
-                   })
+           indexed, removed = get_relevance_index().sync_from_articles(articles)
+           if indexed or removed:
+               print(f"Relevance index updated: {indexed} indexed, {removed} removed")
            
            self.existing_articles_cache = articles
+           self.title_phrase_index = TitlePhraseIndex(articles)
            print(f"Found {len(articles)} existing articles for internal linking")
            return articles
            
@@ -118,31 +107,32 @@ class InternalLinking:
    def find_keywords_in_content(self, content):
        """Find static keywords in content that should be linked"""
        links_to_add = {}
-       used_phrases = set()  # Track what we've already linked
+       linked_keys = set()  # Lowercased keys of links_to_add
+       used_phrases = set()  # Track what we've already linked (lowercased)
+       
+       # One pass over the content finds the first whole-word occurrence of every keyword
+       first_hits = self.keyword_matcher.find_first_occurrences(content)
        
        # Process links in order (most specific first)
-       for url, keywords in self.static_links.items():
-           for keyword in keywords:
+       for url, keywords in self.static_keyword_plan:
+           for keyword, keyword_lower in keywords:
                # Skip if we've already linked a variation of this phrase
-               keyword_lower = keyword.lower()
-               if any(keyword_lower in existing.lower() or existing.lower() in keyword_lower 
+               if any(keyword_lower in existing or existing in keyword_lower 
                       for existing in used_phrases):
                    continue
                
-               # Case-insensitive search for keyword
-               pattern = r'\b' + re.escape(keyword) + r'\b'
-               matches = re.finditer(pattern, content, re.IGNORECASE)
+               # Only link the first occurrence of each keyword type
+               hit = first_hits.get(keyword_lower)
+               if hit and keyword_lower not in linked_keys:
+                   matched_text = content[hit[0]:hit[1]]
+                   links_to_add[matched_text] = url
+                   linked_keys.add(matched_text.lower())
+                   used_phrases.add(keyword_lower)
+                   print(f"Found keyword for linking: '{keyword}' -> {url}")
                
-               for match in matches:
-                   # Only link the first occurrence of each keyword type
-                   if keyword.lower() not in [k.lower() for k in links_to_add.keys()]:
-                       links_to_add[match.group()] = url
-                       used_phrases.add(keyword)
-                       print(f"Found keyword for linking: '{keyword}' -> {url}")
-                       break
-                       
-               if keyword in [k.lower() for k in links_to_add.keys()]:
-                   break  # Move to next URL once we've found a match for this one
+               # Lowercase keywords move on to the next URL once one of them matched
+               if keyword == keyword_lower and keyword_lower in linked_keys:
+                   break
        
        return links_to_add
    
@@ -151,41 +141,74 @@ class InternalLinking:
        existing_articles = self.get_existing_articles()
        related_links = {}
        
-       for article in existing_articles:
-           article_title = article['title']
-           
-           # Skip linking to the same article
-           if article_title.lower() == current_title.lower():
+       phrase_index = self.title_phrase_index
+       if phrase_index is None:
+           phrase_index = TitlePhraseIndex(existing_articles)
+       
+       # One pass over the content's 2-4 word phrases, looked up in the title index
+       for phrase, article in phrase_index.find_related(content, current_title):
+           related_links[phrase] = article['url']
+           print(f"Found related article link: '{phrase}' -> {article['title']}")
+       
+       return related_links
+   
+   def choose_anchor(self, content, article):
+       """Pick link text for a relevant article: the longest run (up to 4 words) of its title words in the content"""
+       word_pattern = r"\w[\w'’-]*\w|\w"
+       title_words = set(w.lower() for w in re.findall(word_pattern, html.unescape(article['title'])))
+       text = re.sub(r'<[^>]+>', ' | ', content)  # Runs never cross a tag
+       words = list(re.finditer(word_pattern, text))
+       relevance_index = get_relevance_index()
+       
+       def is_edge_word(word):
+           return len(word) > 2 and word.lower() not in STOPWORDS
+       
+       best = None
+       for i in range(len(words)):
+           if not is_edge_word(words[i].group()):
                continue
-           
-           # Look for key phrases from the article title in the content
-           title_words = article_title.split()
-           
-           # Try different combinations of words from the title
-           found_match = False
-           for i in range(len(title_words)):
-               if found_match:
+           for j in range(i, min(i + 4, len(words))):
+               if words[j].group().lower() not in title_words:
                    break
-                   
-               for j in range(i + 2, min(i + 5, len(title_words) + 1)):  # 2-4 word phrases
-                   phrase = ' '.join(title_words[i:j])
-                   
-                   # Skip very common words
-                   if any(common in phrase.lower() for common in ['the', 'and', 'or', 'of', 'in', 'to', 'a', 'an']):
-                       continue
-                   
-                   # Look for this phrase in the content
-                   pattern = r'\b' + re.escape(phrase) + r'\b'
-                   if re.search(pattern, content, re.IGNORECASE):
-                       # Only add if we haven't already linked this phrase
-                       if phrase.lower() not in [k.lower() for k in related_links.keys()]:
-                           related_links[phrase] = article['url']
-                           print(f"Found related article link: '{phrase}' -> {article['title']}")
-                           found_match = True
-                           break
+               if j > i and not text[words[j - 1].end():words[j].start()].isspace():
+                   break
+               if not is_edge_word(words[j].group()):
+                   continue
+               
+               anchor = text[words[i].start():words[j].end()]
+               rarity = sum(relevance_index.idf(term) for term in tokenize(anchor))
+               if j == i and rarity < RELATED_LINKS_MIN_ANCHOR_IDF:
+                   continue
+               if best is None or (j - i, rarity) > best[0]:
+                   best = ((j - i, rarity), anchor)
        
-       return related_links
+       return best[1] if best else None
+   
+   @telemetry.traced('internal_links.relevance')
+   def find_relevant_articles(self, content, current_title, linked_urls=()):
+       """Suggest the top BM25 matches for the new article, returns {anchor: url}"""
+       self.get_existing_articles()
+       relevant_links = {}
+       used_anchors = set()  # Lowercased anchors already in relevant_links
+       title = current_title.lower()
+       
+       results = get_relevance_index().search(f"{current_title} {content}", k=RELATED_LINKS_TOP_K * 3,
+                                              exclude_urls=set(linked_urls))
+       for score, article in results:
+           if score < RELATED_LINKS_MIN_SCORE or len(relevant_links) >= RELATED_LINKS_TOP_K:
+               break
+           if article['title'].lower() == title:
+               continue
+           
+           anchor = self.choose_anchor(content, article)
+           if anchor and anchor.lower() not in used_anchors:
+               relevant_links[anchor] = article['url']
+               used_anchors.add(anchor.lower())
+               print(f"Found relevant article link ({score:.1f}): '{anchor}' -> {article['title']}")
+       
+       return relevant_links
    
+   @telemetry.traced('internal_links.add')
    def add_internal_links(self, content, article_title):
        """Add internal links to content"""
        print("Adding internal links...")
@@ -198,33 +221,26 @@ class InternalLinking:
        related_links = self.find_related_articles(content, article_title)
        print(f"Found {len(related_links)} related article links")
        
+       # Find the most relevant articles by BM25 score
+       linked_urls = set(static_links.values()) | set(related_links.values())
+       relevant_links = self.find_relevant_articles(content, article_title, linked_urls)
+       print(f"Found {len(relevant_links)} relevant article links")
+       
        # Combine all links
        all_links = {**static_links, **related_links}
+       for phrase, url in relevant_links.items():
+           all_links.setdefault(phrase, url)
        
        if not all_links:
            print("No internal links found")
            return content
        
-       # Apply links to content (only first occurrence of each phrase)
-       linked_content = content
-       linked_phrases = set()
+       # Apply all links in one pass (only first occurrence of each phrase, never inside tags, links or headings)
+       linked_content, applied = self.link_applier.apply(content, list(all_links.items()))
        
-       for phrase, url in all_links.items():
-           # Skip if we've already linked a variation of this phrase
-           phrase_lower = phrase.lower()
-           if any(phrase_lower in existing.lower() or existing.lower() in phrase_lower 
-                  for existing in linked_phrases):
-               continue
-           
-           # Create the link
-           pattern = r'\b' + re.escape(phrase) + r'\b'
-           replacement = f'<a href="{url}" target="_blank">{phrase}</a>'
-           
-           # Replace only the first occurrence
-           linked_content = re.sub(pattern, replacement, linked_content, count=1, flags=re.IGNORECASE)
-           linked_phrases.add(phrase)
+       for phrase, url in applied:
            print(f"Added link: '{phrase}' -> {url}")
        
-       print(f"Added {len(linked_phrases)} internal links total")
+       print(f"Added {len(applied)} internal links total")
 
        return linked_content
@@ -0,0 +1,92 @@
+from collections import deque
+
+
+def is_word_char(char):
+    """Same notion of a word character as the regex \\w"""
+    return char.isalnum() or char == '_'
+
+
+def lower_preserving_offsets(text):
+    """Lowercase text without changing its length, so match offsets map back to the original"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. 'İ') expand when lowercased; keep those as-is
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds case-insensitive whole-word keyword hits in one pass"""
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+        for keyword in keywords:
+            self.add_keyword(keyword.lower())
+        self.build_failure_links()
+
+    def add_keyword(self, keyword):
+        if not keyword or keyword in self.keywords:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions[state][char] = next_state
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+
+        self.outputs[state].append(len(self.keywords))
+        self.keywords.append(keyword)
+
+    def build_failure_links(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def is_boundary(self, text, index):
+        """Regex \\b semantics: word-ness differs on either side of index"""
+        before = index > 0 and is_word_char(text[index - 1])
+        after = index < len(text) and is_word_char(text[index])
+        return before != after
+
+    def find_all(self, text):
+        """Yield (start, end, keyword) for every whole-word hit, ordered by end position"""
+        lowered = lower_preserving_offsets(text)
+        transitions = self.transitions
+        fail = self.fail
+        outputs = self.outputs
+        state = 0
+
+        for index, char in enumerate(lowered):
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+
+            for keyword_id in outputs[state]:
+                keyword = self.keywords[keyword_id]
+                start = index + 1 - len(keyword)
+                if self.is_boundary(text, start) and self.is_boundary(text, index + 1):
+                    yield start, index + 1, keyword
+
+    def find_first_occurrences(self, text):
+        """Return {keyword: (start, end)} for the leftmost whole-word hit of each keyword"""
+        first = {}
+        for start, end, keyword in self.find_all(text):
+            if keyword not in first or start < first[keyword][0]:
+                first[keyword] = (start, end)
+        return first
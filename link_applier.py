@@ -0,0 +1,100 @@
+import re
+from keyword_matcher import KeywordMatcher
+
+# Never place a link inside these elements
+SKIP_TAGS = {'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'script', 'style', 'code', 'pre', 'button', 'textarea'}
+
+HTML_TOKEN = re.compile(
+    r'<!--.*?-->'
+    r'|<(/?)([a-zA-Z][\w:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.DOTALL
+)
+
+
+def variation_of(phrase_lower, linked_phrases):
+    """True when the phrase contains, or is contained in, an already linked phrase"""
+    return any(phrase_lower in existing or existing in phrase_lower for existing in linked_phrases)
+
+
+class LinkApplier:
+    """Apply a set of planned links to HTML in one left-to-right pass
+
+    Only text outside tags, existing anchors and headings is eligible, so a
+    phrase can never be linked inside an attribute or nested in another link.
+    """
+
+    def __init__(self, skip_tags=SKIP_TAGS):
+        self.skip_tags = set(skip_tags)
+
+    def text_ranges(self, html):
+        """Return [(start, end)] of the text that links may be placed in"""
+        ranges = []
+        skip_depth = 0
+        position = 0
+
+        for token in HTML_TOKEN.finditer(html):
+            if skip_depth == 0 and token.start() > position:
+                ranges.append((position, token.start()))
+            position = token.end()
+
+            name = (token.group(2) or '').lower()
+            if name not in self.skip_tags:
+                continue
+            if token.group(1):
+                skip_depth = max(0, skip_depth - 1)
+            elif not token.group(3).rstrip().endswith('/'):
+                skip_depth += 1
+
+        if skip_depth == 0 and position < len(html):
+            ranges.append((position, len(html)))
+        return ranges
+
+    def find_occurrences(self, html, phrases):
+        """Return {phrase_lower: [(start, end)]} for whole-word hits in eligible text, in document order"""
+        matcher = KeywordMatcher(phrases)
+        occurrences = {}
+        for range_start, range_end in self.text_ranges(html):
+            hits = sorted(matcher.find_all(html[range_start:range_end]))
+            for start, end, keyword in hits:
+                occurrences.setdefault(keyword, []).append((range_start + start, range_start + end))
+        return occurrences
+
+    def plan(self, html, links):
+        """Choose where each (phrase, url) goes, in priority order
+
+        A phrase is skipped when a variation of it is already linked; otherwise its
+        first occurrence that doesn't overlap an earlier link is used.
+        """
+        occurrences = self.find_occurrences(html, [phrase for phrase, url in links])
+        linked_phrases = set()
+        taken = []
+        planned = []
+
+        for phrase, url in links:
+            phrase_lower = phrase.lower()
+            if variation_of(phrase_lower, linked_phrases):
+                continue
+
+            for start, end in occurrences.get(phrase_lower, ()):
+                if all(end <= s or start >= e for s, e, _, _ in taken):
+                    taken.append((start, end, phrase, url))
+                    linked_phrases.add(phrase_lower)
+                    planned.append((phrase, url))
+                    break
+
+        return sorted(taken), planned
+
+    def apply(self, html, links, attributes='target="_blank"'):
+        """Link the first eligible occurrence of each phrase, returns (html, [(phrase, url)] applied)"""
+        spans, applied = self.plan(html, links)
+        if not spans:
+            return html, []
+
+        parts = []
+        position = 0
+        for start, end, phrase, url in spans:
+            parts.append(html[position:start])
+            parts.append(f'<a href="{url}" {attributes}>{html[start:end]}</a>')
+            position = end
+        parts.append(html[position:])
+        return ''.join(parts), applied
@@ -0,0 +1,500 @@
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_BASE_URL,
+    CLAUDE_MODEL,
+    LLM_MAX_CONCURRENCY,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_REQUEST_TIMEOUT,
+    LLM_BATCH_POLL_INTERVAL,
+    LLM_BATCH_TIMEOUT,
+    LLM_LATENCY_HISTORY_FILE,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DEFAULT_DEADLINE
+)
+import metrics
+import telemetry
+
+# 429 = rate limited, 529 = API overloaded
+RETRYABLE_STATUS_CODES = (429, 529)
+# Latency samples kept per purpose for hedging deadlines
+LATENCY_HISTORY_SIZE = 200
+
+
+class LLMCallCancelled(Exception):
+    """Raised inside a streaming call when its cancel event is set"""
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used before a call is made"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def estimate_message_tokens(messages):
+    """Estimate the input tokens of a messages list"""
+    total = 0
+    for message in messages:
+        content = message.get('content', '')
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        else:
+            for block in content:
+                total += estimate_tokens(block.get('text', ''))
+    return total
+
+
+class TokenRateLimiter:
+    """Sliding one-minute window limiter on tokens per minute"""
+
+    def __init__(self, tokens_per_minute):
+        self.tokens_per_minute = tokens_per_minute
+        self.window = deque()  # [timestamp, tokens] reservations
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until the tokens fit in the window, return the reservation"""
+        reservation = [time.monotonic(), tokens]
+        if not self.tokens_per_minute:
+            return reservation
+
+        # A single call larger than the budget still has to go through eventually
+        tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    self.window.popleft()
+
+                used = sum(entry[1] for entry in self.window)
+                if used + tokens <= self.tokens_per_minute:
+                    reservation = [now, tokens]
+                    self.window.append(reservation)
+                    return reservation
+
+                wait = 60 - (now - self.window[0][0])
+
+            print(f"Token budget of {self.tokens_per_minute}/min reached, waiting {wait:.1f}s...")
+            time.sleep(max(wait, 0.05))
+
+    def settle(self, reservation, actual_tokens):
+        """Replace a reserved estimate with the real usage once the call returns"""
+        with self.lock:
+            reservation[1] = actual_tokens
+
+
+class LatencyHistory:
+    """Recent successful call latencies per purpose, persisted across cron runs"""
+
+    def __init__(self, history_file=LLM_LATENCY_HISTORY_FILE):
+        self.history_file = history_file
+        self.lock = threading.Lock()
+        self.samples = self.load_history()
+
+    def load_history(self):
+        if self.history_file and os.path.exists(self.history_file):
+            try:
+                with open(self.history_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading latency history: {e}")
+        return {}
+
+    def add(self, purpose, latency):
+        with self.lock:
+            samples = self.samples.setdefault(purpose, [])
+            samples.append(round(latency, 3))
+            del samples[:-LATENCY_HISTORY_SIZE]
+            if self.history_file:
+                try:
+                    with open(self.history_file, 'w') as f:
+                        json.dump(self.samples, f)
+                except Exception as e:
+                    print(f"Error saving latency history: {e}")
+
+    def percentile(self, purpose, percentile, min_samples=1):
+        """Latency at the given percentile, None when there are too few samples"""
+        with self.lock:
+            samples = sorted(self.samples.get(purpose, []))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class LLMGateway:
+    """Single entry point for Claude calls: shared client, concurrency cap, TPM limit, retries and usage records"""
+
+    def __init__(self, api_key=ANTHROPIC_API_KEY, base_url=ANTHROPIC_BASE_URL, model=CLAUDE_MODEL,
+                 max_concurrency=LLM_MAX_CONCURRENCY, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self.client_lock = threading.Lock()
+        self.model = model
+        self.max_retries = max_retries
+        self.semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.rate_limiter = TokenRateLimiter(tokens_per_minute)
+        self.usage = {}  # Running totals per model; the daemon makes calls for weeks
+        self.records_lock = threading.Lock()
+        self.latency_history = LatencyHistory()
+        self.hedge_stats = {'runs': 0, 'triggered': 0, 'primary_wins': 0, 'hedge_wins': 0, 'failed': 0}
+
+    @property
+    def client(self):
+        """The Anthropic client, created (and the SDK imported) on the first Claude call"""
+        with self.client_lock:
+            if self._client is None:
+                from anthropic import Anthropic
+                import http_replay
+                # SDK retries are disabled so that every attempt goes through our limiter and gets recorded
+                self._client = Anthropic(
+                    api_key=self.api_key,
+                    base_url=self.base_url or None,
+                    max_retries=0,
+                    timeout=LLM_REQUEST_TIMEOUT,
+                    http_client=http_replay.create_llm_http_client()
+                )
+            return self._client
+
+    def is_retryable(self, error):
+        """Check if a failed call should be retried"""
+        from anthropic import APIConnectionError, APIStatusError
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, APIConnectionError)
+
+    def get_retry_delay(self, attempt, error=None):
+        """Exponential backoff with full jitter, never shorter than the server's retry-after"""
+        ceiling = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        delay = random.uniform(ceiling / 2, ceiling)
+
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get('retry-after', 0))
+                delay = max(delay, min(retry_after, LLM_RETRY_MAX_DELAY))
+            except (TypeError, ValueError):
+                pass
+
+        return delay
+
+    def stream_message(self, cancel_event, **params):
+        """Stream a message so the request can be abandoned mid-generation"""
+        with self.client.messages.stream(**params) as stream:
+            for _ in stream:
+                if cancel_event.is_set():
+                    # Leaving the context closes the connection and stops generation
+                    raise LLMCallCancelled("Cancelled in favour of another request")
+            return stream.get_final_message()
+
+    @telemetry.traced('llm.create_message')
+    def create_message(self, messages, max_tokens, model=None, purpose=None, cancel_event=None, **kwargs):
+        """Call messages.create with limiting and retries, returns the SDK response
+
+        With a cancel_event the call is streamed and aborts once the event is set.
+        """
+        model = model or self.model
+        estimated_tokens = estimate_message_tokens(messages) + max_tokens
+
+        for attempt in range(self.max_retries + 1):
+            reservation = self.rate_limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+
+            try:
+                with self.semaphore:
+                    started = time.monotonic()
+                    if cancel_event is not None:
+                        if cancel_event.is_set():
+                            raise LLMCallCancelled("Cancelled before the request was sent")
+                        response = self.stream_message(
+                            cancel_event,
+                            model=model,
+                            max_tokens=max_tokens,
+                            messages=messages,
+                            **kwargs
+                        )
+                    else:
+                        response = self.client.messages.create(
+                            model=model,
+                            max_tokens=max_tokens,
+                            messages=messages,
+                            **kwargs
+                        )
+            except Exception as e:
+                latency = time.monotonic() - started
+                status = getattr(e, 'status_code', None)
+                self.rate_limiter.settle(reservation, 0)
+                self.record_call(model, purpose, latency, status=status, attempt=attempt, error=str(e))
+
+                if self.is_retryable(e) and attempt < self.max_retries:
+                    delay = self.get_retry_delay(attempt, e)
+                    print(f"⚠️ Claude call failed ({status or type(e).__name__}), retrying in {delay:.1f}s "
+                          f"(attempt {attempt + 1}/{self.max_retries})")
+                    time.sleep(delay)
+                    continue
+                raise
+
+            latency = time.monotonic() - started
+            usage = getattr(response, 'usage', None)
+            input_tokens = getattr(usage, 'input_tokens', 0) or 0
+            output_tokens = getattr(usage, 'output_tokens', 0) or 0
+            self.rate_limiter.settle(reservation, input_tokens + output_tokens)
+            self.record_call(model, purpose, latency, input_tokens, output_tokens, status=200, attempt=attempt)
+            if purpose:
+                self.latency_history.add(purpose, latency)
+            return response
+
+    def get_hedge_deadline(self, purpose):
+        """Seconds to wait before hedging: the configured latency percentile of past calls"""
+        deadline = self.latency_history.percentile(purpose, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES)
+        return deadline if deadline is not None else LLM_HEDGE_DEFAULT_DEADLINE
+
+    def run_hedged(self, primary, hedge, is_usable, purpose, deadline=None):
+        """Run primary(cancel_event); if it is slow or unusable, also run hedge(cancel_event)
+
+        The first usable result wins and the other request is cancelled.
+        Returns (result, winner) where winner is 'primary', 'hedge' or None.
+        """
+        deadline = deadline if deadline is not None else self.get_hedge_deadline(purpose)
+        cancel_events = {'primary': threading.Event(), 'hedge': threading.Event()}
+        finished = queue.Queue()
+        self.count_hedge('runs')
+
+        def attempt(name, func):
+            try:
+                result = func(cancel_events[name])
+            except LLMCallCancelled:
+                result = None
+            except Exception as e:
+                print(f"Hedged {name} request failed: {e}")
+                result = None
+            finished.put((name, result))
+
+        def launch(name, func):
+            # Run in a copy of the caller's context so the request's telemetry lands in the caller's span
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(attempt, name, func), daemon=True).start()
+
+        launch('primary', primary)
+        outstanding = 1
+        hedged = False
+
+        while outstanding:
+            try:
+                timeout = None if hedged else deadline
+                name, result = finished.get(timeout=timeout)
+            except queue.Empty:
+                print(f"⚠️ Primary request slower than {deadline:.1f}s, sending hedge request")
+                self.count_hedge('triggered')
+                hedged = True
+                launch('hedge', hedge)
+                outstanding += 1
+                continue
+
+            outstanding -= 1
+            if is_usable(result):
+                for other, event in cancel_events.items():
+                    if other != name:
+                        event.set()
+                self.count_hedge(f'{name}_wins')
+                if hedged:
+                    print(f"✓ Hedged rewrite won by the {name} request")
+                return result, name
+
+            if not hedged:
+                # The primary came back unusable before the deadline, hedge right away
+                print("⚠️ Primary request returned nothing usable, sending hedge request")
+                self.count_hedge('triggered')
+                hedged = True
+                launch('hedge', hedge)
+                outstanding += 1
+
+        self.count_hedge('failed')
+        return None, None
+
+    def count_hedge(self, key):
+        with self.records_lock:
+            self.hedge_stats[key] += 1
+
+    def call_with_retries(self, description, func, *args, **kwargs):
+        """Run a non-message API call (batches) with the same retry policy"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if self.is_retryable(e) and attempt < self.max_retries:
+                    delay = self.get_retry_delay(attempt, e)
+                    print(f"⚠️ Failed to {description} ({getattr(e, 'status_code', None) or type(e).__name__}), "
+                          f"retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                    time.sleep(delay)
+                    continue
+                raise
+
+    def build_batch_request(self, custom_id, messages, max_tokens, model=None):
+        """Build one entry of a Message Batches job"""
+        return {
+            'custom_id': custom_id,
+            'params': {
+                'model': model or self.model,
+                'max_tokens': max_tokens,
+                'messages': messages
+            }
+        }
+
+    def create_batch(self, requests):
+        """Submit a Message Batches job, returns the batch ID"""
+        batch = self.call_with_retries('create message batch', self.client.messages.batches.create, requests=requests)
+        print(f"✓ Submitted message batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def find_batch(self, request_count, created_after):
+        """ID of a batch with request_count requests created after created_after (a UTC ISO time), or None
+
+        Used when a run died between submitting a batch and saving its ID.
+        """
+        since = datetime.fromisoformat(created_after)
+        page = self.call_with_retries('list message batches', self.client.messages.batches.list, limit=20)
+        for batch in page.data:
+            counts = batch.request_counts
+            total = counts.processing + counts.succeeded + counts.errored + counts.canceled + counts.expired
+            if batch.created_at >= since and total == request_count:
+                print(f"✓ Found batch {batch.id} submitted before the last run stopped")
+                return batch.id
+        return None
+
+    def wait_for_batch(self, batch_id, poll_interval=LLM_BATCH_POLL_INTERVAL, timeout=LLM_BATCH_TIMEOUT):
+        """Poll a batch until it has ended, returns the batch or None on timeout"""
+        started = time.monotonic()
+
+        while True:
+            batch = self.call_with_retries('check message batch', self.client.messages.batches.retrieve, batch_id)
+            if batch.processing_status == 'ended':
+                counts = batch.request_counts
+                print(f"✓ Batch {batch_id} ended: {counts.succeeded} succeeded, {counts.errored} errored, "
+                      f"{counts.expired} expired, {counts.canceled} canceled")
+                return batch
+
+            if time.monotonic() - started > timeout:
+                print(f"✗ Batch {batch_id} still {batch.processing_status} after {timeout:.0f}s, giving up for now")
+                return None
+
+            print(f"Batch {batch_id} is {batch.processing_status} "
+                  f"({batch.request_counts.processing} requests processing), checking again in {poll_interval:.0f}s...")
+            time.sleep(poll_interval)
+
+    def get_batch_results(self, batch_id):
+        """Return custom_id -> response text (None for failed requests) and record token usage"""
+        results = {}
+        entries = self.call_with_retries('fetch message batch results', self.client.messages.batches.results, batch_id)
+
+        for entry in entries:
+            if entry.result.type == 'succeeded':
+                message = entry.result.message
+                results[entry.custom_id] = message.content[0].text
+                self.record_call(
+                    message.model,
+                    f"batch:{entry.custom_id.split('-')[0]}",
+                    None,
+                    message.usage.input_tokens,
+                    message.usage.output_tokens,
+                    status=200
+                )
+            else:
+                results[entry.custom_id] = None
+                print(f"✗ Batch request {entry.custom_id} {entry.result.type}")
+
+        return results
+
+    def record_call(self, model, purpose, latency, input_tokens=0, output_tokens=0, status=None, attempt=0, error=None):
+        """Add a single attempt to the usage totals (latency is None for batch results)"""
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'model': model,
+            'purpose': purpose,
+            'latency_seconds': round(latency, 3) if latency is not None else None,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'status': status,
+            'attempt': attempt,
+            'error': error
+        }
+        with self.records_lock:
+            model_stats = self.usage.setdefault(model, {
+                'calls': 0,
+                'failures': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'total_latency_seconds': 0.0,
+                'timed_calls': 0
+            })
+            model_stats['calls'] += 1
+            if error:
+                model_stats['failures'] += 1
+            model_stats['input_tokens'] += input_tokens
+            model_stats['output_tokens'] += output_tokens
+            if latency is not None:
+                model_stats['total_latency_seconds'] += record['latency_seconds']
+                model_stats['timed_calls'] += 1
+
+        span = telemetry.current_span()
+        span.add('llm.calls')
+        span.add('llm.input_tokens', input_tokens)
+        span.add('llm.output_tokens', output_tokens)
+        span.set('llm.model', model)
+        if purpose:
+            span.set('llm.purpose', purpose)
+
+        metrics.LLM_REQUESTS.inc(model=model, status=status or 'error')
+        metrics.LLM_TOKENS.inc(input_tokens, model=model, direction='input')
+        metrics.LLM_TOKENS.inc(output_tokens, model=model, direction='output')
+        if latency is not None:
+            metrics.LLM_SECONDS.observe(latency, model=model)
+        return record
+
+    def get_usage_summary(self):
+        """Token usage and latency totals by model"""
+        with self.records_lock:
+            return {model: dict(stats) for model, stats in self.usage.items()}
+
+    def print_usage_summary(self):
+        """Print token usage and latency per model"""
+        for model, stats in self.get_usage_summary().items():
+            successful = stats['calls'] - stats['failures']
+            avg_latency = stats['total_latency_seconds'] / stats['timed_calls'] if stats['timed_calls'] else 0
+            print(f"Claude usage [{model}]: {successful}/{stats['calls']} calls ok, "
+                  f"{stats['input_tokens']} in / {stats['output_tokens']} out tokens, "
+                  f"avg latency {avg_latency:.2f}s")
+
+        if self.hedge_stats['runs']:
+            stats = self.hedge_stats
+            print(f"Hedging: triggered {stats['triggered']}/{stats['runs']} runs, "
+                  f"primary won {stats['primary_wins']}, hedge won {stats['hedge_wins']}, failed {stats['failed']}")
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    """Get the process-wide gateway, creating it on first use"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -1,60 +1,88 @@
-import schedule
-import time
+import atexit
 import sys
+import startup_timing
+
+if '--timing' in sys.argv:
+    sys.argv.remove('--timing')
+    startup_timing.enable()
+    atexit.register(startup_timing.print_report)
+
+import importlib
 from datetime import datetime
-from news_processor import CannabisNewsProcessor
-from canadian_news_processor import CanadianNewsProcessor
-from wordpress_api import WordPressAPI
-from image_manager import ImageManager
-from config import POSTING_HOURS
+from config import NEWS_POSTS_PER_DAY
+
+startup_timing.mark("main imports done")
+
+# Built on first use, so e.g. post_canadian never imports or constructs the US processors
+LAZY_COMPONENTS = {
+   'wp_api': ('wordpress_api', 'WordPressAPI'),
+   'news_processor': ('news_processor', 'CannabisNewsProcessor'),
+   'news_processor_2': ('news_processor_2', 'CannabisNewsProcessor2'),
+   'canadian_processor': ('canadian_news_processor', 'CanadianNewsProcessor'),
+   'image_manager': ('image_manager', 'ImageManager'),
+   'outbox': ('outbox', 'Outbox'),
+   'article_tracker': ('database_article_tracker', 'DatabaseArticleTracker')
+}
+
+# Component that generates each source's articles
+SOURCE_PROCESSORS = {
+   'us': 'news_processor',
+   'us_2': 'news_processor_2',
+   'canadian': 'canadian_processor'
+}
 
 class ContentAutomation:
    def __init__(self):
-       self.wp_api = WordPressAPI()
-       self.news_processor = CannabisNewsProcessor()
-       self.canadian_processor = CanadianNewsProcessor()
-       self.image_manager = ImageManager()
        self.daily_news_count = 0
    
-   def post_us_news_content(self):
+   def __getattr__(self, name):
+       """Import and construct a LAZY_COMPONENTS entry the first time it is used"""
+       if name not in LAZY_COMPONENTS:
+           raise AttributeError(f"'ContentAutomation' object has no attribute '{name}'")
+       module_name, class_name = LAZY_COMPONENTS[name]
+       with startup_timing.timed(f"{class_name}()"):
+           component = getattr(importlib.import_module(module_name), class_name)()
+       setattr(self, name, component)
+       return component
+   
+   def refresh_caches(self):
+       """Pick up posts published since the last job (the daemon keeps one instance for days)"""
+       from article_catalog import get_article_catalog
+       get_article_catalog().sync(force=True)
+       for name in ('news_processor', 'news_processor_2', 'canadian_processor'):
+           processor = self.__dict__.get(name)
+           if processor:
+               processor.internal_linking.existing_articles_cache = None
+   
+   def post_us_news_content(self, publish_now=True):
        """Post single US cannabis news content"""
        print(f"[{datetime.now()}] Posting US cannabis news...")
        
        try:
-           rewritten_article = self.news_processor.get_cannabis_article()
+           rewritten_article = self.news_processor.get_cannabis_article(image_manager=self.image_manager, checkpointed=True)
            if rewritten_article:
-               # Get featured image
-               featured_image_id = self.image_manager.get_featured_image_for_article(
-                   rewritten_article['category'], 
-                   rewritten_article['title']
-               )
+               # Featured image is uploaded by the pipeline while Claude generates
+               featured_image_id = rewritten_article.get('featured_image_id')
+               if 'featured_image_id' not in rewritten_article:
+                   featured_image_id = self.image_manager.get_featured_image_for_article(
+                       rewritten_article['category'], 
+                       rewritten_article['title']
+                   )
                
-               # Post to WordPress
-               result = self.wp_api.create_news_post(
-                   rewritten_article['title'], 
-                   rewritten_article['content'], 
-                   status='publish',
-                   categories=['Cannabis News'],
-                   tags=rewritten_article['tags'],
-                   featured_image_id=featured_image_id,
-                   author_name='rohan'
-               )
+               # Store the finished post in the outbox before publishing it
+               rewritten_article['featured_image_id'] = featured_image_id
+               if not publish_now:
+                   return bool(self.queue_article(rewritten_article, 'us', 'rohan', rewritten_article['category']))
                
+               result = self.publish_article(rewritten_article, 'us', 'rohan', rewritten_article['category'], self.news_processor.article_tracker)
                if result:
                    print(f"✅ Posted US cannabis news: {rewritten_article['title']}")
                    print(f"Category: {rewritten_article['category']}, Tags: {', '.join(rewritten_article['tags'])}")
                    if featured_image_id:
                        print(f"✅ Added featured image: {featured_image_id}")
-                   
-                   # Update tracking with WordPress post ID
-                   if 'original_url' in rewritten_article:
-                       self.news_processor.article_tracker.update_wordpress_id(
-                           rewritten_article['original_url'], 
-                           result.get('id')
-                       )
                    return True
                else:
-                   print("❌ Failed to post US cannabis news")
+                   print("❌ Failed to post US cannabis news, it stays in the outbox for publish_queued")
                    return False
            else:
                print("No US cannabis articles found")
@@ -66,48 +94,37 @@ class ContentAutomation:
            traceback.print_exc()
            return False
 
-   def post_us_news_content_2(self):
+   def post_us_news_content_2(self, publish_now=True):
        """Post single US cannabis news content using processor 2"""
        print(f"[{datetime.now()}] Posting US cannabis news 2...")
        
        try:
-           from news_processor_2 import CannabisNewsProcessor2
-           news_processor_2 = CannabisNewsProcessor2()
+           news_processor_2 = self.news_processor_2
            
-           rewritten_article = news_processor_2.get_cannabis_article()
+           rewritten_article = news_processor_2.get_cannabis_article(image_manager=self.image_manager, checkpointed=True)
            if rewritten_article:
-               # Get featured image
-               featured_image_id = self.image_manager.get_featured_image_for_article(
-                   rewritten_article['category'], 
-                   rewritten_article['title']
-               )
+               # Featured image is uploaded by the pipeline while Claude generates
+               featured_image_id = rewritten_article.get('featured_image_id')
+               if 'featured_image_id' not in rewritten_article:
+                   featured_image_id = self.image_manager.get_featured_image_for_article(
+                       rewritten_article['category'], 
+                       rewritten_article['title']
+                   )
                
-               # Post to WordPress
-               result = self.wp_api.create_news_post(
-                   rewritten_article['title'], 
-                   rewritten_article['content'], 
-                   status='publish',
-                   categories=['Cannabis News'],
-                   tags=rewritten_article['tags'],
-                   featured_image_id=featured_image_id,
-                   author_name='kaleb'
-               )
+               # Store the finished post in the outbox before publishing it
+               rewritten_article['featured_image_id'] = featured_image_id
+               if not publish_now:
+                   return bool(self.queue_article(rewritten_article, 'us_2', 'kaleb', rewritten_article['category']))
                
+               result = self.publish_article(rewritten_article, 'us_2', 'kaleb', rewritten_article['category'], news_processor_2.article_tracker)
                if result:
                    print(f"✅ Posted US cannabis news 2: {rewritten_article['title']}")
                    print(f"Category: {rewritten_article['category']}, Tags: {', '.join(rewritten_article['tags'])}")
                    if featured_image_id:
                        print(f"✅ Added featured image: {featured_image_id}")
-                   
-                   # Update tracking with WordPress post ID
-                   if 'original_url' in rewritten_article:
-                       news_processor_2.article_tracker.update_wordpress_id(
-                           rewritten_article['original_url'], 
-                           result.get('id')
-                       )
                    return True
                else:
-                   print("❌ Failed to post US cannabis news 2")
+                   print("❌ Failed to post US cannabis news 2, it stays in the outbox for publish_queued")
                    return False
            else:
                print("No US cannabis news 2 articles found")
@@ -119,45 +136,35 @@ class ContentAutomation:
            traceback.print_exc()
            return False
 
-   def post_canadian_news_content(self):
+   def post_canadian_news_content(self, publish_now=True):
        """Post single Canadian cannabis news content"""
        print(f"[{datetime.now()}] Posting Canadian cannabis news...")
        
        try:
-           rewritten_article = self.canadian_processor.get_canadian_article()
+           rewritten_article = self.canadian_processor.get_canadian_article(image_manager=self.image_manager, checkpointed=True)
            if rewritten_article:
-               # Get featured image
-               featured_image_id = self.image_manager.get_featured_image_for_article(
-                   'canadian', 
-                   rewritten_article['title']
-               )
+               # Featured image is uploaded by the pipeline while Claude generates
+               featured_image_id = rewritten_article.get('featured_image_id')
+               if 'featured_image_id' not in rewritten_article:
+                   featured_image_id = self.image_manager.get_featured_image_for_article(
+                       'canadian', 
+                       rewritten_article['title']
+                   )
                
-               # Post to WordPress
-               result = self.wp_api.create_news_post(
-                   rewritten_article['title'], 
-                   rewritten_article['content'], 
-                   status='publish',
-                   categories=['Cannabis News'],
-                   tags=rewritten_article['tags'],
-                   featured_image_id=featured_image_id,
-                   author_name='kaleb'
-               )
+               # Store the finished post in the outbox before publishing it
+               rewritten_article['featured_image_id'] = featured_image_id
+               if not publish_now:
+                   return bool(self.queue_article(rewritten_article, 'canadian', 'kaleb', 'canadian'))
                
+               result = self.publish_article(rewritten_article, 'canadian', 'kaleb', 'canadian', self.canadian_processor.article_tracker)
                if result:
                    print(f"✅ Posted Canadian cannabis news: {rewritten_article['title']}")
                    print(f"Category: {rewritten_article['category']}, Tags: {', '.join(rewritten_article['tags'])}")
                    if featured_image_id:
                        print(f"✅ Added featured image: {featured_image_id}")
-                   
-                   # Update tracking with WordPress post ID
-                   if 'original_url' in rewritten_article:
-                       self.canadian_processor.article_tracker.update_wordpress_id(
-                           rewritten_article['original_url'], 
-                           result.get('id')
-                       )
                    return True
                else:
-                   print("❌ Failed to post Canadian cannabis news")
+                   print("❌ Failed to post Canadian cannabis news, it stays in the outbox for publish_queued")
                    return False
            else:
                print("No Canadian cannabis articles found")
@@ -169,6 +176,47 @@ class ContentAutomation:
            traceback.print_exc()
            return False
 
+   def queue_article(self, article, source, author_name, image_category, scheduled_for=None):
+       """Store a finished article in the outbox, in the next free posting slot by default"""
+       scheduled_for = scheduled_for or self.outbox.next_posting_slots(1)[0]
+       return self.outbox.enqueue(article, source, author_name, image_category, scheduled_for)
+   
+   def publish_article(self, article, source, author_name, image_category, article_tracker):
+       """Queue a finished article for now and publish it straight from the outbox
+       
+       If WordPress is down the article stays queued and publish_queued retries it,
+       so the scrape and the Claude work aren't lost.
+       """
+       from outbox import OutboxPublisher
+       entry = self.queue_article(article, source, author_name, image_category, scheduled_for=datetime.now())
+       publisher = OutboxPublisher(self.wp_api, self.image_manager, article_tracker, self.outbox)
+       return publisher.publish(entry['id'])
+   
+   def resume_checkpoint(self, checkpoint):
+       """Finish a claimed checkpoint with its source's processor and publish it through the outbox"""
+       from batch_generator import BATCH_SOURCES
+       source = checkpoint['source']
+       settings = BATCH_SOURCES[source]
+       processor = getattr(self, SOURCE_PROCESSORS[source])
+       article = processor.article_pipeline.resume(checkpoint, getattr(processor, settings['rewrite']), self.image_manager)
+       if not article:
+           print(f"❌ Could not finish '{checkpoint['title'][:50]}...'")
+           return False
+       image_category = settings['image_category'] or article['category']
+       if not self.publish_article(article, source, settings['author_name'], image_category, processor.article_tracker):
+           print("❌ Failed to post the resumed article, it stays in the outbox for publish_queued")
+           return False
+       print(f"✅ Posted resumed {source} news: {article['title']}")
+       return True
+   
+   def publish_queued_content(self, retries_only=False):
+       """Publish queued articles whose posting slot has arrived"""
+       from outbox import OutboxPublisher
+       publisher = OutboxPublisher(self.wp_api, self.image_manager, self.article_tracker, self.outbox)
+       published = publisher.publish_due(retries_only=retries_only)
+       print(f"Outbox: {publisher.outbox.get_stats()}")
+       return published
+
 # Test functions for manual testing
 def test_news_setup():
    print("Testing cannabis NEWS setup...")
@@ -203,11 +251,21 @@ def test_mixed_news_content():
     return us_success or can_success
 
 # Command line automation functions
+def print_usage(llm=True, wordpress=True):
+    """Claude and WordPress usage for this run (imported here, so e.g. checkpoints never loads the clients)"""
+    if llm:
+        from llm_gateway import get_llm_gateway
+        get_llm_gateway().print_usage_summary()
+    if wordpress:
+        from wordpress_client import get_wordpress_client
+        get_wordpress_client().print_usage_summary()
+
 def post_us_news():
     """Post a single US news article - for cron scheduling"""
     print(f"=== SCHEDULED US NEWS POST - {datetime.now()} ===")
     automation = ContentAutomation()
     success = automation.post_us_news_content()
+    print_usage()
     if success:
         print("✅ US news post completed successfully")
     else:
@@ -219,6 +277,7 @@ def post_us_news_2():
     print(f"=== SCHEDULED US NEWS 2 POST - {datetime.now()} ===")
     automation = ContentAutomation()
     success = automation.post_us_news_content_2()
+    print_usage()
     if success:
         print("✅ US news 2 post completed successfully")
     else:
@@ -230,39 +289,193 @@ def post_canadian_news():
     print(f"=== SCHEDULED CANADIAN NEWS POST - {datetime.now()} ===")
     automation = ContentAutomation()
     success = automation.post_canadian_news_content()
+    print_usage()
     if success:
         print("✅ Canadian news post completed successfully")
     else:
         print("❌ Canadian news post failed")
         sys.exit(1)
 
+def run_daemon():
+    """Stay running and post at POSTING_HOURS with warm clients and caches"""
+    print(f"=== SCHEDULER DAEMON - {datetime.now()} ===")
+    from daemon import SchedulerDaemon
+    SchedulerDaemon(ContentAutomation()).run()
+
+def generate_ahead(source):
+    """Generate one article now and queue it for the next posting slot - run off-peak"""
+    print(f"=== GENERATING {source.upper()} ARTICLE FOR THE OUTBOX - {datetime.now()} ===")
+    automation = ContentAutomation()
+    generators = {
+        'us': automation.post_us_news_content,
+        'us_2': automation.post_us_news_content_2,
+        'canadian': automation.post_canadian_news_content
+    }
+    if source not in generators:
+        print(f"Unknown source: {source} (choose from {', '.join(generators)})")
+        sys.exit(1)
+    success = generators[source](publish_now=False)
+    print_usage(wordpress=False)
+    if not success:
+        print("❌ Nothing was queued")
+        sys.exit(1)
+
+def batch_generate(count):
+    """Generate the day's articles with Message Batches and queue them - for cron scheduling"""
+    print(f"=== BATCH GENERATION - {datetime.now()} ===")
+    from batch_generator import BatchGenerator
+    queued = BatchGenerator().run(count)
+    print_usage()
+    if not queued:
+        print("❌ Batch generation queued no articles")
+        sys.exit(1)
+
+def post_batch(count, spaced=False):
+    """Scrape once and generate count articles for the posting hours (or every few minutes from now with --spaced)"""
+    print(f"=== POST BATCH - {datetime.now()} ===")
+    from batch_generator import PostBatch
+    generated = PostBatch().run(count, spaced=spaced)
+    print_usage()
+    if not generated:
+        print("❌ Post batch generated no articles")
+        sys.exit(1)
+
+def preupload_images():
+    """Upload the whole images folder once so posts only reference media IDs"""
+    print(f"=== IMAGE PRE-UPLOAD - {datetime.now()} ===")
+    from image_manager import ImageManager
+    uploaded, reused, failed = ImageManager().preupload_images()
+    print_usage(llm=False)
+    if failed:
+        print(f"❌ {failed} images failed to upload")
+        sys.exit(1)
+    print("✅ Image library is in WordPress")
+
+def list_checkpoints(include_finished=False):
+    """Show articles whose pipeline didn't finish (--all includes queued and abandoned ones)"""
+    from article_checkpoints import get_article_checkpoints
+    checkpoints = get_article_checkpoints().list_checkpoints(include_finished)
+    if not checkpoints:
+        print("No unfinished articles")
+        return
+    for checkpoint in checkpoints:
+        print(f"{checkpoint['id']}  {checkpoint['source']:<9} {checkpoint['status']:<9} {checkpoint['stage']:<9} "
+              f"attempts: {checkpoint['attempts']}  updated: {checkpoint['updated_at'][:16]}  {checkpoint['title'][:50]}")
+        if checkpoint['last_error'] and checkpoint['status'] != 'queued':
+            print(f"    last error: {checkpoint['last_error'][:120]}")
+
+def resume_checkpoints(checkpoint_id=None):
+    """Finish interrupted articles from their last completed stage and publish them"""
+    print(f"=== RESUMING CHECKPOINTED ARTICLES - {datetime.now()} ===")
+    from article_checkpoints import get_article_checkpoints
+    checkpoints = get_article_checkpoints()
+    if checkpoint_id:
+        candidates = [checkpoint for checkpoint in [checkpoints.get(checkpoint_id)] if checkpoint]
+        if not candidates:
+            print(f"❌ No checkpoint {checkpoint_id}")
+            sys.exit(1)
+    else:
+        candidates = checkpoints.get_resumable()
+        print(f"{len(candidates)} articles to resume")
+
+    automation = ContentAutomation()
+    failed = 0
+    for candidate in candidates:
+        # A checkpoint named on the command line is taken even if its process looks alive
+        checkpoint = checkpoints.claim(candidate['id'], force=bool(checkpoint_id))
+        if not checkpoint:
+            print(f"Checkpoint {candidate['id']} is {candidate['status']}, not resuming it")
+            failed += 1
+        elif not automation.resume_checkpoint(checkpoint):
+            failed += 1
+    print_usage()
+    if failed:
+        sys.exit(1)
+
+def abandon_checkpoint(checkpoint_id):
+    """Stop resuming an article"""
+    from article_checkpoints import get_article_checkpoints
+    if not get_article_checkpoints().abandon(checkpoint_id):
+        print(f"❌ No unfinished checkpoint {checkpoint_id}")
+        sys.exit(1)
+    print(f"✓ Abandoned checkpoint {checkpoint_id}")
+
+def publish_queued():
+    """Publish queued articles that are due - run at each posting hour"""
+    print(f"=== QUEUED POST PUBLISHING - {datetime.now()} ===")
+    automation = ContentAutomation()
+    published = automation.publish_queued_content()
+    print_usage(llm=False)
+    print(f"✅ Published {published} queued posts")
+
+def run_command(command):
+    """Dispatch a cron/CLI command"""
+    if command == "post_us":
+        post_us_news()
+    elif command == "post_us_2":
+        post_us_news_2()
+    elif command == "post_canadian":
+        post_canadian_news()
+    elif command == "generate":
+        generate_ahead(sys.argv[2] if len(sys.argv) > 2 else 'us')
+    elif command == "batch_generate":
+        batch_generate(int(sys.argv[2]) if len(sys.argv) > 2 else NEWS_POSTS_PER_DAY)
+    elif command == "post_batch":
+        args = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
+        post_batch(int(args[0]) if args else NEWS_POSTS_PER_DAY, spaced='--spaced' in sys.argv)
+    elif command == "publish_queued":
+        publish_queued()
+    elif command == "checkpoints":
+        list_checkpoints(include_finished='--all' in sys.argv)
+    elif command == "resume":
+        resume_checkpoints(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == "abandon" and len(sys.argv) > 2:
+        abandon_checkpoint(sys.argv[2])
+    elif command == "preupload_images":
+        preupload_images()
+    elif command == "test_us":
+        test_news_setup()
+    elif command == "test_canadian":
+        test_canadian_news_setup()
+    elif command == "test_mixed":
+        test_mixed_news_content()
+    else:
+        print(f"Unknown command: {command}")
+        print("Available commands:")
+        print("  python main.py post_us")
+        print("  python main.py post_us_2")
+        print("  python main.py post_canadian") 
+        print("  python main.py daemon")
+        print("  python main.py generate [us|us_2|canadian]")
+        print("  python main.py batch_generate [N]")
+        print("  python main.py post_batch [N] [--spaced]")
+        print("  python main.py publish_queued")
+        print("  python main.py checkpoints [--all]")
+        print("  python main.py resume [ID]")
+        print("  python main.py abandon ID")
+        print("  python main.py preupload_images")
+        print("  python main.py test_us")
+        print("  python main.py test_canadian")
+        print("  python main.py test_mixed")
+        sys.exit(1)
+
 if __name__ == "__main__":
    # Check for command line arguments for automated scheduling
    if len(sys.argv) > 1:
        command = sys.argv[1]
        
-       if command == "post_us":
-           post_us_news()
-       elif command == "post_us_2":
-           post_us_news_2()
-       elif command == "post_canadian":
-           post_canadian_news()
-       elif command == "test_us":
-           test_news_setup()
-       elif command == "test_canadian":
-           test_canadian_news_setup()
-       elif command == "test_mixed":
-           test_mixed_news_content()
+       if command == "daemon":
+           # Each daemon job is recorded as its own telemetry run
+           run_daemon()
        else:
-           print(f"Unknown command: {command}")
-           print("Available commands:")
-           print("  python main.py post_us")
-           print("  python main.py post_us_2")
-           print("  python main.py post_canadian") 
-           print("  python main.py test_us")
-           print("  python main.py test_canadian")
-           print("  python main.py test_mixed")
-           sys.exit(1)
+           import metrics
+           import telemetry
+           try:
+               with telemetry.run(command):
+                   run_command(command)
+           finally:
+               # Cron mode: totals for node_exporter's textfile collector (when METRICS_TEXTFILE is set)
+               metrics.write_textfile()
    else:
        # Interactive menu for manual testing
        print("Cannabis Content Automation")
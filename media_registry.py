@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from config import MEDIA_REGISTRY_FILE, MEDIA_VERIFY_HOURS
+import metrics
+
+
+def file_sha256(path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaRegistry:
+    """Persisted content hash -> WordPress media ID map
+
+    Entries are checked against WordPress at most once per MEDIA_VERIFY_HOURS;
+    media deleted from the library is forgotten and uploaded again.
+    """
+
+    def __init__(self, client, registry_file=MEDIA_REGISTRY_FILE):
+        self.client = client
+        self.registry_file = registry_file
+        self.lock = threading.RLock()
+        self.entries = self.load_registry()
+
+    def load_registry(self):
+        """Load uploaded media from file"""
+        if os.path.exists(self.registry_file):
+            try:
+                with open(self.registry_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading media registry: {e}")
+        return {}
+
+    def save_registry(self):
+        """Save uploaded media atomically"""
+        temp_file = f"{self.registry_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(temp_file, self.registry_file)
+        except Exception as e:
+            print(f"Error saving media registry: {e}")
+
+    def needs_verification(self, entry):
+        verified_at = datetime.fromisoformat(entry['verified_at'])
+        return datetime.now() - verified_at > timedelta(hours=MEDIA_VERIFY_HOURS)
+
+    def verify(self, content_hash, entry):
+        """Check the media still exists, returns False if WordPress says it's gone"""
+        try:
+            response = self.client.get(f"media/{entry['media_id']}", fields='id', context='embed')
+        except Exception as e:
+            # Can't tell right now; keep using the cached ID
+            print(f"⚠️ Could not verify media {entry['media_id']}: {e}")
+            return True
+
+        if response.status_code in (404, 410):
+            print(f"Media {entry['media_id']} was deleted from WordPress, will upload again")
+            del self.entries[content_hash]
+            self.save_registry()
+            return False
+
+        if response.status_code == 200:
+            entry['verified_at'] = datetime.now().isoformat()
+            self.save_registry()
+        return True
+
+    def get_media_id(self, content_hash):
+        """Return the media ID already uploaded for this content, or None"""
+        with self.lock:
+            entry = self.entries.get(content_hash)
+            if entry and self.needs_verification(entry) and not self.verify(content_hash, entry):
+                entry = None
+            metrics.cache_lookup('media', bool(entry))
+            return entry['media_id'] if entry else None
+
+    def record(self, content_hash, media_id, file_name):
+        """Remember an upload"""
+        with self.lock:
+            now = datetime.now().isoformat()
+            self.entries[content_hash] = {
+                'media_id': media_id,
+                'file': file_name,
+                'uploaded_at': now,
+                'verified_at': now
+            }
+            self.save_registry()
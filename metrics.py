@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from config import METRICS_TEXTFILE, METRICS_STATE_FILE, METRICS_MAX_DOMAINS
+
+try:
+    import fcntl
+except ImportError:  # Windows: overlapping cron runs are not locked against each other
+    fcntl = None
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REGISTRY = []
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """A named metric with a fixed set of labels, one series per label combination"""
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.series = {}
+        REGISTRY.append(self)
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def dump(self):
+        """Series as JSON-friendly [[label values], value] pairs"""
+        with self.lock:
+            return [[list(key), json.loads(json.dumps(value))] for key, value in self.series.items()]
+
+    def reset(self):
+        with self.lock:
+            self.series = {}
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(series.items()):
+            lines.extend(self.render_series(key, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def merge(self, series, key, value):
+        series[key] = series.get(key, 0) + value
+
+    def render_series(self, key, value):
+        return [f"{self.name}{format_labels(self.labels, key)} {format_number(value)}"]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def new_value(self):
+        # Per-bucket counts (the last one is +Inf), sum, count
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self.lock:
+            counts, total, count = self.series.get(key) or self.new_value()
+            counts[index] += 1
+            self.series[key] = [counts, total + value, count + 1]
+
+    def merge(self, series, key, value):
+        counts, total, count = series.get(key) or self.new_value()
+        if len(value[0]) != len(counts):
+            return  # Saved with different buckets
+        series[key] = [[a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2]]
+
+    def render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = f'le="{format_number(bound)}"'
+            lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_number(round(total, 6))}")
+        lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'autoposting_stage_duration_seconds', 'Article pipeline stage duration', ('stage', 'status')
+)
+HTTP_REQUESTS = Counter(
+    'autoposting_http_requests_total', 'HTTP responses by domain and status code', ('domain', 'status')
+)
+HTTP_SECONDS = Histogram(
+    'autoposting_http_request_duration_seconds', 'HTTP response time by domain', ('domain',), HTTP_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    'autoposting_cache_lookups_total', 'Cache lookups by cache and result (hit or miss)', ('cache', 'result')
+)
+TRACKER_QUERIES = Counter(
+    'autoposting_tracker_queries_total', 'Used-article database queries by operation', ('operation',)
+)
+LLM_REQUESTS = Counter(
+    'autoposting_llm_requests_total', 'Claude API attempts by model and status', ('model', 'status')
+)
+LLM_TOKENS = Counter(
+    'autoposting_llm_tokens_total', 'Claude tokens by model and direction (input or output)', ('model', 'direction')
+)
+LLM_SECONDS = Histogram(
+    'autoposting_llm_request_duration_seconds', 'Claude API latency by model', ('model',)
+)
+POSTS_PUBLISHED = Counter(
+    'autoposting_posts_published_total', 'Posts published to WordPress by source', ('source',)
+)
+PUBLISH_FAILURES = Counter(
+    'autoposting_publish_failures_total', 'Failed publish attempts by source', ('source',)
+)
+SCRAPE_ARTICLES = Counter(
+    'autoposting_scrape_articles_total',
+    'Scraped articles by source and step (seen links, fetched pages, accepted articles)',
+    ('source', 'step')
+)
+
+_domains = set()
+_domains_lock = threading.Lock()
+
+
+def domain_label(url):
+    """Host of url; hosts past METRICS_MAX_DOMAINS are grouped as 'other' (external link checks hit any site)"""
+    host = urlparse(url).hostname or 'unknown'
+    with _domains_lock:
+        if host in _domains:
+            return host
+        if len(_domains) >= METRICS_MAX_DOMAINS:
+            return 'other'
+        _domains.add(host)
+        return host
+
+
+def observe_response(response, seconds=None):
+    """Count an HTTP response for its domain and status code"""
+    domain = domain_label(response.url)
+    HTTP_REQUESTS.inc(domain=domain, status=response.status_code)
+    if seconds is None and response.elapsed is not None:
+        seconds = response.elapsed.total_seconds()
+    if seconds is not None:
+        HTTP_SECONDS.observe(seconds, domain=domain)
+
+
+def cache_lookup(cache, hit, count=1):
+    if count:
+        CACHE_LOOKUPS.inc(count, cache=cache, result='hit' if hit else 'miss')
+
+
+def scraped(source, step, count=1):
+    """Scrape yield: step is 'seen' (candidate links), 'fetched' (pages extracted) or 'accepted'"""
+    if count:
+        SCRAPE_ARTICLES.inc(count, source=source, step=step)
+
+
+def render(state=None):
+    """Prometheus text exposition of this process's metrics, or of saved state"""
+    lines = []
+    for metric in REGISTRY:
+        if state is None:
+            with metric.lock:
+                series = dict(metric.series)
+        else:
+            series = {tuple(key): value for key, value in state.get(metric.name, [])}
+        lines.extend(metric.render(series))
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def locked(path):
+    with open(path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_atomic(path, text):
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_file, path)
+
+
+def write_textfile(path=METRICS_TEXTFILE, state_file=METRICS_STATE_FILE):
+    """Add this process's metrics to the totals in state_file and write them to path for node_exporter
+
+    Each cron run is a new process, so counters are kept in state_file between runs; the
+    process's own series are cleared once saved.
+    """
+    if not path:
+        return False
+    try:
+        with locked(f"{state_file}.lock"):
+            state = {}
+            if os.path.exists(state_file):
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+
+            for metric in REGISTRY:
+                series = {tuple(key): value for key, value in state.get(metric.name, [])}
+                for key, value in metric.dump():
+                    metric.merge(series, tuple(key), value)
+                state[metric.name] = [[list(key), value] for key, value in series.items()]
+                metric.reset()
+
+            write_atomic(state_file, json.dumps(state))
+            write_atomic(path, render(state))
+        return True
+    except Exception as e:
+        print(f"Error writing metrics textfile: {e}")
+        return False
@@ -0,0 +1,147 @@
+import json
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Minimal in-memory Anthropic Message Batches API for local testing:
+#   python mock_anthropic.py [port] [--fail-creates N]
+# then run anything with ANTHROPIC_BASE_URL=http://127.0.0.1:<port> ANTHROPIC_API_KEY=test
+# A batch ends on its second status check; every request succeeds with a canned
+# reply chosen by its custom_id prefix (rewrite-0 -> REPLIES['rewrite']).
+
+REPLIES = {
+    'rewrite': "TITLE: Senate Advances Cannabis Banking Bill\nCATEGORY: politics\nTAG: politics\n"
+               "CONTENT: <p>The Senate advanced a cannabis banking bill on Tuesday.</p>",
+    'sources': "SOURCE 1: https://www.congress.gov/ | Bill text",
+    'placement': "<p>The Senate advanced a cannabis banking bill on Tuesday.</p>"
+}
+
+
+def timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class MockAnthropic:
+    """Batch state; fail_creates makes the next N submissions return a 529"""
+
+    def __init__(self, fail_creates=0):
+        self.fail_creates = fail_creates
+        self.lock = threading.Lock()
+        self.batches = {}
+        self.log = []
+
+    def batch_object(self, batch):
+        ended = batch['checks'] > 1
+        count = len(batch['requests'])
+        return {
+            'id': batch['id'],
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {
+                'processing': 0 if ended else count, 'succeeded': count if ended else 0,
+                'errored': 0, 'canceled': 0, 'expired': 0
+            },
+            'created_at': timestamp(batch['created_at']),
+            'expires_at': timestamp(batch['created_at'] + timedelta(days=1)),
+            'ended_at': timestamp(batch['created_at']) if ended else None,
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'results_url': f"/v1/messages/batches/{batch['id']}/results" if ended else None
+        }
+
+    def create(self, body):
+        if self.fail_creates:
+            self.fail_creates -= 1
+            return 529, {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}}
+        batch_id = f"msgbatch_mock{len(self.batches) + 1:04d}"
+        self.batches[batch_id] = {
+            'id': batch_id, 'requests': body['requests'], 'checks': 0, 'created_at': datetime.now(timezone.utc)
+        }
+        return 200, self.batch_object(self.batches[batch_id])
+
+    def list(self):
+        batches = sorted(self.batches.values(), key=lambda b: b['created_at'], reverse=True)
+        data = [self.batch_object(b) for b in batches]
+        return 200, {
+            'data': data, 'has_more': False,
+            'first_id': data[0]['id'] if data else None, 'last_id': data[-1]['id'] if data else None
+        }
+
+    def results(self, batch):
+        lines = []
+        for request in batch['requests']:
+            text = REPLIES.get(request['custom_id'].split('-')[0], 'OK')
+            lines.append(json.dumps({
+                'custom_id': request['custom_id'],
+                'result': {'type': 'succeeded', 'message': {
+                    'id': f"msg_{request['custom_id']}", 'type': 'message', 'role': 'assistant',
+                    'model': request['params']['model'], 'content': [{'type': 'text', 'text': text}],
+                    'stop_reason': 'end_turn', 'stop_sequence': None,
+                    'usage': {'input_tokens': 100, 'output_tokens': 50}
+                }}
+            }))
+        return '\n'.join(lines).encode()
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body, content_type='application/json'):
+            payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def not_found(self):
+            self.send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            with api.lock:
+                api.log.append({'method': 'POST', 'path': self.path})
+                if urlparse(self.path).path != '/v1/messages/batches':
+                    return self.not_found()
+                return self.send(*api.create(json.loads(raw or b'{}')))
+
+        def do_GET(self):
+            parts = urlparse(self.path).path.strip('/').split('/')
+            with api.lock:
+                api.log.append({'method': 'GET', 'path': self.path})
+                if parts[:3] != ['v1', 'messages', 'batches']:
+                    return self.not_found()
+                if len(parts) == 3:
+                    return self.send(*api.list())
+                batch = api.batches.get(parts[3])
+                if not batch:
+                    return self.not_found()
+                if len(parts) == 5 and parts[4] == 'results':
+                    return self.send(200, api.results(batch), 'application/binary')
+                batch['checks'] += 1
+                return self.send(200, api.batch_object(batch))
+
+    return Handler
+
+
+def serve(port=8788, fail_creates=0):
+    """Start the mock API in a background thread, returns (server, api)"""
+    api = MockAnthropic(fail_creates)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(api))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, api
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8788
+    fail_creates = int(sys.argv[sys.argv.index('--fail-creates') + 1]) if '--fail-creates' in sys.argv else 0
+    server, api = serve(port, fail_creates)
+    print(f"Mock Anthropic batches API on http://127.0.0.1:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,257 @@
+import json
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Minimal in-memory WordPress REST API for local testing:
+#   python mock_wordpress.py [port] [--no-batch]
+# then run anything with WORDPRESS_URL=http://127.0.0.1:<port>
+# GET /__requests returns every request the server has seen.
+
+POST_TYPES = ('posts', 'news', 'cannabis-lifestyle')
+TAXONOMIES = ('categories', 'tags')
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+class MockWordPress:
+    """The site state plus a router shared by normal and /batch/v1 requests"""
+
+    def __init__(self, batch_enabled=True):
+        self.batch_enabled = batch_enabled
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.items = {name: [] for name in POST_TYPES + TAXONOMIES + ('media',)}
+        self.users = [{'id': 1, 'name': 'rohan', 'slug': 'rohan'}, {'id': 2, 'name': 'kaleb', 'slug': 'kaleb'}]
+        self.log = []
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def now(self):
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def error(self, status, code, message, data=None):
+        return status, {'code': code, 'message': message, 'data': dict(data or {}, status=status)}
+
+    def select_fields(self, item, fields):
+        if not fields:
+            return item
+        return {key: item[key] for key in fields.split(',') if key in item}
+
+    def list_items(self, collection, query):
+        items = list(self.items[collection])
+        if 'slug' in query:
+            slugs = query['slug'].split(',')
+            items = [i for i in items if i.get('slug') in slugs]
+        if 'search' in query:
+            items = [i for i in items if query['search'].lower() in i.get('name', i.get('title', {}).get('rendered', '')).lower()]
+        if 'modified_after' in query:
+            items = [i for i in items if i.get('modified', '') > query['modified_after']]
+        if collection in POST_TYPES:
+            statuses = query.get('status', 'publish').split(',')
+            items = [i for i in items if i['status'] in statuses]
+
+        per_page = int(query.get('per_page', 10))
+        page = int(query.get('page', 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        page_items = [self.select_fields(i, query.get('_fields')) for i in items[(page - 1) * per_page:page * per_page]]
+        return 200, page_items, {'X-WP-Total': str(len(items)), 'X-WP-TotalPages': str(total_pages)}
+
+    def create_term(self, taxonomy, body):
+        slug = slugify(body['name'])
+        for term in self.items[taxonomy]:
+            if term['slug'] == slug:
+                return self.error(400, 'term_exists', 'A term with the name provided already exists.', {'term_id': term['id']})
+        term = {'id': self.new_id(), 'name': body['name'], 'slug': slug, 'count': 0}
+        self.items[taxonomy].append(term)
+        return 201, term
+
+    def drop_unknown_terms(self, body):
+        """Like WordPress, silently skip term IDs that don't exist (e.g. a deleted category)"""
+        body = dict(body)
+        for taxonomy in TAXONOMIES:
+            if taxonomy in body:
+                known = set(t['id'] for t in self.items[taxonomy])
+                body[taxonomy] = [term_id for term_id in body[taxonomy] if term_id in known]
+        return body
+
+    def create_post(self, post_type, body):
+        body = self.drop_unknown_terms(body)
+        slug = body.get('slug') or slugify(body['title'])
+        taken = set(p['slug'] for p in self.items[post_type])
+        suffix = 2
+        base_slug = slug
+        while slug in taken:
+            slug = f"{base_slug}-{suffix}"
+            suffix += 1
+
+        now = self.now()
+        post = {
+            'id': self.new_id(),
+            'slug': slug,
+            'status': body.get('status', 'draft'),
+            'link': f"https://mock.local/{post_type}/{slug}/",
+            'title': {'rendered': body['title']},
+            'content': {'rendered': body.get('content', '')},
+            'excerpt': {'rendered': f"<p>{re.sub(r'<[^>]+>', '', body.get('content', ''))[:150]}</p>"},
+            'date_gmt': None if body.get('status', 'draft') in ('draft', 'pending') else now,  # Undated drafts, as in WordPress
+            'modified': now,
+            'modified_gmt': now,
+            'categories': body.get('categories', []),
+            'tags': body.get('tags', []),
+            'featured_media': body.get('featured_media', 0),
+            'author': body.get('author', 1)
+        }
+        self.items[post_type].append(post)
+        return 201, post
+
+    def find(self, collection, item_id):
+        for item in self.items[collection]:
+            if item['id'] == item_id:
+                return item
+        return None
+
+    def route(self, method, path, query, body):
+        """Handle one REST request, returns (status, body) or (status, body, headers)"""
+        match = re.match(r'^/wp-json/wp/v2/([\w-]+)(?:/(\d+))?/?$', path)
+        if not match:
+            return self.error(404, 'rest_no_route', 'No route was found matching the URL and request method.')
+        collection, item_id = match.group(1), match.group(2)
+
+        if collection == 'users' and method == 'GET':
+            return self.list_items_from(self.users, query)
+        if collection not in self.items:
+            return self.error(404, 'rest_no_route', 'No route was found matching the URL and request method.')
+
+        if item_id:
+            item = self.find(collection, int(item_id))
+            if not item:
+                return self.error(404, 'rest_post_invalid_id', 'Invalid post ID.')
+            if method == 'GET':
+                return 200, self.select_fields(item, query.get('_fields'))
+            if method == 'POST':
+                item.update(self.drop_unknown_terms(body or {}))
+                item['modified'] = self.now()
+                return 200, item
+            if method == 'DELETE':
+                self.items[collection].remove(item)
+                return 200, {'deleted': True, 'previous': item}
+
+        if method == 'GET':
+            return self.list_items(collection, query)
+        if method == 'POST' and collection in TAXONOMIES:
+            return self.create_term(collection, body)
+        if method == 'POST' and collection in POST_TYPES:
+            return self.create_post(collection, body)
+        return self.error(405, 'rest_no_route', 'Method not allowed.')
+
+    def list_items_from(self, items, query):
+        if 'search' in query:
+            items = [i for i in items if query['search'].lower() in i['name'].lower()]
+        return 200, [self.select_fields(i, query.get('_fields')) for i in items]
+
+    def upload_media(self, file_name, size, fields):
+        media = {
+            'id': self.new_id(),
+            'slug': slugify(file_name),
+            'title': {'rendered': fields.get('title', file_name)},
+            'alt_text': fields.get('alt_text', ''),
+            'source_url': f"https://mock.local/uploads/{file_name}",
+            'media_details': {'filesize': size},
+            'post': None,
+            'modified': self.now()
+        }
+        self.items['media'].append(media)
+        return 201, media
+
+    def run_batch(self, body):
+        requests_list = body.get('requests', [])
+        if len(requests_list) > 25:
+            return self.error(400, 'rest_invalid_param', 'Invalid parameter(s): requests')
+
+        responses = []
+        for item in requests_list:
+            parsed = urlparse(item['path'])
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            result = self.route(item.get('method', 'POST'), '/wp-json' + parsed.path, query, item.get('body') or {})
+            responses.append({'status': result[0], 'body': result[1], 'headers': {}})
+        return 207, {'responses': responses}
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def handle_request(self, method):
+            parsed = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            with site.lock:
+                site.log.append({'method': method, 'path': self.path, 'bytes': len(raw)})
+                if parsed.path == '/__requests':
+                    return self.send(200, site.log)
+
+                if parsed.path == '/wp-json/batch/v1':
+                    if not site.batch_enabled:
+                        return self.send(*site.error(404, 'rest_no_route', 'No route was found matching the URL and request method.'))
+                    return self.send(*site.run_batch(json.loads(raw or b'{}')))
+
+                if parsed.path.rstrip('/') == '/wp-json/wp/v2/media' and method == 'POST':
+                    content_type = self.headers.get('Content-Type', '')
+                    file_name = re.search(rb'filename="([^"]+)"', raw)
+                    fields = dict((k.decode(), v.decode()) for k, v in re.findall(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n', raw))
+                    if 'multipart/form-data' not in content_type or not file_name:
+                        return self.send(*site.error(400, 'rest_upload_no_data', 'No data supplied.'))
+                    return self.send(*site.upload_media(file_name.group(1).decode(), len(raw), fields))
+
+                body = json.loads(raw) if raw and 'json' in self.headers.get('Content-Type', '') else {}
+                return self.send(*site.route(method, parsed.path, query, body))
+
+        def do_GET(self):
+            self.handle_request('GET')
+
+        def do_POST(self):
+            self.handle_request('POST')
+
+        def do_DELETE(self):
+            self.handle_request('DELETE')
+
+    return Handler
+
+
+def serve(port=8787, batch_enabled=True):
+    """Start the mock site in a background thread, returns (server, site)"""
+    site = MockWordPress(batch_enabled)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8787
+    batch_enabled = '--no-batch' not in sys.argv
+    server, site = serve(port, batch_enabled)
+    print(f"Mock WordPress on http://127.0.0.1:{port} (batch {'enabled' if batch_enabled else 'disabled'})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,28 +1,36 @@
-import requests
 from bs4 import BeautifulSoup
-from anthropic import Anthropic
-from config import ANTHROPIC_API_KEY, WP_TAG_MAPPING
+from config import WP_TAG_MAPPING, SCRAPE_DELAY_SECONDS
+from llm_gateway import get_llm_gateway
 from database_article_tracker import DatabaseArticleTracker as ArticleTracker
 from internal_linking import InternalLinking
 from external_linking import ExternalLinking
+from content_condenser import ContentCondenser
+from article_pipeline import ArticlePipeline
+from http_session import get_http_session
+import metrics
+import telemetry
 import random
 import time
 from datetime import datetime, timedelta
 
 class CannabisNewsProcessor2:
     def __init__(self):
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.llm = get_llm_gateway()
         self.article_tracker = ArticleTracker()
+        self.http = get_http_session()
         self.internal_linking = InternalLinking()
         self.external_linking = ExternalLinking()
-        # Only process articles from last 2 weeks
-        self.cutoff_date = datetime.now() - timedelta(days=14)
+        self.content_condenser = ContentCondenser()
+        self.article_pipeline = ArticlePipeline(self.internal_linking, self.external_linking, self.article_tracker,
+                                                source='us_2')
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
     def is_article_too_old(self, article_data):
         """Check if article is older than 2 weeks"""
+        # Computed per call: the scheduler daemon keeps one processor for days
+        cutoff_date = datetime.now() - timedelta(days=14)
         title = article_data.get('title', '')
         content = article_data.get('content', '')
         
@@ -55,7 +63,7 @@ class CannabisNewsProcessor2:
                         month = month_map[month_name]
                         article_date = datetime(year, month, day)
                         
-                        if article_date < self.cutoff_date:
+                        if article_date < cutoff_date:
                             print(f"Skipping old article from {article_date.date()}: {title[:50]}...")
                             return True
                 except (ValueError, IndexError):
@@ -104,13 +112,14 @@ class CannabisNewsProcessor2:
         else:
             return 'business'
     
+    @telemetry.traced('scrape.cannabis_business_times')
     def scrape_cannabis_business_times_articles(self):
         """Scrape articles from Cannabis Business Times top stories"""
         articles = []
         
         try:
             print("Scraping from Cannabis Business Times top stories...")
-            response = requests.get('https://www.cannabisbusinesstimes.com/top-stories', headers=self.headers, timeout=15)
+            response = self.http.get('https://www.cannabisbusinesstimes.com/top-stories', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -142,6 +151,7 @@ class CannabisNewsProcessor2:
                 print(f"  Total article links found: {len(article_links)}")
                 
                 # Process articles and randomize order
+                metrics.scraped('cannabis_business_times', 'seen', len(article_links))
                 random.shuffle(article_links)
                 articles_to_process = min(10, len(article_links))
                 
@@ -158,6 +168,7 @@ class CannabisNewsProcessor2:
                     
                     # Get article content
                     content = self.extract_generic_content(article_url)
+                    metrics.scraped('cannabis_business_times', 'fetched')
                     if content and len(content.split()) >= 200:
                         # Auto-categorize based on content or use business as default
                         category = self.determine_category(content, title)
@@ -173,25 +184,27 @@ class CannabisNewsProcessor2:
                         if self.is_article_too_old(article_data):
                             continue
                         
+                        metrics.scraped('cannabis_business_times', 'accepted')
                         articles.append(article_data)
                         print(f"  ✓ Added article: {title[:50]}... ({len(content.split())} words) - {category}")
                     else:
                         print(f"  ✗ Skipped (content too short or extraction failed)")
                     
-                    time.sleep(2)
+                    time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping Cannabis Business Times: {e}")
         
         return articles
     
+    @telemetry.traced('scrape.hemp_today')
     def scrape_hemp_today_articles(self):
         """Scrape articles from Hemp Today homepage"""
         articles = []
         
         try:
             print("Scraping from Hemp Today homepage...")
-            response = requests.get('https://hemptoday.net/', headers=self.headers, timeout=15)
+            response = self.http.get('https://hemptoday.net/', headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -223,6 +236,7 @@ class CannabisNewsProcessor2:
                         print(f"  Found Hemp Today article: {text[:60]}...")
                 
                 # Randomize and process articles
+                metrics.scraped('hemp_today', 'seen', len(article_links))
                 random.shuffle(article_links)
                 for article_link in article_links[:5]:
                     # Check if already used in JSON file
@@ -231,6 +245,7 @@ class CannabisNewsProcessor2:
                         continue
                         
                     content = self.extract_generic_content(article_link['url'])
+                    metrics.scraped('hemp_today', 'fetched')
                     if content and len(content.split()) >= 200:
                         category = self.determine_category(content, article_link['title'])
                         article_data = {
@@ -245,9 +260,10 @@ class CannabisNewsProcessor2:
                         if self.is_article_too_old(article_data):
                             continue
                         
+                        metrics.scraped('hemp_today', 'accepted')
                         articles.append(article_data)
                         print(f"  ✓ Added Hemp Today article: {article_link['title'][:50]}... ({len(content.split())} words) - {category}")
-                    time.sleep(2)
+                    time.sleep(SCRAPE_DELAY_SECONDS)
                     
         except Exception as e:
             print(f"Error scraping Hemp Today: {e}")
@@ -297,11 +313,12 @@ class CannabisNewsProcessor2:
         
         return True
     
+    @telemetry.traced('extract.article')
     def extract_generic_content(self, url):
         """Extract content from any cannabis news article"""
         try:
             print(f"    Extracting content from: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = self.http.get(url, headers=self.headers, timeout=15)
             if response.status_code != 200:
                 print(f"    Failed to fetch {url} (status: {response.status_code})")
                 return None
@@ -338,7 +355,7 @@ class CannabisNewsProcessor2:
                             substantial_paragraphs.append(text)
                     
                     if substantial_paragraphs:
-                        clean_text = ' '.join(substantial_paragraphs)
+                        clean_text = '\n\n'.join(substantial_paragraphs)
                         word_count = len(clean_text.split())
                         
                         if word_count >= 200:
@@ -352,6 +369,7 @@ class CannabisNewsProcessor2:
             print(f"    ✗ Error extracting content from {url}: {e}")
             return None
     
+    @telemetry.traced('scrape')
     def scrape_cannabis_articles(self):
         """Main scraping method for processor 2"""
         print("Scraping cannabis news sources (Processor 2)...")
@@ -367,6 +385,7 @@ class CannabisNewsProcessor2:
         
         return unused_articles
     
+    @telemetry.traced('choose_article')
     def choose_best_article(self, articles):
         """Choose the best article from scraped content"""
         if not articles:
@@ -385,29 +404,25 @@ class CannabisNewsProcessor2:
         print(f"Chose article: {chosen['title'][:50]}... ({chosen['word_count']} words)")
         return chosen
     
-    def rewrite_cannabis_article(self, original_article):
-        """Rewrite cannabis article with specific requirements"""
-        
-        print(f"Rewriting article with Claude...")
-        
+    def build_rewrite_prompt(self, original_article):
+        """Build the Claude prompt used to rewrite an article"""
         original_title = original_article['title']
-        original_content = original_article['content']
+        original_content, condense_stats = self.content_condenser.condense(original_article['content'], original_title)
+        original_article['input_tokens_saved'] = condense_stats['tokens_saved']
+        print(f"Condensed source text: {condense_stats['original_tokens']} -> {condense_stats['condensed_tokens']} tokens "
+              f"(saved {condense_stats['tokens_saved']} input tokens)")
         category = original_article['category']
         target_word_count = original_article['word_count']
         
         # Map category to WordPress tag
         wp_tag = WP_TAG_MAPPING.get(category, 'cannabis-news')
         
-        print(f"Original title: {original_title}")
-        print(f"Category: {category}, Tag: {wp_tag}")
-        print(f"Target word count: {target_word_count}")
-        
         prompt = f"""
         You are a cannabis industry journalist. Rewrite this cannabis news article following these exact specifications:
 
         ORIGINAL ARTICLE:
         Title: {original_title}
-        Content: {original_content[:2000]}...
+        Content: {original_content}
         Category: {category}
         Original Word Count: {target_word_count}
 
@@ -429,17 +444,37 @@ class CannabisNewsProcessor2:
         Write the content with proper HTML formatting including <h2>, <h3> tags for headings and <p> tags for paragraphs. DO NOT include any <h1> tags as WordPress will use the title as H1.
         """
         
+        return prompt
+    
+    @telemetry.traced('claude.rewrite')
+    def rewrite_cannabis_article(self, original_article, cancel_event=None, max_tokens=3000):
+        """Rewrite cannabis article with specific requirements"""
+        
+        print(f"Rewriting article with Claude...")
+        
+        category = original_article['category']
+        print(f"Original title: {original_article['title']}")
+        print(f"Category: {category}, Tag: {WP_TAG_MAPPING.get(category, 'cannabis-news')}")
+        print(f"Target word count: {original_article['word_count']}")
+        
+        prompt = self.build_rewrite_prompt(original_article)
+        
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5",
-                max_tokens=3000,
-                messages=[{"role": "user", "content": prompt}]
+            response = self.llm.create_message(
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                purpose='rewrite',
+                cancel_event=cancel_event
             )
             
             print("✓ Received response from Claude")
             claude_response = response.content[0].text
             
             parsed = self.parse_cannabis_response(claude_response)
+            # 'max_tokens' means the article was cut off mid-sentence
+            parsed['stop_reason'] = getattr(response, 'stop_reason', None)
+            if parsed['stop_reason'] == 'max_tokens':
+                print(f"⚠️ Rewrite hit the {max_tokens} token limit and is truncated")
             print(f"Parsed response - Title: {parsed.get('title', 'NO TITLE')}")
             print(f"Parsed response - Content length: {len(parsed.get('content', ''))}")
             
@@ -487,10 +522,19 @@ class CannabisNewsProcessor2:
         
         return result
     
-    def get_cannabis_article(self):
-        """Main method to get and rewrite a cannabis article"""
+    @telemetry.traced('news.get_article')
+    def get_cannabis_article(self, image_manager=None, checkpointed=False):
+        """Main method to get and rewrite a cannabis article
+
+        checkpointed is for callers that queue the article in the outbox, which closes its checkpoint.
+        """
         print("=== STARTING CANNABIS ARTICLE GENERATION (PROCESSOR 2) ===")
         
+        # An article an earlier run marked used but didn't finish comes before a new scrape
+        resumed = checkpointed and self.article_pipeline.resume_next(self.rewrite_cannabis_article, image_manager)
+        if resumed:
+            return resumed
+        
         # Step 1: Scrape articles
         articles = self.scrape_cannabis_articles()
         
@@ -514,52 +558,21 @@ class CannabisNewsProcessor2:
             chosen_article['category']
         )
         
-        # Step 4: Extract external links from original article
-        print("Extracting external links from original article...")
-        original_external_links = self.external_linking.extract_links_from_original(chosen_article['url'])
-        
-        # Step 5: Rewrite with Claude
+        # Steps 4-10: harvest original links, rewrite, add internal/external links
+        # (and upload the featured image) with independent stages running concurrently
         print(f"Rewriting article: {chosen_article['title'][:50]}...")
-        rewritten = self.rewrite_cannabis_article(chosen_article)
+        rewritten = self.article_pipeline.run(
+            chosen_article,
+            self.rewrite_cannabis_article,
+            primary_tag='US Cannabis News',
+            tag_field='tag',
+            image_manager=image_manager,
+            image_category=chosen_article['category'],
+            alternates=articles,
+            checkpointed=checkpointed
+        )
         
         if rewritten:
-            print("✓ Article generation completed successfully")
-            
-            # Step 6: Add primary tag and secondary tag
-            secondary_tag = rewritten.get('tag', 'business')
-            rewritten['tags'] = ['US Cannabis News', secondary_tag]
-            
-            # Remove the old single tag field since we now have tags array
-            if 'tag' in rewritten:
-                del rewritten['tag']
-            
-            # Step 7: Add internal links
-            print("Adding internal links...")
-            rewritten['content'] = self.internal_linking.add_internal_links(
-                rewritten['content'], 
-                rewritten['title']
-            )
-            
-            # Step 8: Find additional external sources if needed
-            additional_sources = self.external_linking.find_additional_sources(
-                rewritten['content'], 
-                rewritten['title'], 
-                len(original_external_links)
-            )
-            
-            # Step 9: Combine all external links
-            all_external_links = original_external_links + additional_sources
-            
-            # Step 10: Add external links to content
-            if all_external_links:
-                rewritten['content'] = self.external_linking.add_external_links_to_content(
-                    rewritten['content'], 
-                    all_external_links
-                )
-            
-            # Add original URL to rewritten article for tracking
-            rewritten['original_url'] = chosen_article['url']
-            
             print(f"Article will be tagged with: {', '.join(rewritten['tags'])}")
         else:
             print("✗ Article generation failed")
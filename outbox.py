@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from config import (
+    POSTING_HOURS, OUTBOX_DB_FILE, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_DELAY, OUTBOX_RETRY_MAX_DELAY,
+    OUTBOX_PUBLISH_INTERVAL, OUTBOX_MAX_PER_RUN, OUTBOX_CLAIM_TIMEOUT
+)
+from wordpress_client import slugify
+import article_checkpoints
+import metrics
+
+LEGACY_QUEUE_FILE = "publish_queue.json"
+
+
+class Outbox:
+    """Durable SQLite table of fully rendered posts waiting to be published
+
+    Generation writes finished articles here; OutboxPublisher drains the ones
+    whose slot has arrived. An entry is claimed before it's sent, so two
+    publishers never post the same article.
+    """
+
+    def __init__(self, db_file=OUTBOX_DB_FILE):
+        self.db_file = db_file
+        self.init_database()
+        self.import_legacy_queue()
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Create the table if it doesn't exist"""
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    category TEXT,
+                    tags TEXT NOT NULL,
+                    original_url TEXT,
+                    author_name TEXT,
+                    image_category TEXT,
+                    featured_image_id INTEGER,
+                    scheduled_for TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TEXT,
+                    claimed_at TEXT,
+                    last_error TEXT,
+                    queued_at TEXT NOT NULL,
+                    published_at TEXT,
+                    wordpress_post_id INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, scheduled_for)")
+            article_checkpoints.create_table(conn)
+        conn.close()
+
+    def import_legacy_queue(self):
+        """Move pending posts from the old publish_queue.json into the table, once"""
+        if not os.path.exists(LEGACY_QUEUE_FILE):
+            return
+        try:
+            with open(LEGACY_QUEUE_FILE, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"Error loading {LEGACY_QUEUE_FILE}: {e}")
+            return
+
+        pending = [entry for entry in entries if entry.get('status') == 'pending']
+        with self.get_connection() as conn:
+            for entry in pending:
+                conn.execute("""
+                    INSERT OR IGNORE INTO outbox (id, source, title, content, category, tags, original_url,
+                        author_name, image_category, scheduled_for, queued_at, last_error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    entry['id'], entry['source'], entry['title'], entry['content'], entry.get('category', ''),
+                    json.dumps(entry.get('tags', [])), entry.get('original_url'), entry.get('author_name'),
+                    entry.get('image_category'), entry['scheduled_for'], entry['queued_at'], entry.get('last_error')
+                ))
+        conn.close()
+        os.replace(LEGACY_QUEUE_FILE, f"{LEGACY_QUEUE_FILE}.imported")
+        print(f"✓ Moved {len(pending)} pending posts from {LEGACY_QUEUE_FILE} into the outbox")
+
+    def row_to_entry(self, row):
+        entry = dict(row)
+        entry['tags'] = json.loads(entry['tags'])
+        return entry
+
+    def next_posting_slots(self, count, after=None):
+        """Get the next free POSTING_HOURS slots after the given time"""
+        after = after or datetime.now()
+        conn = self.get_connection()
+        taken = set(row['scheduled_for'] for row in conn.execute(
+            "SELECT scheduled_for FROM outbox WHERE status IN ('pending', 'publishing')"
+        ))
+        conn.close()
+
+        slots = []
+        day = after.replace(minute=0, second=0, microsecond=0)
+        while len(slots) < count:
+            for hour in sorted(POSTING_HOURS):
+                slot = day.replace(hour=hour)
+                if slot > after and slot.isoformat() not in taken:
+                    slots.append(slot)
+                    if len(slots) == count:
+                        break
+            day = (day + timedelta(days=1)).replace(hour=0)
+
+        return slots
+
+    def enqueue(self, article, source, author_name, image_category, scheduled_for=None):
+        """Store a finished article for publishing at the given time (now if None)"""
+        scheduled_for = scheduled_for or datetime.now()
+        entry = {
+            'id': uuid.uuid4().hex,
+            'source': source,
+            'title': article['title'],
+            'content': article['content'],
+            'category': article.get('category', ''),
+            'tags': article.get('tags', []),
+            'original_url': article.get('original_url'),
+            'author_name': author_name,
+            'image_category': image_category or article.get('category', ''),
+            'featured_image_id': article.get('featured_image_id'),
+            'scheduled_for': scheduled_for.isoformat(),
+            'status': 'pending',
+            'attempts': 0,
+            'queued_at': datetime.now().isoformat()
+        }
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO outbox (id, source, title, content, category, tags, original_url, author_name,
+                    image_category, featured_image_id, scheduled_for, status, attempts, queued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                entry['id'], entry['source'], entry['title'], entry['content'], entry['category'],
+                json.dumps(entry['tags']), entry['original_url'], entry['author_name'], entry['image_category'],
+                entry['featured_image_id'], entry['scheduled_for'], entry['status'], entry['attempts'],
+                entry['queued_at']
+            ))
+            if article.get('checkpoint_id'):
+                # Same transaction: the article is either still checkpointed or in the outbox, never both
+                article_checkpoints.mark_queued(conn, article['checkpoint_id'], entry['id'])
+        conn.close()
+        print(f"✓ Queued for {scheduled_for:%Y-%m-%d %H:%M}: {article['title'][:50]}...")
+        return entry
+
+    def get_due_posts(self, now=None):
+        """Get pending posts whose slot (and retry time) has arrived, oldest first"""
+        now = (now or datetime.now()).isoformat()
+        conn = self.get_connection()
+        rows = conn.execute("""
+            SELECT * FROM outbox
+            WHERE status = 'pending' AND scheduled_for <= ? AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+            ORDER BY scheduled_for
+        """, (now, now)).fetchall()
+        conn.close()
+        return [self.row_to_entry(row) for row in rows]
+
+    def claim(self, entry_id, now=None):
+        """Mark a due post as being published, returns the entry or None if another publisher has it
+
+        A claim older than OUTBOX_CLAIM_TIMEOUT belongs to a publisher that died
+        and can be taken over.
+        """
+        now = now or datetime.now()
+        stale = (now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)).isoformat()
+        conn = self.get_connection()
+        with conn:
+            cursor = conn.execute("""
+                UPDATE outbox SET status = 'publishing', claimed_at = ?, attempts = attempts + 1
+                WHERE id = ? AND (status = 'pending' OR (status = 'publishing' AND claimed_at < ?))
+            """, (now.isoformat(), entry_id, stale))
+            row = conn.execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone() if cursor.rowcount else None
+        conn.close()
+        return self.row_to_entry(row) if row else None
+
+    def release_stale_claims(self, now=None):
+        """Put posts claimed by a publisher that died back in the queue"""
+        now = now or datetime.now()
+        stale = (now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)).isoformat()
+        with self.get_connection() as conn:
+            released = conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'publishing' AND claimed_at < ?", (stale,)
+            ).rowcount
+        conn.close()
+        return released
+
+    def mark_published(self, entry_id, wordpress_post_id):
+        """Mark a queued post as published"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                UPDATE outbox SET status = 'published', wordpress_post_id = ?, published_at = ?, last_error = NULL
+                WHERE id = ?
+            """, (wordpress_post_id, datetime.now().isoformat(), entry_id))
+        conn.close()
+
+    def mark_failed(self, entry_id, error):
+        """Schedule a retry with backoff, or give up after OUTBOX_MAX_ATTEMPTS"""
+        conn = self.get_connection()
+        with conn:
+            row = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+            attempts = row['attempts'] if row else 0
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                conn.execute("UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, entry_id))
+                print(f"✗ Giving up on queued post after {attempts} attempts")
+            else:
+                delay = min(OUTBOX_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), OUTBOX_RETRY_MAX_DELAY)
+                next_attempt = datetime.now() + timedelta(seconds=delay)
+                conn.execute(
+                    "UPDATE outbox SET status = 'pending', last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    (error, next_attempt.isoformat(), entry_id)
+                )
+                print(f"Will retry queued post at {next_attempt:%Y-%m-%d %H:%M}")
+        conn.close()
+
+    def get_stats(self):
+        """Get counts of queued posts by status"""
+        conn = self.get_connection()
+        stats = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        conn.close()
+        return stats
+
+
+class OutboxPublisher:
+    """Drain due outbox entries into WordPress with retries and a minimum gap between posts"""
+
+    def __init__(self, wp_api, image_manager=None, article_tracker=None, outbox=None):
+        self.wp_api = wp_api
+        self.image_manager = image_manager
+        self.article_tracker = article_tracker
+        self.outbox = outbox or Outbox()
+        self.last_publish_time = 0
+
+    def wait_for_rate_limit(self):
+        elapsed = time.monotonic() - self.last_publish_time
+        if self.last_publish_time and elapsed < OUTBOX_PUBLISH_INTERVAL:
+            time.sleep(OUTBOX_PUBLISH_INTERVAL - elapsed)
+
+    def find_existing_post(self, entry):
+        """A retried entry may have been stored by WordPress before the last attempt failed"""
+        queued_at = datetime.fromisoformat(entry['queued_at']).astimezone(timezone.utc)
+        return self.wp_api.client.find_recent_post('news', slugify(entry['title']), since=queued_at)
+
+    def publish_entry(self, entry):
+        """Publish one claimed entry, returns the WordPress post or None"""
+        post = self.find_existing_post(entry) if entry['attempts'] > 1 else None
+        if post:
+            print(f"✓ Queued post was already published (ID: {post['id']})")
+            return post
+
+        featured_image_id = entry['featured_image_id']
+        if not featured_image_id and self.image_manager:
+            featured_image_id = self.image_manager.get_featured_image_for_article(
+                entry['image_category'],
+                entry['title']
+            )
+
+        return self.wp_api.create_news_post(
+            entry['title'],
+            entry['content'],
+            status='publish',
+            categories=['Cannabis News'],
+            tags=entry['tags'],
+            featured_image_id=featured_image_id,
+            author_name=entry['author_name']
+        )
+
+    def publish(self, entry_id):
+        """Claim and publish one entry, returns the WordPress post or None"""
+        entry = self.outbox.claim(entry_id)
+        if not entry:
+            print(f"Queued post {entry_id} is already being published")
+            return None
+
+        self.wait_for_rate_limit()
+        try:
+            post = self.publish_entry(entry)
+        except Exception as e:
+            print(f"❌ Error posting queued article: {e}")
+            self.outbox.mark_failed(entry['id'], str(e))
+            metrics.PUBLISH_FAILURES.inc(source=entry['source'])
+            return None
+        finally:
+            self.last_publish_time = time.monotonic()
+
+        if not post:
+            print(f"❌ Failed to post queued article: {entry['title']}")
+            self.outbox.mark_failed(entry['id'], 'WordPress did not create the post')
+            metrics.PUBLISH_FAILURES.inc(source=entry['source'])
+            return None
+
+        print(f"✅ Posted queued {entry['source']} news: {entry['title']}")
+        self.outbox.mark_published(entry['id'], post.get('id'))
+        metrics.POSTS_PUBLISHED.inc(source=entry['source'])
+        if entry.get('original_url') and self.article_tracker:
+            self.article_tracker.update_wordpress_id(entry['original_url'], post.get('id'))
+        return post
+
+    def publish_due(self, limit=OUTBOX_MAX_PER_RUN, retries_only=False):
+        """Publish up to limit due entries (only ones that failed before if retries_only), returns how many were published"""
+        released = self.outbox.release_stale_claims()
+        if released:
+            print(f"⚠️ Released {released} posts left claimed by an interrupted publisher")
+
+        due_posts = self.outbox.get_due_posts()
+        if retries_only:
+            due_posts = [entry for entry in due_posts if entry['attempts']]
+            if not due_posts:
+                return 0
+        due_posts = due_posts[:limit]
+        print(f"[{datetime.now()}] {len(due_posts)} queued posts are due")
+
+        published = 0
+        for entry in due_posts:
+            if self.publish(entry['id']):
+                published += 1
+        return published
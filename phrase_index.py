@@ -0,0 +1,92 @@
+import re
+
+# Phrases containing any of these (as substrings) are never used as link text
+COMMON_WORDS = ['the', 'and', 'or', 'of', 'in', 'to', 'a', 'an']
+MIN_PHRASE_WORDS = 2
+MAX_PHRASE_WORDS = 4
+
+EDGE_PUNCTUATION = re.compile(r'^\W+|\W+$')
+HTML_TAG = re.compile(r'<[^>]+>')
+
+
+def normalize_word(word):
+    return EDGE_PUNCTUATION.sub('', word).lower()
+
+
+class TitlePhraseIndex:
+    """Hash index of the 2-4 word phrases in existing article titles
+
+    Built once per article cache refresh. A lookup walks the content's own
+    n-grams once instead of searching the content for every title phrase.
+    """
+
+    def __init__(self, articles=()):
+        self.articles = []
+        self.phrases = {}  # normalized word tuple -> [(article index, phrase order, phrase)]
+        for article in articles:
+            self.add_article(article)
+
+    def __len__(self):
+        return len(self.articles)
+
+    def add_article(self, article):
+        """Index every candidate phrase of one title, in the order they would be tried"""
+        article_index = len(self.articles)
+        self.articles.append(article)
+
+        title_words = article['title'].split()
+        order = 0
+        for i in range(len(title_words)):
+            for j in range(i + MIN_PHRASE_WORDS, min(i + MAX_PHRASE_WORDS + 1, len(title_words) + 1)):
+                phrase = ' '.join(title_words[i:j])
+
+                # Skip very common words
+                if any(common in phrase.lower() for common in COMMON_WORDS):
+                    continue
+
+                key = tuple(normalize_word(word) for word in title_words[i:j])
+                if all(key):
+                    self.phrases.setdefault(key, []).append((article_index, order, phrase))
+                order += 1
+
+    def content_ngrams(self, content):
+        """Yield every 2-4 word n-gram of the visible content text"""
+        words = [normalize_word(word) for word in HTML_TAG.sub(' ', content).split()]
+        for i in range(len(words)):
+            for n in range(MIN_PHRASE_WORDS, MAX_PHRASE_WORDS + 1):
+                if i + n <= len(words):
+                    yield tuple(words[i:i + n])
+
+    def find_related(self, content, current_title):
+        """Return [(phrase, article)] in title order, one phrase per related article"""
+        candidates = {}
+        for ngram in set(self.content_ngrams(content)):
+            for article_index, order, phrase in self.phrases.get(ngram, ()):
+                candidates.setdefault(article_index, []).append((order, phrase))
+
+        related = []
+        used_phrases = set()
+        verified = {}  # lowercased phrase -> whether it really occurs in the content
+        current_title = current_title.lower()
+
+        for article_index in sorted(candidates):
+            article = self.articles[article_index]
+
+            # Skip linking to the same article
+            if article['title'].lower() == current_title:
+                continue
+
+            for order, phrase in sorted(candidates[article_index]):
+                phrase_lower = phrase.lower()
+                if phrase_lower in used_phrases:
+                    continue
+                # The n-gram hit is a candidate; confirm it with the exact word-boundary match
+                if phrase_lower not in verified:
+                    pattern = r'\b' + re.escape(phrase) + r'\b'
+                    verified[phrase_lower] = re.search(pattern, content, re.IGNORECASE) is not None
+                if verified[phrase_lower]:
+                    used_phrases.add(phrase_lower)
+                    related.append((phrase, article))
+                    break
+
+        return related
@@ -0,0 +1,153 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import metrics
+import telemetry
+
+
+class StageSkipped(Exception):
+    """Raised by a stage (or set for its dependents) when there is nothing to do"""
+
+
+class PipelineRun:
+    """Results and timings of one executor run"""
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.skipped = set()
+        self.restored = set()
+        self.timings = {}  # name -> (start, end) relative to the run start
+        self.critical_path = []
+        self.total_seconds = 0.0
+
+    def succeeded(self, name):
+        return name in self.results
+
+    def duration(self, name):
+        start, end = self.timings.get(name, (0.0, 0.0))
+        return end - start
+
+    @property
+    def critical_path_seconds(self):
+        return sum(self.duration(name) for name in self.critical_path)
+
+    def print_report(self):
+        """Print stage durations and the critical path"""
+        for name, (start, end) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            if name in self.restored:
+                status = 'restored'
+            else:
+                status = 'ok' if name in self.results else ('skipped' if name in self.skipped else 'failed')
+            print(f"  {name:<16} {start:6.2f}s -> {end:6.2f}s ({end - start:.2f}s, {status})")
+        print(f"Critical path: {' -> '.join(self.critical_path) or 'none'} = "
+              f"{self.critical_path_seconds:.2f}s of {self.total_seconds:.2f}s wall time")
+
+
+class PipelineExecutor:
+    """Run a small dependency graph of stages, starting each one as soon as its dependencies finish"""
+
+    def __init__(self, max_workers=None):
+        self.stages = {}
+        self.max_workers = max_workers
+        self.restored = {}
+        self.on_stage_done = None  # Called with (name, result) as each stage finishes
+
+    def restore(self, results):
+        """Treat stages finished by an earlier, interrupted run as done, with their saved results"""
+        self.restored = {name: result for name, result in results.items() if name in self.stages}
+        return self
+
+    def add_stage(self, name, func, depends_on=()):
+        """Register a stage; func receives the dict of finished results"""
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = {'func': func, 'depends_on': tuple(depends_on)}
+        return self
+
+    def run_stage(self, name, func, results):
+        """Run one stage inside its own telemetry span, recording its duration in the metrics"""
+        started = time.monotonic()
+        status = 'error'
+        try:
+            with telemetry.span(f"stage.{name}", expected=(StageSkipped,)):
+                result = func(results)
+            status = 'ok'
+            return result
+        except StageSkipped:
+            status = 'skipped'
+            raise
+        finally:
+            metrics.STAGE_SECONDS.observe(time.monotonic() - started, stage=name, status=status)
+
+    def run(self):
+        """Execute every stage, returns a PipelineRun"""
+        run = PipelineRun()
+        run.results.update(self.restored)
+        run.restored = set(self.restored)
+        for name in self.restored:
+            run.timings[name] = (0.0, 0.0)
+        pending = {name: stage for name, stage in self.stages.items() if name not in self.restored}
+        running = {}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self.stages))) as pool:
+            while pending or running:
+                for name in list(pending):
+                    dependencies = pending[name]['depends_on']
+                    if any(d in run.errors or d in run.skipped for d in dependencies):
+                        # A failed or skipped dependency means this stage cannot run
+                        del pending[name]
+                        run.skipped.add(name)
+                        now = time.monotonic() - started
+                        run.timings[name] = (now, now)
+                    elif all(d in run.results for d in dependencies):
+                        func = pending.pop(name)['func']
+                        run.timings[name] = (time.monotonic() - started, None)
+                        # Each stage runs in a copy of this context so its span nests under the caller's
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, self.run_stage, name, func, run.results)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    run.timings[name] = (run.timings[name][0], time.monotonic() - started)
+                    try:
+                        run.results[name] = future.result()
+                        self.stage_done(name, run.results[name])
+                    except StageSkipped as e:
+                        print(f"Stage '{name}' skipped: {e}")
+                        run.skipped.add(name)
+                    except Exception as e:
+                        print(f"✗ Stage '{name}' failed: {e}")
+                        run.errors[name] = e
+
+        run.total_seconds = time.monotonic() - started
+        run.critical_path = self.find_critical_path(run)
+        return run
+
+    def stage_done(self, name, result):
+        if self.on_stage_done:
+            try:
+                self.on_stage_done(name, result)
+            except Exception as e:
+                print(f"⚠️ Could not save stage '{name}': {e}")
+
+    def find_critical_path(self, run):
+        """Walk back from the last stage to finish through the dependency that finished last"""
+        finished = [name for name in run.timings if name not in run.skipped]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda name: run.timings[name][1])]
+        while True:
+            dependencies = [d for d in self.stages[path[-1]]['depends_on'] if d in run.timings]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda name: run.timings[name][1]))
+
+        return list(reversed(path))
@@ -0,0 +1,165 @@
+import html
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from config import RELEVANCE_INDEX_FILE
+
+STOPWORDS = set('''
+about above after again against all also and any are because been before being below between both but can could
+did does doing down during each few for from further had has have having her here hers him his how into its itself
+just more most not now off once only other our ours out over own said same she should some such than that the
+their theirs them then there these they this those through too under until very was were what when where which
+while who whom why will with would you your yours new says year years one two three first last week
+'''.split())
+
+TITLE_WEIGHT = 2  # Title terms count this many times in a document
+MAX_QUERY_TERMS = 40
+
+
+def tokenize(text):
+    """Lowercased content words of a piece of HTML or plain text"""
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', text)).lower()
+    return [t for t in re.findall(r'[a-z0-9]+', text) if len(t) > 2 and t not in STOPWORDS]
+
+
+class RelevanceIndex:
+    """BM25 inverted index over the title and excerpt of existing articles
+
+    Documents are persisted to disk and synced incrementally from the article
+    catalog; the postings are rebuilt in memory on load.
+    """
+
+    def __init__(self, index_file=RELEVANCE_INDEX_FILE, k1=1.5, b=0.75):
+        self.index_file = index_file
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.postings = {}  # term -> {doc_id: term frequency}
+        self.total_length = 0
+
+        for doc_id, doc in self.load_index().items():
+            self.index_document(doc_id, doc)
+
+    def load_index(self):
+        """Load indexed documents from file"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading relevance index: {e}")
+        return {}
+
+    def save_index(self):
+        """Save indexed documents atomically"""
+        temp_file = f"{self.index_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.docs, f)
+            os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"Error saving relevance index: {e}")
+
+    def index_document(self, doc_id, doc):
+        self.docs[doc_id] = doc
+        self.total_length += doc['length']
+        for term, frequency in doc['terms'].items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove_document(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if not doc:
+            return
+        self.total_length -= doc['length']
+        for term in doc['terms']:
+            postings = self.postings.get(term, {})
+            postings.pop(doc_id, None)
+            if not postings:
+                self.postings.pop(term, None)
+
+    def add_document(self, doc_id, title, excerpt, url, modified=None):
+        """Index (or re-index) one article"""
+        terms = Counter(tokenize(title) * TITLE_WEIGHT + tokenize(excerpt or ''))
+        with self.lock:
+            self.remove_document(doc_id)
+            self.index_document(doc_id, {
+                'title': title,
+                'url': url,
+                'modified': modified,
+                'length': sum(terms.values()),
+                'terms': dict(terms)
+            })
+
+    def sync_from_articles(self, articles):
+        """Index new or modified catalog articles and drop deleted ones, returns (indexed, removed)"""
+        with self.lock:
+            incoming = {str(article['id']): article for article in articles if 'id' in article}
+            removed = [doc_id for doc_id in self.docs if doc_id not in incoming]
+            for doc_id in removed:
+                self.remove_document(doc_id)
+
+            indexed = 0
+            for doc_id, article in incoming.items():
+                doc = self.docs.get(doc_id)
+                if doc and doc['modified'] == article.get('modified'):
+                    continue
+                self.add_document(doc_id, article['title'], article.get('excerpt', ''), article['url'],
+                                  article.get('modified'))
+                indexed += 1
+
+            if indexed or removed:
+                self.save_index()
+            return indexed, len(removed)
+
+    def idf(self, term):
+        document_frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, text, k=5, exclude_urls=()):
+        """Return the top-k [(score, doc)] for a piece of text"""
+        with self.lock:
+            if not self.docs:
+                return []
+
+            query = Counter(tokenize(text))
+            # Keep the query short: the most distinctive terms of the new article
+            query_terms = sorted(query, key=lambda t: (1 + math.log(query[t])) * self.idf(t), reverse=True)
+            average_length = self.total_length / len(self.docs) or 1
+
+            scores = {}
+            for term in query_terms[:MAX_QUERY_TERMS]:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                weight = self.idf(term) * (1 + math.log(query[term]))
+                for doc_id, frequency in postings.items():
+                    length_norm = self.k1 * (1 - self.b + self.b * self.docs[doc_id]['length'] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * frequency * (self.k1 + 1) / (frequency + length_norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for doc_id, score in ranked:
+                doc = self.docs[doc_id]
+                if doc['url'] in exclude_urls:
+                    continue
+                results.append((score, doc))
+                if len(results) == k:
+                    break
+            return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_relevance_index():
+    """Get the process-wide relevance index, creating it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RelevanceIndex()
+        return _index
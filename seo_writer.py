@@ -1,9 +1,8 @@
-from anthropic import Anthropic
-from config import ANTHROPIC_API_KEY
+from llm_gateway import get_llm_gateway
 
 class SEOWriter:
     def __init__(self):
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.llm = get_llm_gateway()
     
     def write_seo_article(self, structure, keywords, word_count):
         prompt = f"""
@@ -23,10 +22,10 @@ class SEOWriter:
         Format the response with proper HTML headings (h2, h3) and paragraphs.
         """
         
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = self.llm.create_message(
             max_tokens=3000,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            purpose='seo_article'
         )
         
         return response.content[0].text
\ No newline at end of file
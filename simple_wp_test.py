@@ -1,4 +1,4 @@
-import requests
+from http_session import get_http_session
 from dotenv import load_dotenv
 import os
 
@@ -12,7 +12,7 @@ print(f"Testing: {wp_url}")
 
 # Test basic WordPress connection
 try:
-    response = requests.get(f"{wp_url}/wp-json/wp/v2", timeout=10)
+    response = get_http_session().get(f"{wp_url}/wp-json/wp/v2", timeout=10)
     print(f"Basic WordPress API: {response.status_code}")
     
     if response.status_code == 200:
@@ -25,7 +25,7 @@ except Exception as e:
 
 # Test what post types are available
 try:
-    response = requests.get(f"{wp_url}/wp-json/wp/v2/types", timeout=10)
+    response = get_http_session().get(f"{wp_url}/wp-json/wp/v2/types", timeout=10)
     if response.status_code == 200:
         types = response.json()
         print("\nAvailable post types:")
@@ -0,0 +1,62 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Imported first by main.py, so times are relative to the start of the command
+START = time.perf_counter()
+
+enabled = False
+steps = []
+first_network_request = None
+
+
+def network_audit_hook(event, args):
+    """Remember when the process first resolves or connects to a host"""
+    global first_network_request
+    if first_network_request is None and event in ('socket.getaddrinfo', 'socket.connect'):
+        target = args[0] if event == 'socket.getaddrinfo' else args[1]
+        first_network_request = (time.perf_counter() - START, str(target))
+
+
+def enable():
+    """Start recording (python main.py <command> --timing)"""
+    global enabled
+    if not enabled:
+        enabled = True
+        sys.addaudithook(network_audit_hook)
+
+
+@contextmanager
+def timed(label):
+    """Record how long a startup step (an import, building a client) took"""
+    if not enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        steps.append((label, started - START, time.perf_counter() - started))
+
+
+def mark(label):
+    """Record that a point in startup was reached"""
+    if enabled:
+        steps.append((label, time.perf_counter() - START, None))
+
+
+def print_report():
+    if not enabled:
+        return
+    print("Startup timing:")
+    for label, offset, seconds in steps:
+        if seconds is None:
+            print(f"  {label} at {offset * 1000:.0f} ms")
+        else:
+            print(f"  {label}: {seconds * 1000:.0f} ms (at {offset * 1000:.0f} ms)")
+    if first_network_request:
+        seconds, target = first_network_request
+        print(f"  First network request at {seconds * 1000:.0f} ms ({target})")
+    else:
+        print("  No network requests")
+    print(f"  Total: {(time.perf_counter() - START) * 1000:.0f} ms")
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+from config import TAXONOMY_CACHE_FILE
+from wordpress_client import slugify
+import metrics
+
+TAXONOMY_PAGE_SIZE = 100
+
+
+class TaxonomyCache:
+    """Persisted slug -> term ID map for categories and tags
+
+    Unknown names are looked up in one ?slug=a,b request and created only if still
+    missing; a full listing is fetched once to warm an empty cache.
+    """
+
+    def __init__(self, client, cache_file=TAXONOMY_CACHE_FILE):
+        self.client = client
+        self.cache_file = cache_file
+        self.lock = threading.RLock()
+        self.terms = self.load_cache()
+
+    def load_cache(self):
+        """Load cached term IDs from file"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading taxonomy cache: {e}")
+        return {}
+
+    def save_cache(self):
+        """Save cached term IDs atomically"""
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.terms, f, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving taxonomy cache: {e}")
+
+    def fetch_terms(self, taxonomy, params):
+        """Fetch every page of a term listing"""
+        terms = []
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            response = self.client.get(
+                taxonomy,
+                fields='id,slug',
+                params=dict(params, per_page=TAXONOMY_PAGE_SIZE, page=page)
+            )
+            if response.status_code != 200:
+                raise Exception(f"{taxonomy} listing returned {response.status_code}")
+            terms.extend(response.json())
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            page += 1
+        return terms
+
+    def warm(self, taxonomy):
+        """Load every existing term of a taxonomy into an empty cache"""
+        cached = self.terms.setdefault(taxonomy, {})
+        if cached:
+            return
+        try:
+            for term in self.fetch_terms(taxonomy, {'hide_empty': 'false'}):
+                cached[term['slug']] = term['id']
+            print(f"✓ Cached {len(cached)} {taxonomy}")
+        except Exception as e:
+            print(f"⚠️ Could not warm {taxonomy} cache: {e}")
+
+    def create_terms(self, taxonomy, names):
+        """Create terms in one batch request where possible, returns {name: ID}
+
+        A term WordPress says already exists resolves to the existing ID.
+        """
+        results = self.client.batch([
+            {'method': 'POST', 'path': f'/wp/v2/{taxonomy}', 'body': {'name': name}} for name in names
+        ])
+
+        term_ids = {}
+        for name, (status, body) in zip(names, results):
+            if status == 201:
+                term_ids[name] = body['id']
+                print(f"✓ Created {taxonomy} '{name}' (ID: {body['id']})")
+            elif body.get('code') == 'term_exists':
+                term_ids[name] = body.get('data', {}).get('term_id')
+            else:
+                print(f"Error creating {taxonomy} '{name}': {status}")
+        return term_ids
+
+    def resolve(self, taxonomy, names):
+        """Return term IDs for names in order, creating missing terms"""
+        with self.lock:
+            self.warm(taxonomy)
+            cached = self.terms[taxonomy]
+            slugs = [slugify(name) for name in names]
+
+            wanted = [slug for slug in dict.fromkeys(slugs) if slug]
+            missing = [slug for slug in wanted if slug not in cached]
+            metrics.cache_lookup('taxonomy', True, len(wanted) - len(missing))
+            metrics.cache_lookup('taxonomy', False, len(missing))
+            if missing:
+                try:
+                    for term in self.fetch_terms(taxonomy, {'slug': ','.join(missing)}):
+                        cached[term['slug']] = term['id']
+                except Exception as e:
+                    print(f"Error looking up {taxonomy}: {e}")
+
+            to_create = {}
+            for name, slug in zip(names, slugs):
+                if slug and slug not in cached:
+                    to_create.setdefault(slug, name)
+            if to_create:
+                for name, term_id in self.create_terms(taxonomy, list(to_create.values())).items():
+                    if term_id:
+                        cached[slugify(name)] = term_id
+
+            if missing:
+                self.save_cache()
+            return [cached[slug] for slug in dict.fromkeys(slugs) if slug in cached]
+
+    def invalidate(self, taxonomy, term_ids=None):
+        """Forget cached IDs (all of the taxonomy when term_ids is None) after WordPress rejects them"""
+        with self.lock:
+            cached = self.terms.get(taxonomy, {})
+            if term_ids is None:
+                cached.clear()
+            else:
+                for slug in [s for s, term_id in cached.items() if term_id in term_ids]:
+                    del cached[slug]
+            self.save_cache()
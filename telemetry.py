@@ -0,0 +1,274 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from config import TELEMETRY_ENABLED, TELEMETRY_FILE, OTLP_ENDPOINT, OTLP_SERVICE_NAME
+
+# Counters that are also summed over the whole run
+RUN_COUNTERS = (
+    'http.requests', 'http.bytes', 'wp.requests', 'wp.bytes',
+    'llm.calls', 'llm.input_tokens', 'llm.output_tokens', 'image.bytes_uploaded'
+)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_current_run = None
+_run_lock = threading.Lock()
+
+
+def new_id(length):
+    return os.urandom(length).hex()
+
+
+class Span:
+    """One timed step with its counters and attributes"""
+
+    def __init__(self, run, name, parent, attributes):
+        self.run = run
+        self.name = name
+        self.span_id = new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.counters = {}
+        self.status = 'ok'
+        self.error = None
+        self.start_time = time.time_ns()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        with self.run.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if key in RUN_COUNTERS:
+                self.run.counters[key] = self.run.counters.get(key, 0) + amount
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        self.end_time = time.time_ns()
+        with self.run.lock:
+            self.run.spans.append(self)
+
+    def to_record(self):
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': datetime.fromtimestamp(self.start_time / 1e9).isoformat(),
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+            'counters': self.counters
+        }
+
+
+class Run:
+    """All spans of one command or daemon job"""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = new_id(16)
+        self.lock = threading.Lock()
+        self.spans = []
+        self.counters = {}
+        self.root = Span(self, name, None, {})
+
+    def to_record(self):
+        spans = sorted(self.spans, key=lambda span: span.start_time)
+        return {
+            'run_id': self.trace_id,
+            'name': self.name,
+            'started_at': datetime.fromtimestamp(self.root.start_time / 1e9).isoformat(),
+            'duration_ms': self.root.duration_ms,
+            'status': self.root.status,
+            'error': self.root.error,
+            'counters': self.counters,
+            'spans': [span.to_record() for span in spans if span is not self.root]
+        }
+
+
+class NoopSpan:
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def current_span():
+    """The innermost open span, the run's root span in a thread started without a context, or a no-op"""
+    span = _current_span.get()
+    if span is not None:
+        return span
+    if _current_run is not None:
+        return _current_run.root
+    return NOOP_SPAN
+
+
+def add(key, amount=1):
+    """Add to a counter (HTTP requests, bytes, tokens) of the current span"""
+    current_span().add(key, amount)
+
+
+@contextmanager
+def span(name, expected=(), **attributes):
+    """Time a block as a child of the current span; exceptions in expected don't mark it failed"""
+    run = _current_run
+    if run is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get() or run.root
+    new_span = Span(run, name, parent, attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except expected as e:
+        new_span.status = 'skipped'
+        new_span.error = str(e)
+        raise
+    except BaseException as e:
+        new_span.status = 'error'
+        new_span.error = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.finish()
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_run(name):
+    """Begin recording a run, returns it (None when telemetry is disabled)"""
+    global _current_run
+    if not TELEMETRY_ENABLED:
+        return None
+    with _run_lock:
+        _current_run = Run(name)
+        _current_span.set(_current_run.root)
+        return _current_run
+
+
+def finish_run(status='ok', error=None):
+    """Close the current run, append its record to TELEMETRY_FILE and export it over OTLP"""
+    global _current_run
+    with _run_lock:
+        run, _current_run = _current_run, None
+    if run is None:
+        return None
+
+    _current_span.set(None)
+    run.root.status = status
+    run.root.error = error
+    run.root.finish()
+    record = run.to_record()
+    if not record['spans'] and not record['counters'] and status == 'ok':
+        # e.g. a daemon retry check that found nothing to do
+        return record
+
+    try:
+        with open(TELEMETRY_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        print(f"Error saving run telemetry: {e}")
+
+    if OTLP_ENDPOINT:
+        export_otlp(run)
+
+    print_summary(record)
+    return record
+
+
+@contextmanager
+def run(name):
+    """Record everything inside the block as one run; a non-zero sys.exit counts as failed"""
+    start_run(name)
+    status, error = 'ok', None
+    try:
+        yield
+    except SystemExit as e:
+        if e.code not in (0, None):
+            status, error = 'failed', f"exit code {e.code}"
+        raise
+    except BaseException as e:
+        status, error = 'error', f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        finish_run(status, error)
+
+
+def print_summary(record):
+    counters = record['counters']
+    slowest = sorted(record['spans'], key=lambda s: s['duration_ms'], reverse=True)[:5]
+    print(f"Run {record['name']} {record['status']} in {record['duration_ms'] / 1000:.1f}s: "
+          f"{counters.get('http.requests', 0)} HTTP / {counters.get('wp.requests', 0)} WordPress requests, "
+          f"{counters.get('llm.input_tokens', 0)} in / {counters.get('llm.output_tokens', 0)} out tokens")
+    if slowest:
+        print("Slowest spans: " + ", ".join(f"{s['name']} {s['duration_ms'] / 1000:.1f}s" for s in slowest))
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_span(run, span):
+    attributes = dict(span.attributes, **span.counters)
+    if span.error:
+        attributes['error.message'] = span.error
+    result = {
+        'traceId': run.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,  # SPAN_KIND_INTERNAL
+        'startTimeUnixNano': str(span.start_time),
+        'endTimeUnixNano': str(span.end_time),
+        'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in attributes.items()],
+        'status': {'code': 2 if span.status == 'error' else 1}
+    }
+    if span.parent_id:
+        result['parentSpanId'] = span.parent_id
+    return result
+
+
+def export_otlp(run):
+    """POST the run's spans to an OTLP/HTTP collector (JSON encoding, e.g. http://localhost:4318)"""
+    import requests
+    payload = {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': OTLP_SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'auto-posting.telemetry'},
+                'spans': [otlp_span(run, span) for span in run.spans]
+            }]
+        }]
+    }
+    try:
+        response = requests.post(f"{OTLP_ENDPOINT.rstrip('/')}/v1/traces", json=payload, timeout=5)
+        if response.status_code >= 300:
+            print(f"⚠️ OTLP export returned {response.status_code}")
+    except Exception as e:
+        print(f"⚠️ OTLP export failed: {e}")
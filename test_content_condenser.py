@@ -0,0 +1,53 @@
+from content_condenser import ContentCondenser
+
+# Boilerplate detection: site furniture is dropped, news sentences that only
+# mention a sponsor, cookies, a subscription or "read more" are kept
+
+BOILERPLATE = [
+    "Subscribe to our newsletter for daily cannabis news.",
+    "Sign up for the Marijuana Moment newsletter",
+    "Sponsored content",
+    "Advertisement",
+    "Published on Jan 3, 2025",
+    "3 hours ago",
+    "Read more:",
+    "This site uses cookies to improve your experience.",
+    "Become a patron on Patreon to support our reporting.",
+    "By Kyle Jaeger",
+    "Photo courtesy of Chris Wallis"
+]
+
+NEWS = [
+    "The bill, sponsored by Sen. Cory Booker, would remove cannabis from the Controlled Substances Act.",
+    "Police seized 40 pounds of cannabis cookies and gummies during the raid on Tuesday.",
+    "Licensed growers will subscribe to the state's new tracking system starting in March.",
+    "Read more about the vote, which passed the House 220-207, in the committee report.",
+    "Published research from the University of Colorado found no rise in teen use.",
+    "The newsletter industry group opposed the advertising restrictions in the bill."
+]
+
+
+def test_boilerplate_is_dropped():
+    condenser = ContentCondenser()
+    for paragraph in BOILERPLATE:
+        assert condenser.is_boilerplate(paragraph), paragraph
+
+
+def test_news_sentences_are_kept():
+    condenser = ContentCondenser()
+    for paragraph in NEWS:
+        assert not condenser.is_boilerplate(paragraph), paragraph
+
+
+def test_condense_keeps_news():
+    content = "\n\n".join(NEWS + BOILERPLATE)
+    condensed, stats = ContentCondenser(token_budget=10000).condense(content, "Senate cannabis bill")
+    assert stats['dropped_boilerplate'] == len(BOILERPLATE)
+    for paragraph in NEWS:
+        assert paragraph in condensed, paragraph
+
+
+if __name__ == "__main__":
+    for test in (test_boilerplate_is_dropped, test_news_sentences_are_kept, test_condense_keeps_news):
+        test()
+        print(f"✓ {test.__name__}")
@@ -1,4 +1,4 @@
-import requests
+from http_session import get_http_session
 from bs4 import BeautifulSoup
 
 # Test one specific article we know exists
@@ -11,7 +11,7 @@ headers = {
 print(f"Testing: {test_url}")
 
 try:
-    response = requests.get(test_url, headers=headers, timeout=15)
+    response = get_http_session().get(test_url, headers=headers, timeout=15)
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+import mock_anthropic
+from llm_gateway import LLMGateway
+
+# Message Batches calls against mock_anthropic.py: submit, find a batch an
+# interrupted run submitted, wait for it and read the results
+
+
+def start_api(fail_creates=0):
+    server, api = mock_anthropic.serve(0, fail_creates)
+    gateway = LLMGateway(api_key='test', base_url=f"http://127.0.0.1:{server.server_address[1]}", max_retries=0)
+    return server, api, gateway
+
+
+def test_batch_round_trip():
+    server, api, gateway = start_api()
+    try:
+        requests = [gateway.build_batch_request(f"rewrite-{i}", [{"role": "user", "content": "Rewrite"}], 100)
+                    for i in range(2)]
+        batch_id = gateway.create_batch(requests)
+        assert gateway.wait_for_batch(batch_id, poll_interval=0.01)
+        results = gateway.get_batch_results(batch_id)
+        assert set(results) == {'rewrite-0', 'rewrite-1'}
+        assert results['rewrite-0'].startswith('TITLE:')
+    finally:
+        server.shutdown()
+
+
+def test_find_batch_from_interrupted_run():
+    server, api, gateway = start_api()
+    try:
+        since = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+        requests = [gateway.build_batch_request("rewrite-0", [{"role": "user", "content": "Rewrite"}], 100)]
+        batch_id = gateway.create_batch(requests)
+
+        assert gateway.find_batch(1, since) == batch_id
+        assert gateway.find_batch(2, since) is None
+        later = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
+        assert gateway.find_batch(1, later) is None
+    finally:
+        server.shutdown()
+
+
+def test_failed_submission_raises():
+    server, api, gateway = start_api(fail_creates=1)
+    try:
+        requests = [gateway.build_batch_request("rewrite-0", [{"role": "user", "content": "Rewrite"}], 100)]
+        try:
+            gateway.create_batch(requests)
+        except Exception as e:
+            assert getattr(e, 'status_code', None) == 529
+        else:
+            raise AssertionError("create_batch should raise on a 529")
+        assert not api.batches
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for test in (test_batch_round_trip, test_find_batch_from_interrupted_run, test_failed_submission_raises):
+        test()
+        print(f"✓ {test.__name__}")
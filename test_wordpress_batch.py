@@ -0,0 +1,55 @@
+import os
+import tempfile
+import mock_wordpress
+from taxonomy_cache import TaxonomyCache
+from wordpress_client import WordPressClient
+
+# Term creation against mock_wordpress.py: new terms go out in one /batch/v1
+# request, and one by one when the site has no batch endpoint
+
+
+def start_site(batch_enabled):
+    server, site = mock_wordpress.serve(0, batch_enabled)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = WordPressClient()
+    client.site_url = url
+    client.base_url = f"{url}/wp-json/wp/v2"
+    cache = TaxonomyCache(client, cache_file=os.path.join(tempfile.mkdtemp(), 'taxonomy_cache.json'))
+    return server, site, client, cache
+
+
+def writes(site):
+    return [entry['path'].split('?')[0] for entry in site.log if entry['method'] == 'POST']
+
+
+def test_new_terms_share_one_batch_request():
+    server, site, client, cache = start_site(batch_enabled=True)
+    try:
+        term_ids = cache.resolve('tags', ['Banking', 'Senate', 'Hemp'])
+        assert len(set(term_ids)) == 3
+        assert sorted(t['name'] for t in site.items['tags']) == ['Banking', 'Hemp', 'Senate']
+        assert writes(site) == ['/wp-json/batch/v1']
+        assert client.batch_supported is True
+    finally:
+        server.shutdown()
+
+
+def test_falls_back_to_single_writes_without_batch_endpoint():
+    server, site, client, cache = start_site(batch_enabled=False)
+    try:
+        term_ids = cache.resolve('tags', ['Banking', 'Senate', 'Hemp'])
+        assert len(set(term_ids)) == 3
+        assert writes(site) == ['/wp-json/batch/v1'] + ['/wp-json/wp/v2/tags'] * 3
+        assert client.batch_supported is False
+
+        # The missing endpoint is remembered, later writes don't try it again
+        cache.resolve('categories', ['Politics', 'Business'])
+        assert writes(site)[4:] == ['/wp-json/wp/v2/categories'] * 2
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for test in (test_new_terms_share_one_batch_request, test_falls_back_to_single_writes_without_batch_endpoint):
+        test()
+        print(f"✓ {test.__name__}")
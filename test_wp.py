@@ -1,4 +1,4 @@
-import requests
+from http_session import get_http_session
 import base64
 from dotenv import load_dotenv
 import os
@@ -15,7 +15,7 @@ print(f"Username: {wp_user}")
 print(f"Password length: {len(wp_pass)}")
 
 # Test basic API access
-response = requests.get(f"{wp_url}/wp-json/wp/v2/posts")
+response = get_http_session().get(f"{wp_url}/wp-json/wp/v2/posts")
 print(f"Basic API test: {response.status_code}")
 
 # Test with authentication
@@ -33,7 +33,7 @@ data = {
     'status': 'draft'
 }
 
-response = requests.post(
+response = get_http_session().post(
     f"{wp_url}/wp-json/wp/v2/posts",
     json=data,
     headers=headers
@@ -1,30 +1,26 @@
-import requests
-import base64
-from config import WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD
+from config import ARTICLE_CATALOG_POST_TYPES
+from article_catalog import get_article_catalog
+from taxonomy_cache import TaxonomyCache
+from wordpress_client import get_wordpress_client
+import metrics
+import telemetry
 
 class WordPressAPI:
     def __init__(self):
-        self.base_url = f"{WORDPRESS_URL}/wp-json/wp/v2"
-        credentials = f"{WORDPRESS_USERNAME}:{WORDPRESS_PASSWORD}"
-        token = base64.b64encode(credentials.encode()).decode()
-        self.headers = {
-            'Authorization': f'Basic {token}',
-            'Content-Type': 'application/json'
-        }
+        self.client = get_wordpress_client()
+        self.base_url = self.client.base_url
         self.author_cache = {}
+        self.taxonomy_cache = TaxonomyCache(self.client)
     
+    @telemetry.traced('wordpress.author')
     def get_author_id(self, author_name):
         """Get author ID by name, cache results"""
+        metrics.cache_lookup('authors', author_name in self.author_cache)
         if author_name in self.author_cache:
             return self.author_cache[author_name]
         
         try:
-            response = requests.get(
-                f"{self.base_url}/users",
-                params={'search': author_name},
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.client.get('users', fields='id,name', context='embed', params={'search': author_name})
             
             if response.status_code == 200:
                 users = response.json()
@@ -41,16 +37,17 @@ class WordPressAPI:
             print(f"Error finding author '{author_name}': {e}")
             return None
     
+    @telemetry.traced('wordpress.create_post')
     def create_post(self, title, content, status='publish', categories=None, tags=None, post_type='posts', featured_image_id=None, author_name=None):
         """Create a post - can be regular post or custom post type"""
         
         # For custom post types, use different endpoints
         if post_type == 'news':
-            endpoint = f"{self.base_url}/news"
+            endpoint = 'news'
         elif post_type == 'cannabis-lifestyle':
-            endpoint = f"{self.base_url}/cannabis-lifestyle"
+            endpoint = 'cannabis-lifestyle'
         else:
-            endpoint = f"{self.base_url}/posts"
+            endpoint = 'posts'
         
         data = {
             'title': title,
@@ -76,14 +73,21 @@ class WordPressAPI:
             else:
                 print(f"Warning: Could not set author '{author_name}', using default")
             
-        response = requests.post(
-            endpoint,
-            json=data,
-            headers=self.headers
-        )
+        try:
+            post, response = self.client.create_post(endpoint, data)
+        except Exception as e:
+            print(f"Error creating {post_type}: {e}")
+            return None
         
-        if response.status_code == 201:
-            return response.json()
+        if post:
+            # Cached term IDs go stale when a category or tag is deleted in WordPress,
+            # which then creates the post without them instead of failing
+            dropped = self._dropped_term_ids(data, post)
+            if dropped:
+                post = self._repair_terms(endpoint, post, dropped, categories, tags)
+            if status == 'publish' and post_type in ARTICLE_CATALOG_POST_TYPES:
+                get_article_catalog().add_post(post_type, post)
+            return post
         else:
             print(f"Error creating {post_type}: {response.status_code}")
             print(response.text)
@@ -100,7 +104,7 @@ class WordPressAPI:
     def test_news_endpoint(self):
         """Test if the news custom post type endpoint exists"""
         try:
-            response = requests.get(f"{self.base_url}/news", headers=self.headers, timeout=10)
+            response = self.client.get('news', fields='id', context='embed', params={'per_page': 1})
             return response.status_code == 200
         except:
             return False
@@ -108,69 +112,57 @@ class WordPressAPI:
     def test_cannabis_lifestyle_endpoint(self):
         """Test if the cannabis-lifestyle custom post type endpoint exists"""
         try:
-            response = requests.get(f"{self.base_url}/cannabis-lifestyle", headers=self.headers, timeout=10)
+            response = self.client.get('cannabis-lifestyle', fields='id', context='embed', params={'per_page': 1})
             return response.status_code == 200
         except:
             return False
     
+    @telemetry.traced('wordpress.categories')
     def _get_or_create_categories(self, category_names):
         """Get category IDs, create if they don't exist"""
-        category_ids = []
-        
-        for cat_name in category_names:
-            try:
-                response = requests.get(
-                    f"{self.base_url}/categories",
-                    params={'search': cat_name},
-                    headers=self.headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    categories = response.json()
-                    if categories:
-                        category_ids.append(categories[0]['id'])
-                    else:
-                        new_cat_response = requests.post(
-                            f"{self.base_url}/categories",
-                            json={'name': cat_name},
-                            headers=self.headers,
-                            timeout=10
-                        )
-                        if new_cat_response.status_code == 201:
-                            category_ids.append(new_cat_response.json()['id'])
-            except:
-                continue
-        
-        return category_ids
+        try:
+            return self.taxonomy_cache.resolve('categories', category_names)
+        except Exception as e:
+            print(f"Error resolving categories: {e}")
+            return []
     
+    @telemetry.traced('wordpress.tags')
     def _get_or_create_tags(self, tag_names):
         """Get tag IDs, create if they don't exist"""
-        tag_ids = []
-        
-        for tag_name in tag_names:
-            try:
-                response = requests.get(
-                    f"{self.base_url}/tags",
-                    params={'search': tag_name},
-                    headers=self.headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    tags = response.json()
-                    if tags:
-                        tag_ids.append(tags[0]['id'])
-                    else:
-                        new_tag_response = requests.post(
-                            f"{self.base_url}/tags",
-                            json={'name': tag_name},
-                            headers=self.headers,
-                            timeout=10
-                        )
-                        if new_tag_response.status_code == 201:
-                            tag_ids.append(new_tag_response.json()['id'])
-            except:
-                continue
+        try:
+            return self.taxonomy_cache.resolve('tags', tag_names)
+        except Exception as e:
+            print(f"Error resolving tags: {e}")
+            return []
+    
+    def _dropped_term_ids(self, data, post):
+        """Return {taxonomy: IDs} that were sent but aren't on the created post"""
+        dropped = {}
+        for taxonomy in ('categories', 'tags'):
+            # Post types without the taxonomy (and duplicate-check lookups) don't return it
+            if data.get(taxonomy) and taxonomy in post:
+                missing = set(data[taxonomy]) - set(post[taxonomy])
+                if missing:
+                    dropped[taxonomy] = missing
+        return dropped
+    
+    def _repair_terms(self, endpoint, post, dropped, categories, tags):
+        """Forget the stale IDs, resolve the names again and set them on the post with one update"""
+        print(f"⚠️ WordPress dropped cached {', '.join(dropped)} IDs {sorted(set().union(*dropped.values()))}, refreshing")
+        fix = {}
+        for taxonomy, term_ids in dropped.items():
+            self.taxonomy_cache.invalidate(taxonomy, term_ids)
+            if taxonomy == 'categories':
+                fix[taxonomy] = self._get_or_create_categories(categories)
+            else:
+                fix[taxonomy] = self._get_or_create_tags(tags)
         
-        return tag_ids
\ No newline at end of file
+        try:
+            response = self.client.post(f"{endpoint}/{post['id']}", json=fix)
+            if response.status_code == 200:
+                print(f"✓ Updated post {post['id']} with refreshed {', '.join(fix)}")
+                return response.json()
+            print(f"⚠️ Could not update terms on post {post['id']}: {response.status_code}")
+        except Exception as e:
+            print(f"⚠️ Could not update terms on post {post['id']}: {e}")
+        return post
\ No newline at end of file
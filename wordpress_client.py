@@ -0,0 +1,286 @@
+import base64
+import random
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+import requests
+from config import (
+    WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD,
+    WP_CONNECT_TIMEOUT, WP_READ_TIMEOUT, WP_UPLOAD_TIMEOUT, WP_MAX_RETRIES, WP_RETRY_BASE_DELAY,
+    WP_RETRY_MAX_DELAY, WP_BATCH_ENABLED
+)
+import http_replay
+import metrics
+import telemetry
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+DUPLICATE_LOOKBACK = timedelta(days=1)  # A post with our slug newer than this is the one we just created
+CLOCK_SKEW = timedelta(minutes=5)  # Allowed difference between our clock and the WordPress server's
+SLUG_SUFFIXES = 10  # WordPress stores a title that's already taken as slug-2, slug-3, ...
+BATCH_MAX_REQUESTS = 25  # WordPress core limit per /batch/v1 call
+
+
+def slugify(text):
+    """Approximate WordPress sanitize_title for plain text"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:190]
+
+
+class AmbiguousWriteError(Exception):
+    """A create request failed in a way that doesn't tell us whether WordPress stored it"""
+
+
+class WordPressClient:
+    """Shared WordPress REST client: one pooled session, per-call timeouts and retries with backoff
+
+    Only idempotent methods are retried automatically; creates go through
+    create_post(), which checks for the post before sending it again.
+    """
+
+    def __init__(self):
+        self.site_url = WORDPRESS_URL
+        self.base_url = f"{WORDPRESS_URL}/wp-json/wp/v2"
+        credentials = f"{WORDPRESS_USERNAME}:{WORDPRESS_PASSWORD}"
+        token = base64.b64encode(credentials.encode()).decode()
+        self.auth_header = f'Basic {token}'
+
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = self.auth_header
+        adapter = http_replay.create_adapter(pool_connections=4, pool_maxsize=10)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # None until the first /batch/v1 call tells us whether the site allows it
+        self.batch_supported = None if WP_BATCH_ENABLED else False
+
+        # "METHOD endpoint" -> calls, response bytes and seconds, to see what each kind of call costs
+        self.call_stats = {}
+        self.stats_lock = threading.Lock()
+        self.unfiltered_reads = set()
+
+    def url(self, path):
+        if path.startswith('http'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def endpoint_name(self, path):
+        """'media/123?x=1' or a full URL -> 'media/:id', for grouping call stats"""
+        path = path.split('?', 1)[0]
+        if path.startswith(self.base_url):
+            path = path[len(self.base_url):]
+        elif path.startswith(self.site_url):
+            path = path[len(self.site_url):]
+        return re.sub(r'/\d+(?=/|$)', '/:id', path.strip('/'))
+
+    def record_call(self, method, path, response, seconds):
+        key = f"{method} {self.endpoint_name(path)}"
+        with self.stats_lock:
+            stats = self.call_stats.setdefault(key, {'calls': 0, 'bytes': 0, 'seconds': 0.0})
+            stats['calls'] += 1
+            stats['bytes'] += len(response.content)
+            stats['seconds'] += seconds
+        telemetry.add('wp.requests')
+        telemetry.add('wp.bytes', len(response.content))
+        metrics.observe_response(response, seconds)
+
+    def get_retry_delay(self, attempt, response=None):
+        """Seconds to wait before retrying, or None when Retry-After asks for more than WP_RETRY_MAX_DELAY"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            # A proxy asking for an hour would hold a publish slot (and the daemon) that long
+            return float(retry_after) if float(retry_after) <= WP_RETRY_MAX_DELAY else None
+        return min(WP_RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.8, 1.2), WP_RETRY_MAX_DELAY)
+
+    def request(self, method, path, timeout=None, retries=None, **kwargs):
+        """Send a request, retrying connection errors and 429/5xx for idempotent methods"""
+        method = method.upper()
+        timeout = timeout or (WP_CONNECT_TIMEOUT, WP_READ_TIMEOUT)
+        if retries is None:
+            retries = WP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+        for attempt in range(retries + 1):
+            try:
+                started = time.monotonic()
+                response = self.session.request(method, self.url(path), timeout=timeout, **kwargs)
+                self.record_call(method, path, response, time.monotonic() - started)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == retries:
+                    raise
+                delay = self.get_retry_delay(attempt)
+                print(f"⚠️ WordPress {method} {path} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+                delay = self.get_retry_delay(attempt, response)
+                if delay is not None:
+                    print(f"⚠️ WordPress {method} {path} returned {response.status_code}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                print(f"⚠️ WordPress {method} {path} returned {response.status_code} with a Retry-After over "
+                      f"{WP_RETRY_MAX_DELAY:.0f}s, not retrying")
+            return response
+
+    def get(self, path, fields=None, context=None, params=None, **kwargs):
+        """GET with only the listed fields (and a lighter context) in the response"""
+        params = dict(params or {})
+        if fields:
+            params['_fields'] = fields
+        if context:
+            params['context'] = context
+        if '_fields' not in params and path not in self.unfiltered_reads:
+            self.unfiltered_reads.add(path)
+            print(f"⚠️ WordPress read of {self.endpoint_name(path)} without _fields downloads full objects")
+        return self.request('GET', path, params=params, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def send_batch_chunk(self, chunk):
+        """POST up to 25 requests to /batch/v1, returns [(status, body)] or None if batching isn't usable"""
+        response = self.request(
+            'POST', f"{self.site_url}/wp-json/batch/v1",
+            json={'validation': 'normal', 'requests': chunk}
+        )
+        if response.status_code in (404, 405) or response.status_code >= 500:
+            print(f"⚠️ WordPress batch endpoint unavailable ({response.status_code}), sending requests one by one")
+            self.batch_supported = False
+            return None
+
+        body = response.json() if response.status_code in (200, 207) else {}
+        responses = body.get('responses')
+        if body.get('failed') or not isinstance(responses, list) or len(responses) != len(chunk):
+            # Validation failed for the whole chunk (nothing was written) or an unexpected reply
+            return None
+
+        results = [(item.get('status'), item.get('body') or {}) for item in responses]
+        if any(body.get('code') == 'rest_batch_not_allowed' for status, body in results):
+            return None
+
+        self.batch_supported = True
+        return results
+
+    def batch(self, requests_list):
+        """Send writes through /batch/v1 when the site allows it, else one by one
+
+        Each request is {'method', 'path' (e.g. '/wp/v2/tags'), 'body'}; returns
+        [(status code, response body)] in the same order.
+        """
+        results = []
+        for start in range(0, len(requests_list), BATCH_MAX_REQUESTS):
+            chunk = requests_list[start:start + BATCH_MAX_REQUESTS]
+
+            chunk_results = None
+            if self.batch_supported is not False and len(chunk) > 1:
+                try:
+                    chunk_results = self.send_batch_chunk(chunk)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    # Don't resend: the batch may have been applied
+                    raise AmbiguousWriteError(f"Batch request failed: {e}")
+
+            if chunk_results is None:
+                chunk_results = []
+                for item in chunk:
+                    response = self.request(item['method'], f"{self.site_url}/wp-json{item['path']}", json=item.get('body'))
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = {}
+                    chunk_results.append((response.status_code, body))
+
+            results.extend(chunk_results)
+        return results
+
+    def get_usage_summary(self):
+        with self.stats_lock:
+            return {key: dict(stats) for key, stats in self.call_stats.items()}
+
+    def print_usage_summary(self):
+        """Print calls, response bytes and latency per endpoint"""
+        for key, stats in sorted(self.get_usage_summary().items()):
+            print(f"WordPress {key}: {stats['calls']} calls, {stats['bytes'] / 1024:.1f} KB received, "
+                  f"avg {stats['seconds'] / stats['calls'] * 1000:.0f} ms")
+
+    def upload_media(self, file_name, file_obj, mime_type, data):
+        """Upload a file to /media (not retried: a repeated upload would duplicate it)"""
+        return self.request(
+            'POST', 'media',
+            files={'file': (file_name, file_obj, mime_type)},
+            data=data,
+            timeout=(WP_CONNECT_TIMEOUT, WP_UPLOAD_TIMEOUT)
+        )
+
+    def find_recent_post(self, endpoint, slug, since=None):
+        """Return a post with this slug (or slug-2, slug-3... when the title was taken) created since since
+
+        since is an aware datetime and defaults to DUPLICATE_LOOKBACK ago.
+        """
+        slugs = [slug] + [f"{slug}-{n}" for n in range(2, SLUG_SUFFIXES + 1)]
+        response = self.get(endpoint, fields='id,link,title,slug,modified,date_gmt,modified_gmt', params={
+            'slug': ','.join(slugs),
+            'status': 'publish,future,draft,pending,private',
+            'per_page': len(slugs)
+        })
+        if response.status_code != 200:
+            return None
+
+        cutoff = (since or datetime.now(timezone.utc) - DUPLICATE_LOOKBACK) - CLOCK_SKEW
+        for post in response.json():
+            # Drafts without a date have date_gmt null
+            created = post.get('date_gmt') or post.get('modified_gmt')
+            if not created or datetime.fromisoformat(created).replace(tzinfo=timezone.utc) >= cutoff:
+                return post
+        return None
+
+    def create_post(self, endpoint, data):
+        """Create a post with a deterministic slug, safe to retry, returns (post or None, last response)
+
+        When a create times out or gets a 5xx, WordPress may have stored it anyway,
+        so the slug is looked up before sending the create again.
+        """
+        data = dict(data)
+        data.setdefault('slug', slugify(data['title']))
+        started = datetime.now(timezone.utc)
+
+        for attempt in range(WP_MAX_RETRIES + 1):
+            if attempt:
+                existing = self.find_recent_post(endpoint, data['slug'], since=started)
+                if existing:
+                    print(f"✓ Post '{data['slug']}' already exists (ID: {existing['id']}), not creating it again")
+                    return existing, None
+
+            try:
+                response = self.request('POST', endpoint, json=data, retries=0)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == WP_MAX_RETRIES:
+                    raise AmbiguousWriteError(f"Creating '{data['slug']}' failed: {e}")
+                delay = self.get_retry_delay(attempt)
+                print(f"⚠️ Creating post failed ({e.__class__.__name__}), checking and retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < WP_MAX_RETRIES:
+                delay = self.get_retry_delay(attempt, response)
+                if delay is not None:
+                    print(f"⚠️ Creating post returned {response.status_code}, checking and retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                print(f"⚠️ Creating post returned {response.status_code} with a Retry-After over "
+                      f"{WP_RETRY_MAX_DELAY:.0f}s, not retrying")
+            return (response.json() if response.status_code == 201 else None), response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_wordpress_client():
+    """Get the process-wide WordPress client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WordPressClient()
+        return _client